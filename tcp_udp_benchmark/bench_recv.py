@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: legacy bytearray/extend recv_exact_tcp vs netio.RecvBuffer.
+
+For each payload size a writer thread streams REQUESTS payloads over a
+socketpair while the main thread reads them back one request at a time.
+Reports time per request and the peak heap growth per request measured with
+tracemalloc (the stdlib exposes no allocation counter, so peak traced bytes
+stand in for "allocations per request").
+"""
+import socket
+import statistics
+import threading
+import time
+import tracemalloc
+
+from netio import RecvBuffer, recv_exact_tcp
+
+PAYLOADS = [64, 512, 1024, 4096, 8192, 65536]
+REQUESTS = 2000
+
+
+def recv_exact_legacy(conn: socket.socket, n: int, rbuf=None) -> bytes:
+    """The pre-netio implementation, kept here as the baseline."""
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            return b""
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def writer(sock: socket.socket, payload: bytes, requests: int) -> None:
+    for _ in range(requests):
+        sock.sendall(payload)
+
+
+def run(recv_fn, payload_bytes: int, traced: bool):
+    a, b = socket.socketpair()
+    rbuf = RecvBuffer(payload_bytes)
+    t = threading.Thread(target=writer, args=(a, b"x" * payload_bytes, REQUESTS), daemon=True)
+    peaks = []
+    with a, b:
+        t.start()
+        t0 = time.perf_counter()
+        for _ in range(REQUESTS):
+            if traced:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            data = recv_fn(b, payload_bytes, rbuf)
+            if traced:
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            if len(data) != payload_bytes:
+                raise RuntimeError("short read")
+        elapsed = time.perf_counter() - t0
+        t.join()
+    return elapsed / REQUESTS, peaks
+
+
+def main():
+    impls = [("legacy", recv_exact_legacy), ("recvbuf", recv_exact_tcp)]
+    print(f"{'payload':>8} {'impl':>8} {'us/req':>9} {'peak_B/req':>11} {'max_peak_B':>11}")
+    for p in PAYLOADS:
+        for name, fn in impls:
+            per_req, _ = run(fn, p, traced=False)
+
+            tracemalloc.start()
+            _, peaks = run(fn, p, traced=True)
+            tracemalloc.stop()
+
+            print(f"{p:8d} {name:>8} {per_req * 1e6:9.2f} "
+                  f"{statistics.median(peaks):11.0f} {max(peaks):11d}")
+
+
+if __name__ == "__main__":
+    main()
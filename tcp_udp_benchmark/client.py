@@ -3,14 +3,32 @@
 TCP/UDP echo client boilerplate.
 """
 import argparse
+import asyncio
 import json
+import multiprocessing as mp
 import os
+import queue
+import random
+import sys
 import time
 import socket
 import threading
 import struct
-from typing import List, Dict, Tuple
-import csv
+from collections import deque
+from typing import Deque, List, Dict, Tuple
+
+import kstats
+from clocksync import (PROBE_BYTES, STAMP, TCP_STAMP_AT, UDP_STAMP_AT, DelaySplit,
+                       estimate_offset)
+from hist import LatencyHistogram
+from netio import RX_TS_ANCBUF, RX_TS_MODES, RecvBuffer, RxTimestamps, recv_exact_tcp, sendmsg_all
+from phases import Phases
+from profiler import PROFILE_HZ, StackSampler, merge_profiles
+from rusage import ResourceMeter, efficiency, merge_usage
+from resultio import (KERNEL_RTT_COL, LATENCY_COL, SPLIT_COLS, TCP_CONN_COLS, TCP_RTT_COLS, UDP_RECV_COLS,
+                      StreamWriter, merge_parts, part_stem)
+from seqtrack import SeqTracker, loss_pattern, merge_seq_stats
+from series import SeriesCell, SeriesCells, SeriesSampler, merge_series
 
 
 ##### helper functions #####
@@ -24,40 +42,234 @@ def log_event(fp, event: dict):
     fp.write(json.dumps(event, sort_keys=True) + "\n")
     fp.flush()
 
-def recv_exact_tcp(conn: socket.socket, n: int) -> bytes:
-    """Receive exactly n bytes from a TCP stream (or b'' if the server closes)."""
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = conn.recv(n - len(buf))
-        if not chunk:
-            return b""
-        buf.extend(chunk)
-    return bytes(buf)
+def run_tag(clients: int, requests: int, payload_bytes: int, depth: int = 1) -> str:
+    """File name tag for one run, e.g. c10_r100_p512 (or c10_r100_p512_d8 when pipelined)."""
+    tag = f"c{clients}_r{requests}_p{payload_bytes}"
+    return tag + (f"_d{depth}" if depth > 1 else "")
+
+
+class Pacer:
+    """Intended send times for one open-loop client.
+
+    Arrivals are either evenly spaced (with a random phase so clients do not
+    fire in lockstep) or Poisson. Latency is measured from the intended time,
+    not the actual send time, so a stalled server cannot quietly slow the
+    offered load down (HdrHistogram-style coordinated-omission correction)."""
+
+    def __init__(self, rate: float, arrivals: str, start: float, seed: int):
+        self.rate = rate
+        self.poisson = arrivals == "poisson"
+        self.rng = random.Random(seed)
+        self.next = start + self._gap(first=True)
+
+    def _gap(self, first: bool = False) -> float:
+        if self.poisson:
+            return self.rng.expovariate(self.rate)
+        return self.rng.uniform(0.0, 1.0 / self.rate) if first else 1.0 / self.rate
+
+    def advance(self) -> float:
+        """Return the next intended send time and schedule the one after it."""
+        intended = self.next
+        self.next += self._gap()
+        return intended
+
+    def wait(self) -> float:
+        """Sleep until the next intended send time (if it is still ahead) and return it."""
+        intended = self.advance()
+        delay = intended - now_mono()
+        if delay > 0:
+            time.sleep(delay)
+        return intended
+
+    async def async_wait(self) -> float:
+        intended = self.advance()
+        delay = intended - now_mono()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return intended
+
+
+class TokenBucket:
+    """Token-bucket pacer: `rate` sends/s on average, at most `burst` back to back.
+
+    At high rates the gap between sends is far shorter than Python's sleep
+    granularity, so a strict per-send schedule undershoots the target, and
+    a sleep per send caps the rate well below what the sender can do. Once
+    the bucket runs dry it sleeps until half of `burst` has accrued and
+    releases that batch back to back, which keeps the average exact with
+    one sleep per batch; after a longer stall, tokens beyond `burst` are
+    forfeited instead of being owed. This paces offered load
+    (rate search); it does no coordinated-omission correction, so wait()
+    returns the actual send time as the intended one."""
+
+    def __init__(self, rate: float, burst: int, start: float):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.batch = max(1, self.burst // 2)
+        self.tokens = 1.0
+        self.last = start
+
+    def _refill(self) -> float:
+        now = now_mono()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        return now
+
+    def wait(self) -> float:
+        now = self._refill()
+        while self.tokens < 1.0:
+            time.sleep((self.batch - self.tokens) / self.rate)
+            now = self._refill()
+        self.tokens -= 1.0
+        return now
+
+    async def async_wait(self) -> float:
+        now = self._refill()
+        while self.tokens < 1.0:
+            await asyncio.sleep((self.batch - self.tokens) / self.rate)
+            now = self._refill()
+        self.tokens -= 1.0
+        return now
+
+
+BUCKET_BURST = 32  # default --burst: token-bucket depth in sends
+
+
+def make_pacer(pacing: Tuple[float, str, int], client_id: int):
+    """pacing is (per-client rate, arrivals, burst) or None for closed-loop runs.
+    arrivals "bucket" gives a TokenBucket of depth burst, anything else a Pacer."""
+    if not pacing or pacing[0] <= 0:
+        return None
+    rate, arrivals, burst = pacing
+    if arrivals == "bucket":
+        return TokenBucket(rate, burst, now_mono())
+    return Pacer(rate, arrivals, now_mono(), seed=client_id)
+
+
+# cid, seq, send time, intended send time (monotonic ns). The server echoes
+# the header back untouched, so the receiver computes RTT on arrival without
+# keeping any per-packet send record.
+HDR = struct.Struct("!IIQQ")
+
+
+def now_mono_ns() -> int:
+    return time.monotonic_ns()
+
+
+#### streamed result records #####
+# Per-request rows are handed to a resultio.StreamWriter in chunks while the
+# run is going, so client memory is bounded by the chunk buffers rather than
+# by --requests. Every logical client buffers at most chunk_rows(clients) rows.
+RECORD_BUFFER_ROWS = 1 << 18   # rows buffered across all clients of one process
+MIN_CHUNK_ROWS = 64
+MAX_CHUNK_ROWS = 4096
+
+
+def chunk_rows(clients: int) -> int:
+    return min(MAX_CHUNK_ROWS, max(MIN_CHUNK_ROWS, RECORD_BUFFER_ROWS // max(clients, 1)))
+
+
+class RecordBatch:
+    """Rows for one StreamWriter, passed on every `limit` rows."""
+
+    __slots__ = ("sink", "rows", "limit")
+
+    def __init__(self, sink: StreamWriter, limit: int):
+        self.sink = sink
+        self.rows: list = []
+        self.limit = limit
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.limit:
+            self.sink.put(self.rows)
+            self.rows = []
+
+    def flush(self) -> None:
+        if self.rows:
+            self.sink.put(self.rows)
+            self.rows = []
+
+
+def record_batch(sinks: Dict[str, StreamWriter], name: str, limit: int):
+    """RecordBatch for sinks[name], or None when that record stream is off."""
+    sink = (sinks or {}).get(name)
+    return RecordBatch(sink, limit) if sink is not None else None
+
+
+def start_barrier(parties: int, phases: Phases):
+    """Barrier every worker of one process waits on before its first request;
+    the last one to arrive starts the run clock (None when there are no workers)."""
+    return threading.Barrier(parties, action=phases.begin) if parties else None
 
 
-HDR = struct.Struct("!II")  # cid, seq
 def udp_receiver(udp_sock: socket.socket,
                  payload_bytes: int,
                  expected_replies: int,
                  stop_event: threading.Event,
-                 bad_l: int,
-                 bad_sm: int,
-                 recvd: int) -> List[Tuple[int, int, float]]:
+                 counts: Dict[str, int],
+                 hist: LatencyHistogram,
+                 recv_ts: RecordBatch = None,
+                 open_loop: bool = False,
+                 phases: Phases = None,
+                 barrier: threading.Barrier = None,
+                 cell: SeriesCell = None,
+                 rx_ts: RxTimestamps = None,
+                 kernel_hist: LatencyHistogram = None,
+                 rx_hist: LatencyHistogram = None,
+                 split: DelaySplit = None,
+                 seqs: SeqTracker = None) -> float:
     """
-    Receives UDP echoes on the shared socket and records receive timestamps.
-    Returns list of tuples: (cid, seq, recv_time_mono)
+    Receives UDP echoes on the shared socket and computes RTT from the
+    in-band send timestamp as each echo arrives.
+    Bumps counts["received"], counts["bad_len"] and counts["bad_small"], and
+    sets counts["window_replies"] to the echoes of datagrams sent inside the
+    measurement window.
+    Every valid echo sent and received inside the window goes into hist
+    (latency_s when open_loop, else rtt_s).
+    If recv_ts is given it also gets one row per such echo:
+    (cid, seq, recv_time_mono, rtt_s), plus latency_s (from the intended
+    send time) when open_loop is set.
+    With rx_ts (already enabled on udp_sock) echoes are read with recvmsg and
+    the kernel arrival time is kept as well: windowed echoes also go into
+    kernel_hist (send -> kernel arrival) and rx_hist (kernel arrival ->
+    Python wakeup), rows gain kernel_rtt_s and counts["kernel_stamped"]
+    counts the echoes that carried a stamp.
+    With split, echoes carry the server's stamps (server.py --stamp): windowed
+    echoes are split into up/server/down delays and rows gain up_s,
+    server_s, down_s (see clocksync.py).
+    With seqs, every echo is marked in its client's sequence bitmap first and
+    duplicates are dropped (see seqtrack.py).
+    Every valid echo, in the window or not, also goes into cell (see series.py).
+    Returns the monotonic time of the last valid echo (0 if none).
     """
-    recv_ts: List[Tuple[int, int, float]] = []
     idle_timeouts_after_stop = 0
+    last_recv_ns = 0
+    valid = window_replies = 0
+    cell = cell or SeriesCell()
+    if barrier is not None:
+        barrier.wait()
+    phases = phases or Phases()
+    phases.begin()  # no-op once the start barrier has started the clock
+    w_start, w_end, _ = phases.ns()
+    bufsize = payload_bytes + 1024
+    krecv_ns = 0
+    stamped = 0
 
     while True:
         # Stop condition 1: got everything we expect
-        if len(recv_ts) >= expected_replies:
+        if valid >= expected_replies:
             break
 
         try:
-            data, _ = udp_sock.recvfrom(payload_bytes + 1024)
-            recvd += 1
+            if rx_ts is None:
+                data, _ = udp_sock.recvfrom(bufsize)
+                recv_ns = now_mono_ns()
+            else:
+                data, anc, _, _ = udp_sock.recvmsg(bufsize, RX_TS_ANCBUF)
+                recv_ns = now_mono_ns()
+                krecv_ns = rx_ts.mono_ns(anc)
+            counts["received"] += 1
         except socket.timeout:
             if stop_event.is_set():
                 idle_timeouts_after_stop += 1
@@ -68,16 +280,48 @@ def udp_receiver(udp_sock: socket.socket,
             break
 
         if len(data) < HDR.size:
-            bad_sm += 1
+            counts["bad_small"] += 1
             continue
         if len(data) != payload_bytes:
-            bad_l += 1
+            counts["bad_len"] += 1
             continue
 
-        cid, seq = HDR.unpack_from(data, 0)
-        recv_ts.append((cid, seq, now_mono()))
+        cid, seq, send_ns, intended_ns = HDR.unpack_from(data, 0)
+        if seqs is not None and not seqs.add(cid, seq):
+            continue
+        last_recv_ns = recv_ns
+        valid += 1
+        cell.record_ns(recv_ns - send_ns, payload_bytes)
+        if send_ns < w_start:
+            continue
+        if send_ns < w_end:
+            window_replies += 1
+        if recv_ns > w_end:
+            continue
+        hist.record_ns(recv_ns - (intended_ns if open_loop else send_ns))
+        if krecv_ns:
+            stamped += 1
+            kernel_hist.record_ns(max(0, krecv_ns - send_ns))
+            rx_hist.record_ns(max(0, recv_ns - krecv_ns))
+        if split is not None:
+            srv_recv, srv_send = STAMP.unpack_from(data, UDP_STAMP_AT)
+            parts = split.record_ns(send_ns, srv_recv, srv_send, recv_ns)
+        if recv_ts is None:
+            continue
+        row = (cid, seq, recv_ns / 1e9, (recv_ns - send_ns) / 1e9)
+        if open_loop:
+            row += ((recv_ns - intended_ns) / 1e9,)
+        if rx_ts is not None:
+            row += ((krecv_ns - send_ns) / 1e9 if krecv_ns else float("nan"),)
+        if split is not None:
+            row += parts
+        recv_ts.add(row)
 
-    return recv_ts
+    if recv_ts is not None:
+        recv_ts.flush()
+    counts["window_replies"] = window_replies
+    counts["kernel_stamped"] = stamped
+    return last_recv_ns / 1e9
 
 def udp_worker(client_id: int,
                host: str,
@@ -85,76 +329,121 @@ def udp_worker(client_id: int,
                payload_bytes: int,
                requests: int,
                udp_sock: socket.socket,
-               send_tup: List[Tuple[int, int, float]],
-               send_tup_lock: threading.Lock) -> None:
+               pacing: Tuple[float, str, int] = None,
+               phases: Phases = None,
+               barrier: threading.Barrier = None,
+               sent: List[int] = None,
+               cell: SeriesCell = None) -> None:
+    """Send up to `requests` datagrams (stopping at the end of a timed run).
+    sent, if given, is this worker's [datagrams sent, sent inside the window,
+    first seq sent inside the window]; cell.sent counts sends as they happen."""
     if payload_bytes < HDR.size:
         raise ValueError(f"payload_bytes must be >= {HDR.size}")
 
-    filler = b"u" * (payload_bytes - HDR.size)
-    local_send_tup: List[Tuple[int, int, float]] = []
+    # one datagram buffer per worker; only the header is rewritten per send
+    payload = bytearray(b"u" * payload_bytes)
+    addr = (host, port)
+    if barrier is not None:
+        barrier.wait()
+    phases = phases or Phases()
+    phases.begin()  # no-op once the start barrier has started the clock
+    w_start, w_end, end = phases.ns()
+    pacer = make_pacer(pacing, client_id)
+    cell = cell or SeriesCell()
+    n = in_window = first_in_window = 0
 
     for seq in range(requests):
-        payload = HDR.pack(client_id, seq) + filler
-        send_time = now_mono()
-        udp_sock.sendto(payload, (host, port))
-        local_send_tup.append((client_id, seq, send_time))
+        intended_ns = int(pacer.wait() * 1e9) if pacer else 0
+        send_ns = now_mono_ns()
+        if send_ns >= end:
+            break
+        HDR.pack_into(payload, 0, client_id, seq, send_ns, intended_ns or send_ns)
+        udp_sock.sendto(payload, addr)
+        n += 1
+        cell.sent = n
+        if w_start <= send_ns < w_end:
+            if not in_window:
+                first_in_window = seq
+            in_window += 1
+    if sent is not None:
+        sent[0], sent[1], sent[2] = n, in_window, first_in_window
 
-    # publish this worker's sends
-    with send_tup_lock:
-        send_tup.extend(local_send_tup)
+def open_udp_client_socket() -> socket.socket:
+    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    BUF = 16 * 1024 * 1024
+    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUF)
+    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUF)
+    return udp_sock
 
-def run_udp_client(host: str, port: int, log_path: str,
-                   payload_bytes: int, requests: int, clients: int) -> None:
-    """
-    Run UDP client benchmark using ONE shared UDP socket
-    Produces two CSVs:
-      - <log_path>_sent.csv : cid, seq, send_time_mono
-      - <log_path>_recv.csv : cid, seq, recv_time_mono
-    """
+
+def udp_client_threads(host: str, port: int, payload_bytes: int,
+                       requests: int, clients: int, cid_base: int = 0,
+                       pacing: Tuple[float, str, int] = None,
+                       phases: Phases = None,
+                       sinks: Dict[str, StreamWriter] = None,
+                       series: SeriesCells = None,
+                       kernel_ts: str = "off", clock_offset: int = None) -> dict:
+    """One sender thread per logical client plus one receiver thread, sharing ONE UDP socket.
+    kernel_ts "ns"/"sw" also reads kernel receive timestamps (see netio.RxTimestamps)
+    into "kernel_hist" and "rx_hist". With clock_offset (server minus client,
+    ns) the echoes are server-stamped and split into one-way delays under "split".
+    Loss bursts, reordering and duplicates come back under "seq" (see seqtrack.py)."""
     expected_replies = clients * requests
+    phases = phases or Phases()
+    series = series or SeriesCells()
 
-    # Global list of per-worker send tup
-    send_tup: List[Tuple[int, int, float]] = []
-    send_tup_lock = threading.Lock()
-    received = 0
+    counts = {"received": 0, "bad_len": 0, "bad_small": 0}
+    hist = LatencyHistogram()
+    rx_ts = RxTimestamps(kernel_ts) if kernel_ts != "off" else None
+    kernel_hist = LatencyHistogram() if rx_ts else None
+    rx_hist = LatencyHistogram() if rx_ts else None
+    split = DelaySplit(clock_offset) if clock_offset is not None else None
+    seqs = SeqTracker(cid_base, clients, requests)
+    recv_ts = record_batch(sinks, "recv", MAX_CHUNK_ROWS)
     stop_event = threading.Event()
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_sock:
-
-        BUF = 16 * 1024 * 1024
+    # the receiver waits on the start barrier too, so it reads the window only once it is set
+    barrier = start_barrier(clients + 1, phases)
+    sent = [[0, 0, 0] for _ in range(clients)]
+    with open_udp_client_socket() as udp_sock:
         udp_sock.settimeout(0.2)  # lets receiver check stop_event
-        udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUF)
-        udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUF)
+        if rx_ts is not None:
+            rx_ts.enable(udp_sock)
 
-        # Receiver thread returns a list of tuples: (cid, seq, recv_time_mono)
-        recv_holder = [None]  # mutable holder for receiver result since threads can't return
+        # Receiver thread fills hist (and recv_ts rows: (cid, seq, recv_time_mono, rtt_s[, latency_s]))
+        recv_holder = [0.0]  # mutable holder for receiver result since threads can't return
 
-        bad_len = 0
-        bad_small = 0
         def receiver_runner():
             recv_holder[0] = udp_receiver(
                 udp_sock=udp_sock,
                 payload_bytes=payload_bytes,
                 expected_replies=expected_replies,
                 stop_event=stop_event,
-                bad_l=bad_len,
-                bad_sm=bad_small,
-                recvd=received,
+                counts=counts,
+                hist=hist,
+                recv_ts=recv_ts,
+                open_loop=pacing is not None,
+                phases=phases,
+                barrier=barrier,
+                cell=recv_cell,
+                rx_ts=rx_ts,
+                kernel_hist=kernel_hist,
+                rx_hist=rx_hist,
+                split=split,
+                seqs=seqs,
             )
 
+        recv_cell = series.cell()
         recv_thread = threading.Thread(target=receiver_runner, daemon=True)
         recv_thread.start()
 
-        wall_start = now_wall()
-        mono_start = now_mono()
-
-        # Start workers
+        # Start workers; they all send their first datagram off the start barrier
         threads = []
-        for cid in range(clients):
+        for i, cid in enumerate(range(cid_base, cid_base + clients)):
             t = threading.Thread(
                 target=udp_worker,
                 args=(cid, host, port, payload_bytes, requests,
-                      udp_sock, send_tup, send_tup_lock),
+                      udp_sock, pacing, phases, barrier, sent[i], series.cell()),
                 daemon=True
             )
             t.start()
@@ -169,158 +458,1122 @@ def run_udp_client(host: str, port: int, log_path: str,
 
         mono_end = now_mono()
         wall_end = now_wall()
-        elapsed = mono_end - mono_start
+        counts["sock_drops"] = kstats.socket_drops(udp_sock) or 0
 
-    recv_ts: List[Tuple[int, int, float]] = recv_holder[0] or []
+    phases.begin()
+    counts["sent"] = sum(n for n, _, _ in sent)
+    counts["window_sent"] = sum(w for _, w, _ in sent)
+    return {
+        "hist": hist,
+        "kernel_hist": kernel_hist,
+        "rx_hist": rx_hist,
+        "split": split,
+        "seq": seqs.stats([(first, w) for _, w, first in sent]),
+        "last_recv_mono": recv_holder[0],
+        "counts": counts,
+        "phases": phases,
+        "wall_start": phases.t0 + phases.wall_offset,
+        "wall_end": wall_end,
+        "mono_start": phases.t0,
+        "mono_end": mono_end,
+        "elapsed": mono_end - phases.t0,
+    }
 
-    last_recv_time = max((ts for _, _, ts in recv_ts), default=0)
-    # output file names
 
+class _UdpEchoCollector(asyncio.DatagramProtocol):
+    """Receive side of udp_client_asyncio: same records as udp_receiver.
+    window is phases.ns() once the run has started."""
+
+    def __init__(self, payload_bytes: int, expected_replies: int, counts: Dict[str, int],
+                 open_loop: bool = False, recv_ts: RecordBatch = None, cell: SeriesCell = None,
+                 split: DelaySplit = None, seqs: SeqTracker = None):
+        self.payload_bytes = payload_bytes
+        self.split = split
+        self.seqs = seqs
+        self.cell = cell or SeriesCell()
+        self.expected_replies = expected_replies
+        self.counts = counts
+        self.open_loop = open_loop
+        self.hist = LatencyHistogram()
+        self.recv_ts = recv_ts
+        self.window = Phases().ns()
+        self.valid = 0
+        self.window_replies = 0
+        self.last_recv = now_mono()
+        self.last_valid = 0.0
+        self.all_in = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr):
+        recv_ns = now_mono_ns()
+        self.counts["received"] += 1
+        self.last_recv = recv_ns / 1e9
+        if len(data) < HDR.size:
+            self.counts["bad_small"] += 1
+            return
+        if len(data) != self.payload_bytes:
+            self.counts["bad_len"] += 1
+            return
+        cid, seq, send_ns, intended_ns = HDR.unpack_from(data, 0)
+        if self.seqs is not None and not self.seqs.add(cid, seq):
+            return
+        self.last_valid = self.last_recv
+        self.valid += 1
+        self.cell.record_ns(recv_ns - send_ns, self.payload_bytes)
+        if self.valid >= self.expected_replies and not self.all_in.done():
+            self.all_in.set_result(None)
+        w_start, w_end, _ = self.window
+        if send_ns < w_start:
+            return
+        if send_ns < w_end:
+            self.window_replies += 1
+        if recv_ns > w_end:
+            return
+        self.hist.record_ns(recv_ns - (intended_ns if self.open_loop else send_ns))
+        if self.split is not None:
+            srv_recv, srv_send = STAMP.unpack_from(data, UDP_STAMP_AT)
+            parts = self.split.record_ns(send_ns, srv_recv, srv_send, recv_ns)
+        if self.recv_ts is None:
+            return
+        row = (cid, seq, self.last_recv, (recv_ns - send_ns) / 1e9)
+        if self.open_loop:
+            row += ((recv_ns - intended_ns) / 1e9,)
+        if self.split is not None:
+            row += parts
+        self.recv_ts.add(row)
+
+
+UDP_YIELD_EVERY = 64    # sends per logical client before yielding to the event loop
+UDP_IDLE_CUTOFF = 1.0   # seconds without replies after sending stops (same as udp_receiver)
+
+
+def udp_client_asyncio(host: str, port: int, payload_bytes: int,
+                       requests: int, clients: int, cid_base: int = 0,
+                       pacing: Tuple[float, str, int] = None,
+                       phases: Phases = None,
+                       sinks: Dict[str, StreamWriter] = None,
+                       series: SeriesCells = None,
+                       kernel_ts: str = "off", clock_offset: int = None) -> dict:
+    """All logical clients as coroutines on one event loop, sharing ONE UDP socket.
+    asyncio's datagram transport never sees ancillary data, so kernel_ts must be "off"."""
+    if payload_bytes < HDR.size:
+        raise ValueError(f"payload_bytes must be >= {HDR.size}")
+    if kernel_ts != "off":
+        raise ValueError("--kernel-ts needs --engine threads")
+    expected_replies = clients * requests
+    phases = phases or Phases()
+    series = series or SeriesCells()
+    counts = {"received": 0, "bad_len": 0, "bad_small": 0, "sent": 0, "window_sent": 0}
+    seqs = SeqTracker(cid_base, clients, requests)
+    ranges = [(0, 0)] * clients     # (first seq sent inside the window, count) per client
+
+    async def sender(transport, client_id: int):
+        payload = bytearray(b"u" * payload_bytes)
+        addr = (host, port)
+        w_start, w_end, end = phases.ns()
+        pacer = make_pacer(pacing, client_id)
+        cell = series.cell()
+        n = in_window = first_in_window = 0
+        for seq in range(requests):
+            intended_ns = int(await pacer.async_wait() * 1e9) if pacer else 0
+            send_ns = now_mono_ns()
+            if send_ns >= end:
+                break
+            HDR.pack_into(payload, 0, client_id, seq, send_ns, intended_ns or send_ns)
+            # the transport copies the datagram itself if it has to queue it
+            transport.sendto(payload, addr)
+            n += 1
+            cell.sent = n
+            if w_start <= send_ns < w_end:
+                if not in_window:
+                    first_in_window = seq
+                in_window += 1
+            if not pacer and seq % UDP_YIELD_EVERY == UDP_YIELD_EVERY - 1:
+                await asyncio.sleep(0)
+        counts["sent"] += n
+        counts["window_sent"] += in_window
+        ranges[client_id - cid_base] = (first_in_window, in_window)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with open_udp_client_socket() as udp_sock:
+            udp_sock.setblocking(False)
+            transport, proto = await loop.create_datagram_endpoint(
+                lambda: _UdpEchoCollector(payload_bytes, expected_replies, counts,
+                                          pacing is not None,
+                                          record_batch(sinks, "recv", MAX_CHUNK_ROWS),
+                                          series.cell(),
+                                          DelaySplit(clock_offset) if clock_offset is not None else None,
+                                          seqs),
+                sock=udp_sock)
+            try:
+                # every coroutine starts on the same loop iteration, right after this
+                phases.begin()
+                proto.window = phases.ns()
+                await asyncio.gather(*(sender(transport, cid) for cid in range(cid_base, cid_base + clients)))
+
+                # wait for late replies until everything is in or the socket goes idle
+                proto.last_recv = now_mono()
+                while not proto.all_in.done():
+                    idle = now_mono() - proto.last_recv
+                    if idle >= UDP_IDLE_CUTOFF:
+                        break
+                    try:
+                        await asyncio.wait_for(asyncio.shield(proto.all_in), UDP_IDLE_CUTOFF - idle)
+                    except asyncio.TimeoutError:
+                        pass
+
+                mono_end = now_mono()
+                wall_end = now_wall()
+                counts["sock_drops"] = kstats.socket_drops(udp_sock) or 0
+            finally:
+                transport.close()
+                if proto.recv_ts is not None:
+                    proto.recv_ts.flush()
+        counts["window_replies"] = proto.window_replies
+        return {
+            "hist": proto.hist,
+            "split": proto.split,
+            "seq": seqs.stats(ranges),
+            "last_recv_mono": proto.last_valid,
+            "counts": counts,
+            "phases": phases,
+            "wall_start": phases.t0 + phases.wall_offset,
+            "wall_end": wall_end,
+            "mono_start": phases.t0,
+            "mono_end": mono_end,
+            "elapsed": mono_end - phases.t0,
+        }
+
+    return asyncio.run(main())
+
+
+UDP_ENGINES = {
+    "threads": udp_client_threads,
+    "asyncio": udp_client_asyncio,
+}
+
+
+# per-client request count for timed runs, which stop on the clock instead
+UNBOUNDED = sys.maxsize
+
+
+#### multi-process load generation #####
+PROC_START_TIMEOUT = 30.0  # seconds to wait for every worker to reach the start barrier
+
+def split_clients(clients: int, procs: int) -> List[Tuple[int, int]]:
+    """Split the client population into (cid_base, count) slices, one per process."""
+    out = []
+    base = 0
+    for i in range(procs):
+        n = clients // procs + (1 if i < clients % procs else 0)
+        out.append((base, n))
+        base += n
+    return out
+
+
+def _run_streamed(engine_fn, args: tuple, opts: dict, records: Dict[str, tuple],
+                  fmt: str, part: int = None, series: tuple = None,
+                  profile: tuple = None) -> dict:
+    """engine_fn(*args, sinks=..., series=..., **opts) with one StreamWriter per
+    record stream, a SeriesSampler when series is (path_stem, interval) and a
+    StackSampler when profile is (path_stem, hz); with part set it writes that
+    process's part files for merge_parts/merge_series/merge_profiles.
+    The process's resource usage over the run comes back under "resources"."""
+    stem = lambda s: s if part is None else part_stem(s, part)
+    # first, so every thread started below inherits the sampler's signal mask
+    profiler = StackSampler(f"{stem(profile[0])}.collapsed", profile[1]) if profile else None
+    meter = ResourceMeter()
+    sinks = {name: StreamWriter(stem(path), cols, fmt)
+             for name, (path, cols) in (records or {}).items()}
+    cells = SeriesCells()
+    sampler = None
+    if series:
+        path, interval = series
+        sampler = SeriesSampler(f"{stem(path)}.jsonl", interval, opts["phases"], cells.snapshot)
+    try:
+        res = engine_fn(*args, sinks=sinks, series=cells, **opts)
+    finally:
+        profile_stats = profiler.close() if profiler is not None else None
+        writers = {name: w.close() for name, w in sinks.items()}
+        series_stats = sampler.close() if sampler is not None else None
+        resources = meter.close()
+    res["writers"] = writers
+    res["series"] = series_stats
+    res["profile"] = profile_stats
+    res["resources"] = resources
+    return res
+
+
+def _proc_worker(idx: int, engine_fn, args: tuple, opts: dict, cid_base: int, n: int,
+                 cpu, ready, start, results, records: Dict[str, tuple], fmt: str,
+                 series: tuple = None, profile: tuple = None) -> None:
+    """Body of one forked load-generator process."""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    ready.wait(PROC_START_TIMEOUT)
+    # every process shares the start time the barrier recorded
+    opts["phases"].begin(start.value)
+    host, port, payload_bytes, requests = args
+    res = _run_streamed(engine_fn, (host, port, payload_bytes, requests, n),
+                        dict(opts, cid_base=cid_base), records, fmt, part=idx, series=series,
+                        profile=profile)
+    res.update(proc=idx, cid_base=cid_base, clients=n, pid=os.getpid(), cpu=cpu)
+    results.put(res)
+
+
+def run_engine(engine_fn, host: str, port: int, payload_bytes: int, requests: int,
+               clients: int, procs: int = 1, pin_cpus: List[int] = None,
+               records: Dict[str, tuple] = None, fmt: str = "bin",
+               phases: Phases = None, series: tuple = None, profile: tuple = None,
+               **opts) -> dict:
+    """Run engine_fn in this process, or split across `procs` forked processes.
+
+    Extra keyword options are passed through to engine_fn unchanged, and so
+    is phases (the run clock; see phases.py). The result carries the started
+    Phases under "phases".
+    records maps a record stream name (e.g. "rtt") to (path_stem, columns);
+    each stream is written by a StreamWriter during the run and handed to
+    engine_fn as sinks[name]. Writer counters come back under "writers",
+    and each process's CPU / context switch / RSS usage (see rusage.py)
+    under "resources", summed across processes.
+    series, if given, is (path_stem, interval): every process samples its
+    workers' SeriesCells into <path_stem>.jsonl (see series.py), and the
+    sampler's counters come back under "series".
+    profile, if given, is (path_stem, hz): every process runs a StackSampler
+    (see profiler.py) into <path_stem>.collapsed, and its counters, including
+    its own overhead, come back under "profile".
+
+    Each process gets a contiguous slice of client ids, so ids stay globally
+    unique, and they all start off one barrier, which also fixes the shared
+    run start time. CLOCK_MONOTONIC is shared by every process on the host,
+    so the merged records keep one time base.
+    Each process streams to its own part files, concatenated at the end."""
+    opts["phases"] = phases = phases or Phases()
+    procs = min(procs, clients)     # a process with no clients would only add empty per_proc entries
+    if procs <= 1:
+        return _run_streamed(engine_fn, (host, port, payload_bytes, requests, clients),
+                             opts, records, fmt, series=series, profile=profile)
+    if pin_cpus:
+        bad = set(pin_cpus) - os.sched_getaffinity(0)
+        if bad:
+            raise SystemExit(f"--pin-cpus: CPUs {sorted(bad)} are not available to this process")
+
+    ctx = mp.get_context("fork")
+    start = ctx.Value("d", 0.0)
+
+    def mark_start():
+        start.value = now_mono()
+
+    ready = ctx.Barrier(procs + 1, action=mark_start)
+    results = ctx.Queue()
+    workers = []
+    for i, (cid_base, n) in enumerate(split_clients(clients, procs)):
+        cpu = pin_cpus[i % len(pin_cpus)] if pin_cpus else None
+        p = ctx.Process(target=_proc_worker,
+                        args=(i, engine_fn, (host, port, payload_bytes, requests), opts,
+                              cid_base, n, cpu, ready, start, results, records, fmt, series,
+                              profile),
+                        daemon=True)
+        p.start()
+        workers.append(p)
+
+    ready.wait(PROC_START_TIMEOUT)
+    phases.begin(start.value)
+    per_proc = []
+    while len(per_proc) < procs:
+        try:
+            per_proc.append(results.get(timeout=1.0))
+        except queue.Empty:
+            if not any(p.is_alive() for p in workers) and results.empty():
+                break
+    for p in workers:
+        p.join()
+
+    per_proc.sort(key=lambda r: r["proc"])
+    merged = {"errors": [f"proc={i}: exited without results"
+                         for i in range(procs) if i not in {r["proc"] for r in per_proc}]}
+    merged["writers"] = {}
+    for name, (stem, _) in (records or {}).items():
+        merge_parts(stem, fmt, procs)
+        stats = merged["writers"][name] = {}
+        for r in per_proc:
+            for k, v in r["writers"].get(name, {}).items():
+                stats[k] = max(stats.get(k, 0), v) if k == "max_queued" else stats.get(k, 0) + v
+    merged["series"] = None
+    if series:
+        stem, _ = series
+        merged["series"] = stats = dict(per_proc[0]["series"]) if per_proc else {}
+        stats["path"] = os.path.basename(f"{stem}.jsonl")
+        stats["samples"] = merge_series([f"{part_stem(stem, i)}.jsonl" for i in range(procs)],
+                                        f"{stem}.jsonl")
+        stats["sample_s"] = sum(r["series"]["sample_s"] for r in per_proc)
+    merged["profile"] = None
+    if profile:
+        merged["profile"] = merge_profiles([r["profile"] for r in per_proc], profile[0], procs)
+    for key in ("hist", "kernel_hist", "rx_hist"):
+        hists = [r[key] for r in per_proc if r.get(key) is not None]
+        merged[key] = LatencyHistogram() if key == "hist" or hists else None
+        for h in hists:
+            merged[key].merge(h)
+    splits = [r["split"] for r in per_proc if r.get("split") is not None]
+    merged["split"] = DelaySplit(splits[0].offset_ns) if splits else None
+    for sp in splits:
+        merged["split"].merge(sp)
+    if any("seq" in r for r in per_proc):
+        merged["seq"] = merge_seq_stats([r.get("seq") for r in per_proc])
+    if any("last_recv_mono" in r for r in per_proc):
+        merged["last_recv_mono"] = max(r.get("last_recv_mono", 0.0) for r in per_proc)
+    for r in per_proc:
+        merged["errors"].extend(r.get("errors", []))
+        if "counts" in r:
+            counts = merged.setdefault("counts", {})
+            for k, v in r["counts"].items():
+                counts[k] = counts.get(k, 0) + v
+    merged["resources"] = merge_usage([r["resources"] for r in per_proc])
+    merged["phases"] = phases
+    merged["mono_start"] = min((r["mono_start"] for r in per_proc), default=0.0)
+    merged["mono_end"] = max((r["mono_end"] for r in per_proc), default=0.0)
+    merged["elapsed"] = merged["mono_end"] - merged["mono_start"]
+    merged["wall_start"] = min((r["wall_start"] for r in per_proc), default=0.0)
+    merged["wall_end"] = max((r["wall_end"] for r in per_proc), default=0.0)
+    merged["per_proc"] = [
+        {k: r[k] for k in ("proc", "pid", "cpu", "cid_base", "clients", "elapsed", "resources")}
+        for r in per_proc
+    ]
+    return merged
+
+
+def run_udp_client(host: str, port: int, log_path: str,
+                   payload_bytes: int, requests: int, clients: int,
+                   engine: str = "threads", procs: int = 1,
+                   pin_cpus: List[int] = None,
+                   rate: float = 0.0, arrivals: str = "constant",
+                   raw: bool = True, fmt: str = "bin", phases: Phases = None,
+                   series_interval: float = 0.0, burst: int = BUCKET_BURST,
+                   profile_hz: float = 0.0, kernel_ts: str = "off",
+                   stamp: bool = False) -> None:
+    """
+    Run UDP client benchmark using ONE shared UDP socket
+    Produces:
+      - udp_hist_<tag>.json : latency histogram (see hist.py)
+      - udp_recv_<tag>.bin  : cid, seq, recv_time_mono, rtt_s[, latency_s][, kernel_rtt_s]
+        [, up_s, server_s, down_s]
+        (only when raw is set; .csv with fmt="csv", see resultio.py)
+      - udp_hist_kernel_<tag>.json : send -> kernel arrival histogram
+        (only when kernel_ts is "ns" or "sw", see netio.RxTimestamps)
+      - udp_hist_{up,server,down}_<tag>.json : one-way delay split
+        (only when stamp is set, see clocksync.py)
+      - udp_series_<tag>.jsonl : counters every series_interval seconds
+        (only when series_interval > 0, see series.py)
+      - udp_profile_<tag>.collapsed : sampled stacks, flamegraph input
+        (only when profile_hz > 0, see profiler.py)
+    RTT comes from the send timestamp carried in each datagram's header.
+    With rate > 0 (requests/sec across all clients) sends are open-loop and
+    latency_s is measured from the intended send time instead.
+    With a timed phases (duration > 0) every client sends until the run ends
+    and `requests` is ignored. Loss and latency cover the measurement window
+    only: expected_replies is the datagrams sent inside it.
+    arrivals="bucket" paces with a TokenBucket of depth burst.
+    The meta also records the kernel counter deltas over the run ("kernel",
+    see kstats.py), sock_drops, the datagrams the kernel dropped on the
+    client's own sockets (receive buffer overflow), and the client's CPU
+    cost per echo ("resources", see rusage.py).
+    With kernel_ts the meta adds "kernel_latency" (RTT to the kernel's arrival
+    stamp) and "rx_delay" (arrival stamp to the receiver thread's wakeup),
+    which separate network time from the client's own scheduling delay.
+    With stamp the RTT is also split into one-way delays and server time
+    using the server's stamps, as in run_tcp_client.
+    "loss_pattern" describes the loss (burst lengths), reordering (rate and
+    distance) and duplicates (rate) seen in the per-client sequence numbers;
+    duplicates are not counted as replies (see seqtrack.py).
+    """
+    phases = phases or Phases()
+    pacing = (rate / clients, arrivals, burst) if rate > 0 else None
+    kernel_rx = kernel_ts != "off"
+    if stamp and payload_bytes < PROBE_BYTES:
+        raise ValueError(f"--stamp needs --payload-bytes >= {PROBE_BYTES} for UDP")
+    # output file names
     os.makedirs(log_path, exist_ok=True)
-    sent_csv = os.path.join(log_path, f"udp_sent_c{clients}_r{requests}_p{payload_bytes}.csv")
-    recv_csv = os.path.join(log_path, f"udp_recv_c{clients}_r{requests}_p{payload_bytes}.csv")
-    jsonmeta = os.path.join(log_path, f"udp_meta_c{clients}_r{requests}_p{payload_bytes}.json")
-
-    # Write CSV: sent
-    with open(sent_csv, "w", newline="") as fp:
-        w = csv.writer(fp)
-        w.writerow(["cid", "seq", "send_time_mono"])
-        for cid, seq, ts in send_tup:
-            w.writerow([cid, seq, ts])
-
-    # Write CSV: recv
-    with open(recv_csv, "w", newline="") as fp:
-        w = csv.writer(fp)
-        w.writerow(["cid", "seq", "recv_time_mono"])
-        for cid, seq, ts in recv_ts:
-            w.writerow([cid, seq, ts])
+    tag = run_tag(clients, requests, payload_bytes)
+    hist_json = os.path.join(log_path, f"udp_hist_{tag}.json")
+    kernel_hist_json = os.path.join(log_path, f"udp_hist_kernel_{tag}.json")
+    split_json = os.path.join(log_path, f"udp_hist_{{}}_{tag}.json")
+    jsonmeta = os.path.join(log_path, f"udp_meta_{tag}.json")
+
+    # per-echo records are streamed to disk during the run
+    records = {}
+    if raw:
+        records["recv"] = (os.path.join(log_path, f"udp_recv_{tag}"),
+                           UDP_RECV_COLS + ([LATENCY_COL] if pacing else [])
+                           + ([KERNEL_RTT_COL] if kernel_rx else [])
+                           + (SPLIT_COLS if stamp else []))
+    series = (os.path.join(log_path, f"udp_series_{tag}"), series_interval) if series_interval > 0 else None
+    profile = (os.path.join(log_path, f"udp_profile_{tag}"), profile_hz) if profile_hz > 0 else None
+    clock = estimate_offset(host, port) if stamp else None
+    kernel_before = kstats.snapshot()
+    res = run_engine(UDP_ENGINES[engine], host, port, payload_bytes,
+                     UNBOUNDED if phases.timed else requests, clients,
+                     procs=procs, pin_cpus=pin_cpus, records=records, fmt=fmt,
+                     phases=phases, series=series, profile=profile, pacing=pacing,
+                     kernel_ts=kernel_ts, clock_offset=clock["offset_ns"] if clock else None)
+    kernel = kstats.delta(kernel_before, kstats.snapshot())
+    hist: LatencyHistogram = res["hist"]
+    counts = res["counts"]
+    expected_replies = counts["window_sent"]
+    hist.save(hist_json)
+    if kernel_rx:
+        res["kernel_hist"].save(kernel_hist_json)
+    if stamp:
+        res["split"].save(split_json)
 
     # Write JSON metadata 
     with open(jsonmeta, "w") as fp:
         log_event(fp, {
             "event": "client_run",
             "proto": "udp",
+            "engine": engine,
+            "procs": procs,
+            "per_proc": res.get("per_proc"),
+            "rate": rate,
+            "arrivals": arrivals if rate > 0 else None,
+            "burst": burst if rate > 0 and arrivals == "bucket" else None,
             "host": host,
             "port": port,
             "payload_bytes": payload_bytes,
             "requests": requests,
             "clients": clients,
             "expected_replies": expected_replies,
-            "start_ts": wall_start,
-            "end_ts": wall_end,
-            "elapsed_s": elapsed,
-            "lost_replies": expected_replies - len(recv_ts),
-            "last_recv_package_ts": last_recv_time,
-            "bad_len": bad_len,
-            "bad_small": bad_small,
-            "received": received,
+            "start_ts": res["wall_start"],
+            "end_ts": res["wall_end"],
+            "elapsed_s": res["elapsed"],
+            "window": res["phases"].to_dict(res["mono_end"]),
+            "sent": counts["sent"],
+            "completed": hist.count,
+            "lost_replies": expected_replies - counts["window_replies"],
+            "last_recv_package_ts": res["last_recv_mono"],
+            "bad_len": counts["bad_len"],
+            "bad_small": counts["bad_small"],
+            "received": counts["received"],
+            "sock_drops": counts["sock_drops"],
+            "kernel": kernel,
+            "resources": efficiency(res["resources"], counts["received"], payload_bytes),
+            "raw_records": raw,
+            "result_format": fmt,
+            "writers": res["writers"],
+            "series": res["series"],
+            "profile": res["profile"],
+            "kernel_ts": kernel_ts if kernel_rx else None,
+            "kernel_stamped": counts["kernel_stamped"] if kernel_rx else None,
+            "latency": hist.summary(),
+            "kernel_latency": res["kernel_hist"].summary() if kernel_rx else None,
+            "rx_delay": res["rx_hist"].summary() if kernel_rx else None,
+            "stamp": stamp,
+            "clock": clock,
+            "delay_split": res["split"].summary() if stamp else None,
+            "loss_pattern": loss_pattern(res.get("seq")),
         })
 
 
 
 
-def tcp_client_worker(client_id: int, con_info: tuple, lock: threading.Lock, all_rtts: List[Tuple[int, int, float]], all_conn_setup: List[Tuple[int, float]], errors: List[str]) -> None:
+#### UDP throughput search (RFC 2544 style) #####
+# Binary search for the highest offered rate the echo path sustains with a
+# loss rate at or below a threshold. Each probe is a short timed run at a
+# token-bucket paced rate on a fresh socket; loss is counted over its
+# measurement window only, so the warmup absorbs socket and cache setup and
+# stray replies from an earlier probe can never be miscounted. RFC 2544 asks
+# for zero loss over 60 s trials; with loss_threshold=0 and a long
+# probe_s this is the same search.
+
+SEARCH_WARMUP_S = 0.5        # unmeasured lead-in of every probe
+SEARCH_MAX_PROBES = 20       # hard cap on probes after the ceiling is known
+SENDER_LIMIT = 0.95          # a probe offering less than this share of its target was sender-bound
+
+
+def udp_probe(host: str, port: int, payload_bytes: int, clients: int, rate: float,
+              probe_s: float, engine: str = "threads", procs: int = 1,
+              pin_cpus: List[int] = None, burst: int = BUCKET_BURST) -> dict:
+    """One timed probe at `rate` datagrams/s (0 = unpaced); returns its loss and latency."""
+    pacing = (rate / clients, "bucket", burst) if rate > 0 else None
+    res = run_engine(UDP_ENGINES[engine], host, port, payload_bytes, UNBOUNDED, clients,
+                     procs=procs, pin_cpus=pin_cpus, records={},
+                     phases=Phases(probe_s, SEARCH_WARMUP_S), pacing=pacing)
+    counts = res["counts"]
+    window = res["phases"].to_dict(res["mono_end"])
+    sent, replies = counts["window_sent"], counts["window_replies"]
+    measured = window["measured_s"] or probe_s
+    offered = sent / measured
+    return {
+        "rate": rate,
+        "offered_pps": offered,
+        "received_pps": replies / measured,
+        "sent": sent,
+        "replies": replies,
+        "loss_rate": (sent - replies) / sent if sent else 1.0,
+        "sock_drops": counts["sock_drops"],
+        "sender_limited": rate > 0 and offered < SENDER_LIMIT * rate,
+        "latency": res["hist"].summary(),
+    }
+
+
+def run_udp_rate_search(host: str, port: int, log_path: str, payload_bytes: int,
+                        clients: int, engine: str = "threads", procs: int = 1,
+                        pin_cpus: List[int] = None, loss_threshold: float = 0.001,
+                        probe_s: float = 2.0, rate_min: float = 0.0, rate_max: float = 0.0,
+                        resolution: float = 0.01, burst: int = BUCKET_BURST) -> dict:
+    """
+    Find the highest UDP rate (datagrams/s across all clients) with
+    loss_rate <= loss_threshold. Produces:
+      - udp_ratesearch_c<clients>_p<payload>.json : every probe (rate vs loss
+        curve, in probe order) and the sustainable rate
+    Without rate_max the ceiling is measured first with one unpaced probe.
+    The search tries the ceiling, then halves [last pass, last fail] until
+    the interval is within `resolution` of its upper end. A probe flagged
+    sender_limited could not offer its target, so the ceiling drops to the
+    rate it did offer (never below the last pass); if it passed, that rate is
+    the most this sender can pace and the search ends there. The sustainable
+    rate reported is the rate the best passing probe actually offered, with
+    sender_bound set if that probe was sender-limited.
+    """
+    if not 0.0 <= loss_threshold < 1.0:
+        raise ValueError("--loss-threshold must be in [0, 1)")
+    if resolution <= 0 or probe_s <= 0:
+        raise ValueError("--search-resolution and --probe-duration must be > 0")
+    os.makedirs(log_path, exist_ok=True)
+    out_path = os.path.join(log_path, f"udp_ratesearch_c{clients}_p{payload_bytes}.json")
+    start_ts = now_wall()
+    probes: List[dict] = []
+
+    def probe(rate: float) -> dict:
+        r = udp_probe(host, port, payload_bytes, clients, rate, probe_s,
+                      engine=engine, procs=procs, pin_cpus=pin_cpus, burst=burst)
+        r["passed"] = r["loss_rate"] <= loss_threshold
+        probes.append(r)
+        print(f"[UDP] probe rate={rate:.0f}/s offered={r['offered_pps']:.0f}/s "
+              f"loss={r['loss_rate']:.4%} {'pass' if r['passed'] else 'FAIL'}"
+              f"{' (sender-limited)' if r['sender_limited'] else ''}")
+        return r
+
+    hi = rate_max
+    if hi <= 0:
+        hi = probe(0.0)["offered_pps"]
+    lo, best, sender_bound = rate_min, None, False
+    for _ in range(SEARCH_MAX_PROBES):
+        if hi <= lo or hi - lo <= resolution * hi:
+            break
+        # first probe tries the ceiling; a pass there ends the search
+        rate = hi if not probes or probes[-1]["rate"] == 0.0 else (lo + hi) / 2
+        r = probe(rate)
+        better = r["passed"] and (best is None or r["offered_pps"] > best["offered_pps"])
+        if r["sender_limited"]:
+            # the unpaced ceiling is out of reach when paced: this is as fast
+            # as the sender goes, and a pass proves only the rate it offered
+            hi = max(r["offered_pps"], lo)
+            if r["passed"]:
+                if better:
+                    best, sender_bound = r, True
+                break
+        elif r["passed"]:
+            lo = rate
+            if better:
+                best, sender_bound = r, False
+            if rate == hi:
+                break
+        else:
+            hi = rate
+
+    result = {
+        "event": "udp_rate_search",
+        "proto": "udp",
+        "engine": engine,
+        "procs": procs,
+        "host": host,
+        "port": port,
+        "payload_bytes": payload_bytes,
+        "clients": clients,
+        "burst": burst,
+        "loss_threshold": loss_threshold,
+        "probe_s": probe_s,
+        "warmup_s": SEARCH_WARMUP_S,
+        "resolution": resolution,
+        "start_ts": start_ts,
+        "end_ts": now_wall(),
+        "probes": probes,
+        "sustainable_rate": best["offered_pps"] if best else None,
+        "sustainable_latency": best["latency"] if best else None,
+        "sender_bound": sender_bound,
+    }
+    with open(out_path, "w") as fp:
+        log_event(fp, result)
+    rate = result["sustainable_rate"]
+    print(f"[UDP] sustainable rate: {'none' if rate is None else f'{rate:.0f}'} datagrams/s"
+          f"{' (sender-bound)' if sender_bound else ''} -> {out_path}")
+    return result
+
+
+#### pipelined TCP #####
+# With --pipeline-depth K each connection keeps up to K requests in flight.
+# The echo is a byte stream of equal-sized replies in request order, so a
+# reply is complete whenever the cumulative received bytes cross another
+# payload boundary; each reply is matched FIFO to its request's send time.
+# Once a timed run is over no new requests go out, and the ones still in
+# flight are drained. Both loops return the number of replies received.
+
+def tcp_pipeline_loop(s: socket.socket, client_id: int, payload: bytes,
+                      requests: int, depth: int, hist: LatencyHistogram,
+                      rtts: RecordBatch = None, phases: Phases = None,
+                      cell: SeriesCell = None) -> int:
+    phases = phases or Phases()
+    w_start, w_end, stop = phases.ns()
+    cell = cell or SeriesCell()
+    payload_bytes = len(payload)
+    rbuf = bytearray(depth * payload_bytes)
+    view = memoryview(rbuf)
+    send_times: Deque[int] = deque()
+    done = 0
+    sent = 0
+    partial = 0     # bytes of the next reply already received
+
+    while done < requests:
+        n = min(depth - len(send_times), requests - sent)
+        if n > 0:
+            ts = now_mono_ns()
+            if ts < stop:
+                # refill the window with one vectored write
+                sendmsg_all(s, [payload] * n)
+                send_times.extend([ts] * n)
+                sent += n
+                cell.sent = sent
+            elif not send_times:
+                break
+
+        k = s.recv_into(view[:len(send_times) * payload_bytes - partial])
+        end = now_mono_ns()
+        if not k:
+            raise RuntimeError("Server closed connection early.")
+        partial += k
+        while partial >= payload_bytes:
+            partial -= payload_bytes
+            ts = send_times.popleft()
+            cell.record_ns(end - ts, payload_bytes)
+            if w_start <= ts and end <= w_end:
+                hist.record_ns(end - ts)
+                if rtts is not None:
+                    rtts.add((client_id, done, (end - ts) / 1e9))
+            done += 1
+    return done
+
+
+async def tcp_pipeline_loop_async(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  client_id: int, payload: bytes, requests: int,
+                                  depth: int, hist: LatencyHistogram,
+                                  rtts: RecordBatch = None, phases: Phases = None,
+                                  cell: SeriesCell = None) -> int:
+    phases = phases or Phases()
+    w_start, w_end, stop = phases.ns()
+    cell = cell or SeriesCell()
+    payload_bytes = len(payload)
+    send_times: Deque[int] = deque()
+    done = 0
+    sent = 0
+    partial = 0
 
+    while done < requests:
+        n = min(depth - len(send_times), requests - sent)
+        if n > 0:
+            ts = now_mono_ns()
+            if ts < stop:
+                writer.writelines([payload] * n)
+                await writer.drain()
+                send_times.extend([ts] * n)
+                sent += n
+                cell.sent = sent
+            elif not send_times:
+                break
+
+        data = await reader.read(len(send_times) * payload_bytes - partial)
+        end = now_mono_ns()
+        if not data:
+            raise RuntimeError("Server closed connection early.")
+        partial += len(data)
+        while partial >= payload_bytes:
+            partial -= payload_bytes
+            ts = send_times.popleft()
+            cell.record_ns(end - ts, payload_bytes)
+            if w_start <= ts and end <= w_end:
+                hist.record_ns(end - ts)
+                if rtts is not None:
+                    rtts.add((client_id, done, (end - ts) / 1e9))
+            done += 1
+    return done
+
+
+def tcp_client_worker(client_id: int, con_info: tuple, lock: threading.Lock, sinks: Dict[str, StreamWriter], errors: List[str],
+                      hist: LatencyHistogram, pacing: Tuple[float, str, int] = None, depth: int = 1,
+                      chunk: int = MAX_CHUNK_ROWS, phases: Phases = None,
+                      barrier: threading.Barrier = None, counts: Dict[str, int] = None,
+                      cell: SeriesCell = None, split: DelaySplit = None) -> None:
+    """One client connection. Latencies go into a thread-local histogram that is
+    merged into hist at the end; rows go to sinks["rtt"]/sinks["conn"] in chunks.
+    Only requests inside the measurement window are recorded; every completed
+    request is added to counts["completed"] and, as it happens, to cell.
+    With split, replies are server-stamped and split the same way (depth 1 only)."""
     host, port, requests, payload_bytes = con_info
+    cell = cell or SeriesCell()
     payload = b"x" * payload_bytes
+    rbuf = RecvBuffer(payload_bytes)
+    local_hist = LatencyHistogram()
+    local_split = DelaySplit(split.offset_ns) if split is not None else None
+    done = 0
+    if barrier is not None:
+        barrier.wait()
+    phases = phases or Phases()
+    phases.begin()  # no-op once the start barrier has started the clock
+    w_start, w_end, stop = phases.ns()
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
 
             # Measure TCP connection setup
-            t0 = now_mono()
+            t0 = now_mono_ns()
             s.connect((host, port))
-            t1 = now_mono()
-            conn_setup = t1 - t0
+            t1 = now_mono_ns()
+            conn_setup = (t1 - t0) / 1e9
 
-            local_rtts: List[Tuple[int, int, float]] = []
-
-            for req_i in range(requests):
+            if "conn" in sinks:
+                sinks["conn"].put([(client_id, conn_setup)])
+            local_rtts = record_batch(sinks, "rtt", chunk)
+            pacer = make_pacer(pacing, client_id)
+            if depth > 1:
+                done = tcp_pipeline_loop(s, client_id, payload, requests, depth, local_hist,
+                                         local_rtts, phases, cell)
+            else:
+                for req_i in range(requests):
                 
-                start = now_mono()
-                s.sendall(payload)
-                echoed = recv_exact_tcp(s, payload_bytes)
-                end = now_mono()
+                    intended = int(pacer.wait() * 1e9) if pacer else 0
+                    start = now_mono_ns()
+                    if start >= stop:
+                        break
+                    cell.sent += 1
+                    s.sendall(payload)
+                    echoed = recv_exact_tcp(s, payload_bytes, rbuf)
+                    end = now_mono_ns()
 
-                if not echoed:
-                    raise RuntimeError("Server closed connection early.")
-                if len(echoed) != payload_bytes:
-                    raise RuntimeError("Incorrect payload size.")
-
-                local_rtts.append((client_id, req_i, end - start))
+                    if not echoed:
+                        raise RuntimeError("Server closed connection early.")
+                    if len(echoed) != payload_bytes:
+                        raise RuntimeError("Incorrect payload size.")
+                    done += 1
+                    cell.record_ns(end - start, payload_bytes)
 
+                    # warmup/cooldown requests are echoed but not recorded
+                    if start < w_start or end > w_end:
+                        continue
+                    # latency from the intended send time (coordinated-omission corrected)
+                    local_hist.record_ns(end - intended if pacer else end - start)
+                    if local_split is not None:
+                        srv_recv, srv_send = STAMP.unpack_from(echoed, TCP_STAMP_AT)
+                        parts = local_split.record_ns(start, srv_recv, srv_send, end)
+                    if local_rtts is None:
+                        continue
+                    row = (client_id, req_i, (end - start) / 1e9)
+                    if pacer:
+                        row += ((end - intended) / 1e9,)
+                    if local_split is not None:
+                        row += parts
+                    local_rtts.add(row)
 
-            with lock:
-                all_conn_setup.append((client_id, conn_setup))
-                all_rtts.extend(local_rtts)
+            if local_rtts is not None:
+                local_rtts.flush()
 
     except Exception as e:
         with lock:
             errors.append(f"client_id={client_id}: {repr(e)}")
+    finally:
+        with lock:
+            hist.merge(local_hist)
+            if split is not None:
+                split.merge(local_split)
+            if counts is not None:
+                counts["completed"] += done
 
 
-def run_tcp_client(host: str, port: int, log_path: str,
-                   payload_bytes: int, requests: int, clients: int) -> None:
-    
-    """Run the TCP client benchmark (CSV data + JSON metadata)."""
+def tcp_client_threads(host: str, port: int, payload_bytes: int,
+                       requests: int, clients: int, cid_base: int = 0,
+                       pacing: Tuple[float, str, int] = None, depth: int = 1,
+                       phases: Phases = None,
+                       sinks: Dict[str, StreamWriter] = None,
+                       series: SeriesCells = None, clock_offset: int = None) -> dict:
+    """One OS thread (and connection) per logical client, all released by one start barrier."""
+    series = series or SeriesCells()
     lock = threading.Lock()
-    all_rtts: List[Tuple[int, int, float]] = []      # (cid, req_i, rtt)
-    all_conn_setup: List[Tuple[int, float]] = []     # (cid, conn_setup)
+    sinks = sinks or {}
     errors: List[str] = []
+    hist = LatencyHistogram()
+    split = DelaySplit(clock_offset) if clock_offset is not None else None
+    counts = {"completed": 0}
+    phases = phases or Phases()
+    barrier = start_barrier(clients, phases)
 
     conn_info = (host, port, requests, payload_bytes)  # reuse this tuple to avoid passing many args to worker
-    # Run timing window
-    wall_start = now_wall()
-    mono_start = now_mono()
 
     threads = []
-    for cid in range(clients):
-        t = threading.Thread(target=tcp_client_worker, args=(cid, conn_info, lock, all_rtts, all_conn_setup, errors), daemon=True)
+    for cid in range(cid_base, cid_base + clients):
+        t = threading.Thread(target=tcp_client_worker,
+                             args=(cid, conn_info, lock, sinks, errors, hist, pacing, depth,
+                                   chunk_rows(clients), phases, barrier, counts, series.cell(),
+                                   split),
+                             daemon=True)
         t.start()
         threads.append(t)
 
     for t in threads:
         t.join()
 
+    # Run timing window: from the start barrier to the last worker finishing
+    mono_end = now_mono()
+    wall_end = now_wall()
+    phases.begin()
+    return {
+        "hist": hist,
+        "split": split,
+        "errors": errors,
+        "counts": counts,
+        "phases": phases,
+        "wall_start": phases.t0 + phases.wall_offset,
+        "wall_end": wall_end,
+        "mono_start": phases.t0,
+        "mono_end": mono_end,
+        "elapsed": mono_end - phases.t0,
+    }
+
+
+async def tcp_client_coro(client_id: int, con_info: tuple, sinks: Dict[str, StreamWriter],
+                          errors: List[str], hist: LatencyHistogram,
+                          pacing: Tuple[float, str, int] = None, depth: int = 1,
+                          chunk: int = MAX_CHUNK_ROWS, phases: Phases = None,
+                          counts: Dict[str, int] = None, cell: SeriesCell = None,
+                          split: DelaySplit = None) -> None:
+    """Coroutine twin of tcp_client_worker; no lock needed on a single event loop,
+    so every coroutine records straight into the one shared hist (and split)."""
+    host, port, requests, payload_bytes = con_info
+    cell = cell or SeriesCell()
+    payload = b"x" * payload_bytes
+    phases = phases or Phases()
+    w_start, w_end, stop = phases.ns()
+    writer = None
+    done = 0
+    try:
+        # Measure TCP connection setup
+        t0 = now_mono_ns()
+        reader, writer = await asyncio.open_connection(host, port)
+        t1 = now_mono_ns()
+        conn_setup = (t1 - t0) / 1e9
+
+        if "conn" in sinks:
+            sinks["conn"].put([(client_id, conn_setup)])
+        local_rtts = record_batch(sinks, "rtt", chunk)
+        pacer = make_pacer(pacing, client_id)
+        if depth > 1:
+            done = await tcp_pipeline_loop_async(reader, writer, client_id, payload, requests,
+                                                 depth, hist, local_rtts, phases, cell)
+        else:
+            for req_i in range(requests):
+                intended = int(await pacer.async_wait() * 1e9) if pacer else 0
+                start = now_mono_ns()
+                if start >= stop:
+                    break
+                cell.sent += 1
+                writer.write(payload)
+                await writer.drain()
+                try:
+                    echoed = await reader.readexactly(payload_bytes)
+                except asyncio.IncompleteReadError:
+                    raise RuntimeError("Server closed connection early.")
+                end = now_mono_ns()
+                done += 1
+                cell.record_ns(end - start, payload_bytes)
+
+                if start < w_start or end > w_end:
+                    continue
+                hist.record_ns(end - intended if pacer else end - start)
+                if split is not None:
+                    srv_recv, srv_send = STAMP.unpack_from(echoed, TCP_STAMP_AT)
+                    parts = split.record_ns(start, srv_recv, srv_send, end)
+                if local_rtts is None:
+                    continue
+                row = (client_id, req_i, (end - start) / 1e9)
+                if pacer:
+                    row += ((end - intended) / 1e9,)
+                if split is not None:
+                    row += parts
+                local_rtts.add(row)
+
+        if local_rtts is not None:
+            local_rtts.flush()
+
+    except Exception as e:
+        errors.append(f"client_id={client_id}: {repr(e)}")
+    finally:
+        if counts is not None:
+            counts["completed"] += done
+        if writer is not None:
+            writer.close()
+
+
+def tcp_client_asyncio(host: str, port: int, payload_bytes: int,
+                       requests: int, clients: int, cid_base: int = 0,
+                       pacing: Tuple[float, str, int] = None, depth: int = 1,
+                       phases: Phases = None,
+                       sinks: Dict[str, StreamWriter] = None,
+                       series: SeriesCells = None, clock_offset: int = None) -> dict:
+    """All logical clients as coroutines on one event loop (one connection each)."""
+    series = series or SeriesCells()
+    sinks = sinks or {}
+    errors: List[str] = []
+    hist = LatencyHistogram()
+    split = DelaySplit(clock_offset) if clock_offset is not None else None
+    counts = {"completed": 0}
+    phases = phases or Phases()
+    conn_info = (host, port, requests, payload_bytes)
+
+    async def main():
+        # every coroutine starts on the same loop iteration, right after this
+        phases.begin()
+        await asyncio.gather(*(tcp_client_coro(cid, conn_info, sinks, errors, hist, pacing,
+                                               depth, chunk_rows(clients), phases, counts,
+                                               series.cell(), split)
+                               for cid in range(cid_base, cid_base + clients)))
+
+    asyncio.run(main())
     mono_end = now_mono()
     wall_end = now_wall()
-    elapsed = mono_end - mono_start
+    return {
+        "hist": hist,
+        "split": split,
+        "errors": errors,
+        "counts": counts,
+        "phases": phases,
+        "wall_start": phases.t0 + phases.wall_offset,
+        "wall_end": wall_end,
+        "mono_start": phases.t0,
+        "mono_end": mono_end,
+        "elapsed": mono_end - phases.t0,
+    }
+
+
+TCP_ENGINES = {
+    "threads": tcp_client_threads,
+    "asyncio": tcp_client_asyncio,
+}
+
+
+def run_tcp_client(host: str, port: int, log_path: str,
+                   payload_bytes: int, requests: int, clients: int,
+                   engine: str = "threads", procs: int = 1,
+                   pin_cpus: List[int] = None,
+                   rate: float = 0.0, arrivals: str = "constant",
+                   pipeline_depth: int = 1, raw: bool = True, fmt: str = "bin",
+                   phases: Phases = None, series_interval: float = 0.0,
+                   burst: int = BUCKET_BURST, profile_hz: float = 0.0,
+                   stamp: bool = False) -> None:
+    
+    """Run the TCP client benchmark (per-request records + JSON metadata).
+
+    Latencies always go into tcp_hist_<tag>.json (see hist.py) and the meta's
+    "latency" summary; the per-request RTT records are written only when raw
+    is set. Records go to columnar .bin files, or .csv with fmt="csv".
+    With rate > 0 (requests/sec across all clients) requests are open-loop and
+    the RTT records gain latency_s, measured from each request's intended send time.
+    With pipeline_depth > 1 each connection keeps that many requests in flight
+    and the output file names gain a _d<depth> suffix.
+    With a timed phases (duration > 0) every connection runs until the run
+    ends and `requests` is ignored; total_requests counts only the requests
+    inside the measurement window.
+    With series_interval > 0 the run's counters are also sampled that often
+    into tcp_series_<tag>.jsonl (see series.py), and with profile_hz > 0
+    every thread's stack is sampled into tcp_profile_<tag>.collapsed (see
+    profiler.py).
+    The meta records kernel counter deltas over the run under "kernel"
+    (retransmits, listen overflows; see kstats.py) and the client's CPU cost
+    per request under "resources" (see rusage.py).
+    With stamp (server.py --stamp too) the client first estimates the server's
+    clock offset ("clock"), then splits every request into request one-way
+    delay, server time and response one-way delay: extra up_s/server_s/down_s
+    columns, tcp_hist_{up,server,down}_<tag>.json and a "delay_split" summary
+    (see clocksync.py)."""
+    if pipeline_depth > 1 and rate > 0:
+        raise ValueError("--pipeline-depth > 1 cannot be combined with --rate")
+    if stamp and pipeline_depth > 1:
+        raise ValueError("--stamp cannot be combined with --pipeline-depth > 1")
+    if stamp and payload_bytes < STAMP.size:
+        raise ValueError(f"--stamp needs --payload-bytes >= {STAMP.size}")
+    phases = phases or Phases()
+    pacing = (rate / clients, arrivals, burst) if rate > 0 else None
 
     os.makedirs(log_path, exist_ok=True)
     # output file names
-    rtt_csv = os.path.join(log_path, f"tcp_rtt_c{clients}_r{requests}_p{payload_bytes}.csv")
-    conn_csv = os.path.join(log_path, f"tcp_conn_c{clients}_r{requests}_p{payload_bytes}.csv")
-    jsonmeta = os.path.join(log_path, f"tcp_meta_c{clients}_r{requests}_p{payload_bytes}.json")
-
-    # Write RTT CSV 
-    with open(rtt_csv, "w", newline="") as fp:
-        w = csv.writer(fp)
-        w.writerow(["client_id", "request_index", "rtt_s"])
-        for row in all_rtts:
-            w.writerow(row)
-
-    # Write connection setup CSV 
-    with open(conn_csv, "w", newline="") as fp:
-        w = csv.writer(fp)
-        w.writerow(["client_id", "conn_setup_s"])
-        for row in all_conn_setup:
-            w.writerow(row)
+    tag = run_tag(clients, requests, payload_bytes, pipeline_depth)
+    hist_json = os.path.join(log_path, f"tcp_hist_{tag}.json")
+    split_json = os.path.join(log_path, f"tcp_hist_{{}}_{tag}.json")
+    jsonmeta = os.path.join(log_path, f"tcp_meta_{tag}.json")
+
+    # RTT and connection setup records are streamed to disk during the run
+    records = {"conn": (os.path.join(log_path, f"tcp_conn_{tag}"), TCP_CONN_COLS)}
+    if raw:
+        records["rtt"] = (os.path.join(log_path, f"tcp_rtt_{tag}"),
+                          TCP_RTT_COLS + ([LATENCY_COL] if pacing else [])
+                          + (SPLIT_COLS if stamp else []))
+    series = (os.path.join(log_path, f"tcp_series_{tag}"), series_interval) if series_interval > 0 else None
+    profile = (os.path.join(log_path, f"tcp_profile_{tag}"), profile_hz) if profile_hz > 0 else None
+    clock = estimate_offset(host, port) if stamp else None
+    kernel_before = kstats.snapshot()
+    res = run_engine(TCP_ENGINES[engine], host, port, payload_bytes,
+                     UNBOUNDED if phases.timed else requests, clients,
+                     procs=procs, pin_cpus=pin_cpus, records=records, fmt=fmt,
+                     phases=phases, series=series, profile=profile, pacing=pacing,
+                     depth=pipeline_depth, clock_offset=clock["offset_ns"] if clock else None)
+    kernel = kstats.delta(kernel_before, kstats.snapshot())
+    hist: LatencyHistogram = res["hist"]
+    errors: List[str] = res["errors"]
+    hist.save(hist_json)
+    if stamp:
+        res["split"].save(split_json)
 
     # Write JSON metadata
     with open(jsonmeta, "w") as fp:
         log_event(fp, {
             "event": "client_run",
             "proto": "tcp",
+            "engine": engine,
+            "pipeline_depth": pipeline_depth,
+            "procs": procs,
+            "per_proc": res.get("per_proc"),
+            "rate": rate,
+            "arrivals": arrivals if rate > 0 else None,
+            "burst": burst if rate > 0 and arrivals == "bucket" else None,
             "host": host,
             "port": port,
             "clients": clients,
             "requests": requests,
             "payload_bytes": payload_bytes,
-            "start_ts": wall_start,
-            "end_ts": wall_end,
-            "elapsed": elapsed,
-            "total_requests": len(all_rtts),
+            "start_ts": res["wall_start"],
+            "end_ts": res["wall_end"],
+            "elapsed": res["elapsed"],
+            "window": res["phases"].to_dict(res["mono_end"]),
+            "total_requests": hist.count,
+            "completed_requests": res["counts"]["completed"],
             "errors": errors,
-            
+            "kernel": kernel,
+            "resources": efficiency(res["resources"], res["counts"]["completed"], payload_bytes),
+            "raw_records": raw,
+            "result_format": fmt,
+            "writers": res["writers"],
+            "series": res["series"],
+            "profile": res["profile"],
+            "stamp": stamp,
+            "clock": clock,
+            "latency": hist.summary(),
+            "delay_split": res["split"].summary() if stamp else None,
         })
 
 
@@ -334,17 +1587,88 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--requests", type=int, default=1)
     p.add_argument("--clients", type=int, default=1)
     p.add_argument("--log", required=True)
+    p.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                   help="run logical clients as OS threads or as coroutines on one event loop")
+    p.add_argument("--procs", type=int, default=1,
+                   help="split --clients across N load-generator processes")
+    p.add_argument("--pin-cpus", type=lambda v: [int(x) for x in v.split(",")], default=None,
+                   help="comma-separated CPUs to pin --procs workers to (round-robin, Linux)")
+    p.add_argument("--rate", type=float, default=0.0,
+                   help="open-loop offered load in requests/sec across all clients (0 = closed loop)")
+    p.add_argument("--arrivals", choices=["constant", "poisson", "bucket"], default="constant",
+                   help="inter-arrival distribution for --rate (bucket: token bucket, see --burst)")
+    p.add_argument("--burst", type=int, default=BUCKET_BURST,
+                   help="token-bucket depth in sends per client for --arrivals bucket / --search-rate")
+    p.add_argument("--pipeline-depth", type=int, default=1,
+                   help="TCP requests kept in flight per connection (depth * payload should fit in socket buffers)")
+    p.add_argument("--no-raw", dest="raw", action="store_false",
+                   help="skip the per-request records; latencies are still kept in the histogram")
+    p.add_argument("--format", dest="fmt", choices=["bin", "csv"], default="bin",
+                   help="per-request record files: columnar binary (see resultio.py) or CSV")
+    p.add_argument("--duration", type=float, default=0.0,
+                   help="measure for this many seconds instead of sending --requests per client")
+    p.add_argument("--warmup", type=float, default=0.0,
+                   help="seconds after the start barrier before measurement begins")
+    p.add_argument("--cooldown", type=float, default=0.0,
+                   help="seconds of unmeasured load after the --duration window")
+    p.add_argument("--series-interval", type=float, default=0.0,
+                   help="sample throughput/latency/loss counters every N seconds into *_series_*.jsonl (0 = off)")
+    p.add_argument("--profile", type=float, nargs="?", const=PROFILE_HZ, default=0.0, metavar="HZ",
+                   help=f"sample every thread's stack HZ times per CPU-second (default {PROFILE_HZ:g}) "
+                        "into *_profile_*.collapsed")
+    p.add_argument("--kernel-ts", choices=RX_TS_MODES, default="off",
+                   help="UDP, threads engine: also time echoes from the kernel's receive timestamp "
+                        "(ns = SO_TIMESTAMPNS, sw = SO_TIMESTAMPING software stamps)")
+    p.add_argument("--stamp", action="store_true",
+                   help="split RTT into one-way delays and server time from server-stamped echoes "
+                        "(needs server.py --stamp)")
+    p.add_argument("--search-rate", action="store_true",
+                   help="UDP only: binary-search the highest rate with loss <= --loss-threshold")
+    p.add_argument("--loss-threshold", type=float, default=0.001,
+                   help="--search-rate: highest loss rate a probe may show and still pass")
+    p.add_argument("--probe-duration", type=float, default=2.0,
+                   help="--search-rate: measured seconds per probe")
+    p.add_argument("--rate-min", type=float, default=0.0,
+                   help="--search-rate: lower end of the search (datagrams/s)")
+    p.add_argument("--rate-max", type=float, default=0.0,
+                   help="--search-rate: upper end of the search (0 = measure it with one unpaced probe)")
+    p.add_argument("--search-resolution", type=float, default=0.01,
+                   help="--search-rate: stop once the pass/fail interval is this fraction of its upper end")
     return p.parse_args()
 
 def main() -> None:
     """Entry point."""
     args = parse_args()
-    if args.proto == "tcp":
+    # more processes than clients would leave some with nothing to do
+    args.procs = max(1, min(args.procs, args.clients))
+    phases = Phases(args.duration, args.warmup, args.cooldown)
+    if args.kernel_ts != "off" and (args.proto != "udp" or args.search_rate):
+        raise SystemExit("--kernel-ts is for plain UDP runs only")
+    if args.stamp and args.search_rate:
+        raise SystemExit("--stamp cannot be combined with --search-rate")
+    if args.search_rate:
+        if args.proto != "udp":
+            raise SystemExit("--search-rate is UDP only")
+        run_udp_rate_search(args.host, args.port, args.log, args.payload_bytes, args.clients,
+                            engine=args.engine, procs=args.procs, pin_cpus=args.pin_cpus,
+                            loss_threshold=args.loss_threshold, probe_s=args.probe_duration,
+                            rate_min=args.rate_min, rate_max=args.rate_max,
+                            resolution=args.search_resolution, burst=args.burst)
+    elif args.proto == "tcp":
         run_tcp_client(args.host, args.port, args.log,
-                       args.payload_bytes, args.requests, args.clients)
+                       args.payload_bytes, args.requests, args.clients,
+                       engine=args.engine, procs=args.procs, pin_cpus=args.pin_cpus,
+                       rate=args.rate, arrivals=args.arrivals,
+                       pipeline_depth=args.pipeline_depth, raw=args.raw, fmt=args.fmt,
+                       phases=phases, series_interval=args.series_interval, burst=args.burst,
+                       profile_hz=args.profile, stamp=args.stamp)
     else:
         run_udp_client(args.host, args.port, args.log,
-                       args.payload_bytes, args.requests, args.clients)
+                       args.payload_bytes, args.requests, args.clients,
+                       engine=args.engine, procs=args.procs, pin_cpus=args.pin_cpus,
+                       rate=args.rate, arrivals=args.arrivals, raw=args.raw, fmt=args.fmt,
+                       phases=phases, series_interval=args.series_interval, burst=args.burst,
+                       profile_hz=args.profile, kernel_ts=args.kernel_ts, stamp=args.stamp)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Server-stamped echoes and client/server clock offset (client.py and server.py --stamp).
+
+In stamped mode the server writes two monotonic-ns times into every echo
+before sending it: when the request was read (t1) and just before the reply
+was written (t2). UDP replies carry them right after the client header
+(client.HDR, 24 bytes); TCP replies carry them in the first 16 bytes of each
+request. With the client's own send (t0) and receive (t3) times an echo then
+splits into request one-way delay, server residence time and response
+one-way delay, as soon as the server clock is known relative to the client's.
+
+estimate_offset() measures that offset the way NTP does: PROBES small UDP
+probes to the server's port, each giving offset = ((t1 - t0) + (t2 - t3)) / 2
+and delay = (t3 - t0) - (t2 - t1). The probe with the lowest delay is the one
+least disturbed by queueing, and its offset is used; the true offset lies
+within delay / 2 of it ("error_ns"). On one host both ends read the same
+clock, so the offset is ~0 and the error is the loopback round trip. Across
+hosts the split is only as good as that error, and it assumes the path is
+symmetric.
+
+A stamped UDP server answers probes on its echo socket without counting
+them as echoes. A TCP server has no UDP socket, so it runs a ClockResponder
+on the same port number (UDP and TCP ports do not collide).
+"""
+import socket
+import struct
+import threading
+import time
+from typing import Optional
+
+from hist import LatencyHistogram
+
+STAMP = struct.Struct("!QQ")        # server receive, server send (server monotonic ns)
+UDP_STAMP_AT = 24                   # after client.HDR (!IIQQ)
+TCP_STAMP_AT = 0
+PROBE = struct.Struct("!IIQQ")      # same layout as client.HDR
+PROBE_CID = 0xFFFFFFFF              # client id reserved for clock probes
+PROBE_TAG = PROBE.pack(PROBE_CID, 0, 0, 0)[:4]
+PROBE_BYTES = UDP_STAMP_AT + STAMP.size
+PROBES = 32                         # probes per estimate
+PROBE_TIMEOUT_S = 0.2               # per-probe wait before it counts as lost
+RESPONDER_POLL_S = 0.2
+
+
+def stamp_into(buf, at: int, recv_ns: int) -> None:
+    """Write (recv_ns, now) at offset `at` of a writable reply buffer."""
+    STAMP.pack_into(buf, at, recv_ns, time.monotonic_ns())
+
+
+def is_probe(data) -> bool:
+    return data[:4] == PROBE_TAG
+
+
+class ClockResponder:
+    """Answers clock probes on a UDP socket of its own until close()."""
+
+    def __init__(self, bind: str, port: int, reuseport: bool = False):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuseport:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind((bind, port))
+        self.sock.settimeout(RESPONDER_POLL_S)
+        self.answered = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="clock", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        buf = bytearray(PROBE_BYTES)
+        while not self.stop_event.is_set():
+            try:
+                n, addr = self.sock.recvfrom_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            recv_ns = time.monotonic_ns()
+            if n != PROBE_BYTES or not is_probe(buf):
+                continue
+            stamp_into(buf, UDP_STAMP_AT, recv_ns)
+            self.sock.sendto(buf, addr)
+            self.answered += 1
+
+    def close(self) -> int:
+        """Stop answering; returns the number of probes answered."""
+        self.stop_event.set()
+        self.thread.join()
+        self.sock.close()
+        return self.answered
+
+
+def estimate_offset(host: str, port: int, probes: int = PROBES,
+                    timeout: float = PROBE_TIMEOUT_S) -> dict:
+    """Server clock minus client clock (monotonic ns) from the best of `probes`
+    UDP probes. Raises RuntimeError if the server answered none of them,
+    which usually means it was started without --stamp."""
+    best = None
+    replies = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect((host, port))
+        buf = bytearray(PROBE_BYTES)
+        for seq in range(probes):
+            t0 = time.monotonic_ns()
+            PROBE.pack_into(buf, 0, PROBE_CID, seq, t0, t0)
+            sock.send(buf)
+            while True:
+                try:
+                    data = sock.recv(PROBE_BYTES + 1)
+                except socket.timeout:
+                    data = None
+                    break
+                t3 = time.monotonic_ns()
+                # a late reply to an earlier probe is skipped, not misread
+                if len(data) == PROBE_BYTES and PROBE.unpack_from(data, 0)[1] == seq:
+                    break
+            if data is None:
+                continue
+            t1, t2 = STAMP.unpack_from(data, UDP_STAMP_AT)
+            replies += 1
+            delay = (t3 - t0) - (t2 - t1)
+            if best is None or delay < best[0]:
+                best = (delay, ((t1 - t0) + (t2 - t3)) // 2)
+    if best is None:
+        raise RuntimeError(f"no clock probe answered by {host}:{port} (is the server running with --stamp?)")
+    return {
+        "offset_ns": best[1],
+        "delay_ns": best[0],
+        "error_ns": best[0] // 2,
+        "probes": probes,
+        "replies": replies,
+    }
+
+
+class DelaySplit:
+    """Request one-way delay, server time and response one-way delay of stamped echoes.
+
+    offset_ns is estimate_offset()'s server-minus-client offset. Negative
+    one-way delays (an offset error larger than the delay itself) are kept
+    as is in the records returned by record_ns and clamped to 0 in the
+    histograms."""
+
+    __slots__ = ("offset_ns", "up", "server", "down")
+
+    def __init__(self, offset_ns: int):
+        self.offset_ns = offset_ns
+        self.up = LatencyHistogram()
+        self.server = LatencyHistogram()
+        self.down = LatencyHistogram()
+
+    def record_ns(self, t0: int, t1: int, t2: int, t3: int) -> tuple:
+        """Record one echo; returns (up_s, server_s, down_s)."""
+        up = t1 - self.offset_ns - t0
+        srv = t2 - t1
+        down = t3 - (t2 - self.offset_ns)
+        self.up.record_ns(up)
+        self.server.record_ns(srv)
+        self.down.record_ns(down)
+        return up / 1e9, srv / 1e9, down / 1e9
+
+    def merge(self, other: Optional["DelaySplit"]) -> "DelaySplit":
+        if other is not None:
+            self.up.merge(other.up)
+            self.server.merge(other.server)
+            self.down.merge(other.down)
+        return self
+
+    def summary(self) -> dict:
+        return {"up": self.up.summary(), "server": self.server.summary(),
+                "down": self.down.summary()}
+
+    def save(self, path_fmt: str) -> None:
+        """Save the three histograms to path_fmt.format("up"|"server"|"down")."""
+        for part in ("up", "server", "down"):
+            getattr(self, part).save(path_fmt.format(part))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Control channel of a long-lived `server.py --daemon`.
+
+The daemon listens on a side TCP port (CONTROL_PORT by default) and takes
+one JSON object per line; every request gets one JSON line back with "ok"
+and either the result or "error". A controller keeps its connection open
+for a whole sweep; the daemon serves one controller at a time.
+
+Commands ("cmd"):
+  ping                 -> pid, proto_version, busy
+  start-run            proto, payload_bytes, clients, requests, plus any
+                       RUN_OPTIONS; replies once the run is listening
+                       -> run (sequence number)
+  end-run [timeout]    stops the run (UDP), or waits up to timeout seconds
+                       for its clients to finish (TCP) -> run, server
+                       (the run's server JSON, also written to the log dir)
+  status               -> busy, run, spec
+  shutdown             ends any run and stops the daemon
+
+The daemon can also listen on a Unix socket (--control-bind /path), which
+reaches it across network namespaces (sweep.py --mode netns). A HOST that
+starts with "/" is such a path.
+
+Anyone who can reach the control port can start runs, so bind it to a
+trusted network or reach it through an SSH tunnel.
+
+Usage: python3 control.py HOST[:PORT]|/SOCKET CMD [key=value ...]
+"""
+import json
+import socket
+import sys
+from typing import Optional
+
+CONTROL_PORT = 5100
+PROTO_VERSION = 1
+MAX_LINE = 1 << 24              # a server JSON with per_worker fits easily
+END_RUN_TIMEOUT_S = 60.0        # default wait for a TCP run's clients
+
+# start-run fields; the first four are required
+RUN_FIELDS = {
+    "proto": str,
+    "payload_bytes": int,
+    "clients": int,
+    "requests": int,
+}
+RUN_OPTIONS = {
+    "engine": str,
+    "pool_size": int,
+    "workers": int,
+    "udp_loop": str,
+    "duration": float,
+    "warmup": float,
+    "cooldown": float,
+    "series_interval": float,
+    "profile": float,
+    "stamp": bool,
+}
+
+
+class ControlError(RuntimeError):
+    """The daemon answered a request with ok=false."""
+
+
+def check_spec(spec: dict) -> dict:
+    """The start-run fields of spec, type-checked; raises ValueError."""
+    out = {}
+    for name, kind in RUN_FIELDS.items():
+        if name not in spec:
+            raise ValueError(f"start-run needs {name}")
+        out[name] = kind(spec[name])
+    for name, kind in RUN_OPTIONS.items():
+        if spec.get(name) is not None:
+            out[name] = kind(spec[name])
+    unknown = set(spec) - set(RUN_FIELDS) - set(RUN_OPTIONS) - {"cmd"}
+    if unknown:
+        raise ValueError(f"unknown start-run fields: {sorted(unknown)}")
+    if out["proto"] not in ("tcp", "udp"):
+        raise ValueError("proto must be tcp or udp")
+    return out
+
+
+def is_unix(host: str) -> bool:
+    return host.startswith("/")
+
+
+def send_line(conn: socket.socket, obj: dict) -> None:
+    conn.sendall(json.dumps(obj, sort_keys=True).encode() + b"\n")
+
+
+class LineReader:
+    """Newline-delimited JSON from a stream socket."""
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.buf = bytearray()
+
+    def read(self) -> Optional[dict]:
+        """Next object, or None once the peer has closed."""
+        while True:
+            i = self.buf.find(b"\n")
+            if i >= 0:
+                line = bytes(self.buf[:i])
+                del self.buf[:i + 1]
+                return json.loads(line)
+            if len(self.buf) > MAX_LINE:
+                raise ValueError("control line too long")
+            data = self.conn.recv(65536)
+            if not data:
+                return None
+            self.buf += data
+
+
+class ControlClient:
+    """One persistent connection to a server daemon."""
+
+    def __init__(self, host: str, port: int = CONTROL_PORT, timeout: float = None):
+        if is_unix(host):
+            self.conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.conn.settimeout(timeout)
+            try:
+                self.conn.connect(host)
+            except OSError:
+                self.conn.close()
+                raise
+        else:
+            self.conn = socket.create_connection((host, port), timeout=timeout)
+        self.reader = LineReader(self.conn)
+
+    def request(self, cmd: str, **fields) -> dict:
+        send_line(self.conn, dict(fields, cmd=cmd))
+        reply = self.reader.read()
+        if reply is None:
+            raise ConnectionError("server daemon closed the control connection")
+        if not reply.get("ok"):
+            raise ControlError(reply.get("error", "request failed"))
+        return reply
+
+    def start_run(self, proto: str, payload_bytes: int, clients: int, requests: int,
+                  **options) -> int:
+        return self.request("start-run", proto=proto, payload_bytes=payload_bytes,
+                            clients=clients, requests=requests, **options)["run"]
+
+    def end_run(self, timeout: float = END_RUN_TIMEOUT_S) -> dict:
+        """The finished run's server JSON."""
+        return self.request("end-run", timeout=timeout)["server"]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _value(text: str):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return {"true": True, "false": False}.get(text.lower(), text)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    host, _, port = sys.argv[1].partition(":") if not is_unix(sys.argv[1]) else (sys.argv[1], "", "")
+    fields = dict(arg.split("=", 1) for arg in sys.argv[3:])
+    with ControlClient(host, int(port or CONTROL_PORT)) as ctl:
+        try:
+            reply = ctl.request(sys.argv[2], **{k: _value(v) for k, v in fields.items()})
+        except ControlError as e:
+            raise SystemExit(f"error: {e}")
+    print(json.dumps(reply, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Fixed-memory, mergeable latency histogram (HdrHistogram-style log buckets).
+"""
+import json
+from array import array
+from typing import Dict, Optional
+
+SUB_BITS = 7                  # 2**7 sub-buckets per power of two: <= 1/64 (~1.6%) relative error
+SUB_COUNT = 1 << SUB_BITS
+HALF = SUB_COUNT >> 1
+MAX_EXP = 36                  # values up to 2**36 ns (~68 s); larger values land in the top bucket
+N_BUCKETS = SUB_COUNT + (MAX_EXP - SUB_BITS) * HALF
+
+SUMMARY_QUANTILES = [("p50", 50.0), ("p90", 90.0), ("p99", 99.0), ("p99_9", 99.9)]
+
+
+def bucket_index(ns: int) -> int:
+    if ns < SUB_COUNT:
+        return ns if ns > 0 else 0
+    shift = ns.bit_length() - SUB_BITS
+    idx = SUB_COUNT + (shift - 1) * HALF + ((ns >> shift) - HALF)
+    return idx if idx < N_BUCKETS else N_BUCKETS - 1
+
+
+def bucket_value(idx: int) -> int:
+    """Midpoint (in ns) of the values that map to bucket idx."""
+    if idx < SUB_COUNT:
+        return idx
+    shift = (idx - SUB_COUNT) // HALF + 1
+    low = ((idx - SUB_COUNT) % HALF + HALF) << shift
+    return low + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    """Counts latencies in N_BUCKETS log-spaced buckets backed by one array.
+
+    Memory is constant (~16 KiB) no matter how many values are recorded, two
+    histograms merge by adding their arrays, and percentiles are answered by
+    one scan over the buckets instead of sorting raw samples."""
+
+    __slots__ = ("counts", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * N_BUCKETS))
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def record_ns(self, ns: int) -> None:
+        if ns < 0:
+            ns = 0
+        self.counts[bucket_index(ns)] += 1
+        if self.count == 0 or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.total_ns += ns
+
+    def record(self, seconds: float) -> None:
+        self.record_ns(int(seconds * 1e9))
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if other.count == 0:
+            return self
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.min_ns = other.min_ns if self.count == 0 else min(self.min_ns, other.min_ns)
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.count += other.count
+        self.total_ns += other.total_ns
+        return self
+
+    def percentile(self, q: float) -> float:
+        """Value (seconds) at percentile q in [0, 100], or NaN when empty."""
+        if self.count == 0:
+            return float("nan")
+        if q >= 100.0:
+            return self.max_ns / 1e9
+        rank = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= rank:
+                    ns = min(max(bucket_value(i), self.min_ns), self.max_ns)
+                    return ns / 1e9
+        return self.max_ns / 1e9
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """count/min/mean/p50/p90/p99/p99_9/max, in seconds. An empty histogram
+        (e.g. a run whose connections were all refused) gives None for every
+        value, so the JSON it ends up in stays strict (no NaN)."""
+        out = {"count": self.count}
+        if self.count == 0:
+            out.update(dict.fromkeys(["min", "mean"] + [name for name, _ in SUMMARY_QUANTILES]
+                                     + ["max"]))
+            return out
+        out["min"] = self.min_ns / 1e9
+        out["mean"] = self.total_ns / self.count / 1e9
+        for name, q in SUMMARY_QUANTILES:
+            out[name] = self.percentile(q)
+        out["max"] = self.max_ns / 1e9
+        return out
+
+    def to_dict(self) -> dict:
+        """Sparse JSON-friendly form: only non-empty buckets are listed."""
+        return {
+            "sub_bits": SUB_BITS,
+            "max_exp": MAX_EXP,
+            "count": self.count,
+            "total_ns": self.total_ns,
+            "min_ns": self.min_ns,
+            "max_ns": self.max_ns,
+            "buckets": [[i, c] for i, c in enumerate(self.counts) if c],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        if d.get("sub_bits") != SUB_BITS or d.get("max_exp") != MAX_EXP:
+            raise ValueError("histogram was written with a different bucket layout")
+        h = cls()
+        for i, c in d["buckets"]:
+            h.counts[i] = c
+        h.count = d["count"]
+        h.total_ns = d["total_ns"]
+        h.min_ns = d["min_ns"]
+        h.max_ns = d["max_ns"]
+        return h
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as fp:
+            json.dump(self.to_dict(), fp)
+            fp.write("\n")
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyHistogram":
+        with open(path, "r", encoding="utf-8") as fp:
+            return cls.from_dict(json.load(fp))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Kernel network counters around a run (Linux /proc), used to attribute UDP
+loss and TCP retransmits to a cause.
+
+snapshot() reads the protocol counters in /proc/net/snmp and
+/proc/net/netstat; delta() keeps the KERNEL_COUNTERS that changed between
+two snapshots. These counters cover the whole network namespace, so other
+traffic on the host (and, over loopback, the other end of the benchmark)
+shows up in them too. socket_drops() reads the per-socket drop count from
+/proc/net/udp{,6}, which covers exactly one socket.
+
+Everything returns None where /proc is unavailable (non-Linux), so the JSON
+logs carry null instead of the run failing.
+"""
+import os
+import socket
+from typing import Dict, Optional
+
+SNMP_FILES = ("/proc/net/snmp", "/proc/net/netstat")
+UDP_TABLES = ("/proc/net/udp", "/proc/net/udp6")
+
+# counters kept in the JSON logs ("<group>.<name>" as in /proc)
+KERNEL_COUNTERS = (
+    "Ip.InDiscards",            # dropped on input before reaching a protocol
+    "Ip.OutDiscards",
+    "Udp.InDatagrams",
+    "Udp.OutDatagrams",
+    "Udp.InErrors",             # includes RcvbufErrors and checksum errors
+    "Udp.RcvbufErrors",         # receive queue full: the reader fell behind
+    "Udp.SndbufErrors",         # send queue full (or no buffer) on sendto
+    "Udp.NoPorts",              # nothing bound: the reply outlived its socket
+    "Udp.MemErrors",
+    "Tcp.ActiveOpens",
+    "Tcp.PassiveOpens",
+    "Tcp.AttemptFails",
+    "Tcp.EstabResets",
+    "Tcp.RetransSegs",
+    "Tcp.InErrs",
+    "Tcp.OutRsts",
+    "TcpExt.ListenOverflows",   # accept queue full when a handshake completed
+    "TcpExt.ListenDrops",
+    "TcpExt.TCPTimeouts",
+    "TcpExt.TCPLostRetransmit",
+    "TcpExt.TCPBacklogDrop",
+)
+
+
+def _read_table(path: str, out: Dict[str, int]) -> None:
+    """Parse the "Group: name name ..." / "Group: value value ..." line pairs."""
+    with open(path, "r") as fp:
+        lines = fp.read().splitlines()
+    for names, values in zip(lines[::2], lines[1::2]):
+        group, _, names = names.partition(":")
+        for name, value in zip(names.split(), values.partition(":")[2].split()):
+            out[f"{group}.{name}"] = int(value)
+
+
+def snapshot() -> Optional[Dict[str, int]]:
+    """Every counter in SNMP_FILES, or None when /proc/net is not there."""
+    out: Dict[str, int] = {}
+    for path in SNMP_FILES:
+        try:
+            _read_table(path, out)
+        except (OSError, ValueError):
+            continue
+    return out or None
+
+
+def delta(before: Optional[Dict[str, int]], after: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """after - before for every KERNEL_COUNTERS entry both snapshots have."""
+    if before is None or after is None:
+        return None
+    return {k: after[k] - before[k] for k in KERNEL_COUNTERS if k in before and k in after}
+
+
+def socket_drops(sock: socket.socket) -> Optional[int]:
+    """Datagrams the kernel dropped on this UDP socket since it was opened
+    (the "drops" column of /proc/net/udp, matched by socket inode).
+    Read it before the socket is closed: the row goes away with it."""
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+    except OSError:
+        return None
+    for path in UDP_TABLES:
+        try:
+            with open(path, "r") as fp:
+                next(fp, None)  # header
+                for line in fp:
+                    cols = line.split()
+                    if len(cols) > 12 and cols[9] == inode:
+                        return int(cols[12])
+        except OSError:
+            continue
+    return None
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
-import csv
 from pathlib import Path
 import matplotlib.pyplot as plt
+import numpy as np
+
+import resultio
+from hist import LatencyHistogram
 
 PAYLOADS = [64, 512, 1024, 4096, 8192]
 CLIENTS_LIST = [1, 10]
@@ -13,54 +16,9 @@ PLOTS_DIR = BASE_DIR / "plots"
 PLOTS_DIR.mkdir(exist_ok=True)
 
 def percentile(values, q: float) -> float:
-    if not values:
+    if len(values) == 0:
         return float("nan")
-    xs = sorted(values)
-    k = int(round((q / 100.0) * (len(xs) - 1)))
-    return xs[k]
-
-def read_tcp_rtts(path: Path):
-    vals = []
-    with path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    vals.append(float(row[2]))
-                except ValueError:
-                    pass
-    return vals
-
-def read_udp_rtts(sent_path: Path, recv_path: Path):
-    sent = {}
-    with sent_path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    sent[(int(row[0]), int(row[1]))] = float(row[2])
-                except ValueError:
-                    pass
-
-    rtts = []
-    with recv_path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    key = (int(row[0]), int(row[1]))
-                    rt = float(row[2])
-                except ValueError:
-                    continue
-                st = sent.get(key)
-                if st is not None:
-                    rtt = rt - st
-                    if rtt >= 0:
-                        rtts.append(rtt)
-    return rtts
+    return float(np.percentile(values, q))
 
 def collect_percentiles(q):
     data = {
@@ -70,22 +28,30 @@ def collect_percentiles(q):
         ("udp", 10): [],
     }
 
+    # runs that wrote a latency histogram are read from it; --no-raw runs
+    # have nothing else, and it saves sorting every raw sample
     for c in CLIENTS_LIST:
         for p in PAYLOADS:
             # TCP
-            tcp_path = RESULTS_DIR / f"tcp_rtt_c{c}_r{REQUESTS}_p{p}.csv"
-            if tcp_path.exists():
-                vals = read_tcp_rtts(tcp_path)
-                data[("tcp", c)].append(percentile(vals, q))
+            tag = f"c{c}_r{REQUESTS}_p{p}"
+            tcp_hist = RESULTS_DIR / f"tcp_hist_{tag}.json"
+            tcp_cols = None if tcp_hist.exists() else resultio.load(RESULTS_DIR, f"tcp_rtt_{tag}")
+            if tcp_hist.exists():
+                data[("tcp", c)].append(LatencyHistogram.load(tcp_hist).percentile(q))
+            elif tcp_cols is not None:
+                # open-loop runs carry latency_s (from the intended send time);
+                # prefer it so coordinated omission does not hide the tail
+                data[("tcp", c)].append(percentile(resultio.latencies(tcp_cols), q))
             else:
                 data[("tcp", c)].append(float("nan"))
 
             # UDP
-            sent_path = RESULTS_DIR / f"udp_sent_c{c}_r{REQUESTS}_p{p}.csv"
-            recv_path = RESULTS_DIR / f"udp_recv_c{c}_r{REQUESTS}_p{p}.csv"
-            if sent_path.exists() and recv_path.exists():
-                vals = read_udp_rtts(sent_path, recv_path)
-                data[("udp", c)].append(percentile(vals, q))
+            udp_hist = RESULTS_DIR / f"udp_hist_{tag}.json"
+            udp_cols = None if udp_hist.exists() else resultio.load_udp_recv(RESULTS_DIR, tag)
+            if udp_hist.exists():
+                data[("udp", c)].append(LatencyHistogram.load(udp_hist).percentile(q))
+            elif udp_cols is not None:
+                data[("udp", c)].append(percentile(resultio.latencies(udp_cols), q))
             else:
                 data[("udp", c)].append(float("nan"))
 
@@ -109,6 +75,83 @@ def plot_graph(data, q_label):
     plt.savefig(out_path, dpi=200)
     print(f"Wrote {out_path}")
 
+def plot_kernel_split(q: float = 50):
+    """UDP user-space RTT next to the RTT to the kernel's receive timestamp
+    (client.py --kernel-ts); the gap is time spent waking the receiver thread."""
+    plt.figure()
+    plotted = False
+    print(f"\n--- UDP RTT p{q:g}: user space vs kernel receive timestamp ---")
+    for c in CLIENTS_LIST:
+        xs, user, kernel = [], [], []
+        for p in PAYLOADS:
+            tag = f"c{c}_r{REQUESTS}_p{p}"
+            user_hist = RESULTS_DIR / f"udp_hist_{tag}.json"
+            kernel_hist = RESULTS_DIR / f"udp_hist_kernel_{tag}.json"
+            if not (user_hist.exists() and kernel_hist.exists()):
+                continue
+            xs.append(p)
+            user.append(LatencyHistogram.load(user_hist).percentile(q))
+            kernel.append(LatencyHistogram.load(kernel_hist).percentile(q))
+            print(f"UDP c={c:3d} p={p:5d} user={user[-1] * 1e6:8.1f} us "
+                  f"kernel={kernel[-1] * 1e6:8.1f} us")
+        if xs:
+            line, = plt.plot(xs, user, marker="o", label=f"UDP c={c} user space")
+            plt.plot(xs, kernel, marker="o", linestyle="--", color=line.get_color(),
+                     label=f"UDP c={c} kernel stamp")
+            plotted = True
+
+    if not plotted:
+        print("No --kernel-ts runs found.")
+        plt.close()
+        return
+
+    plt.xlabel("payload_bytes")
+    plt.ylabel(f"RTT p{q:g} (seconds)")
+    plt.title(f"UDP RTT p{q:g}: User Space vs Kernel Timestamp (requests={REQUESTS})")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / f"latency_kernel_vs_user_p{q:g}_r{REQUESTS}.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"Wrote {out_path}")
+
+def plot_delay_split(q: float = 50):
+    """Request one-way delay, server time and response one-way delay (client.py
+    --stamp) stacked per payload, for every proto/client count that has them.
+    Percentiles of the parts do not add up exactly to the RTT percentile."""
+    rows = []
+    for proto in ("tcp", "udp"):
+        for c in CLIENTS_LIST:
+            for p in PAYLOADS:
+                tag = f"c{c}_r{REQUESTS}_p{p}"
+                paths = [RESULTS_DIR / f"{proto}_hist_{part}_{tag}.json"
+                         for part in ("up", "server", "down")]
+                if all(path.exists() for path in paths):
+                    parts = [LatencyHistogram.load(path).percentile(q) for path in paths]
+                    rows.append((f"{proto.upper()} c{c} p{p}", parts))
+
+    if not rows:
+        return
+    print(f"\n--- RTT p{q:g} split: request / server / response ---")
+    plt.figure(figsize=(max(6.4, 0.5 * len(rows)), 4.8))
+    labels = [label for label, _ in rows]
+    bottom = [0.0] * len(rows)
+    for i, name in enumerate(("request one-way", "server", "response one-way")):
+        heights = [parts[i] for _, parts in rows]
+        plt.bar(labels, heights, bottom=bottom, label=name)
+        bottom = [b + h for b, h in zip(bottom, heights)]
+    for label, (up, srv, down) in rows:
+        print(f"{label:18s} up={up * 1e6:8.1f} us server={srv * 1e6:8.1f} us down={down * 1e6:8.1f} us")
+    plt.xticks(rotation=60, ha="right")
+    plt.ylabel(f"p{q:g} (seconds)")
+    plt.title(f"RTT p{q:g} Split by Server Timestamps (requests={REQUESTS})")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / f"latency_split_p{q:g}_r{REQUESTS}.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"Wrote {out_path}")
+
 def main():
     if not RESULTS_DIR.exists():
         print("ERROR: results/ not found.")
@@ -122,5 +165,8 @@ def main():
     data_p95 = collect_percentiles(95)
     plot_graph(data_p95, "p95")
 
+    plot_kernel_split()
+    plot_delay_split()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
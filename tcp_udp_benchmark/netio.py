@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Shared socket helpers for client.py and server.py.
+"""
+import socket
+import struct
+import time
+
+
+class RecvBuffer:
+    """One preallocated receive buffer per connection.
+
+    recv_exact() fills the buffer in place with recv_into and returns a
+    memoryview over the received bytes, so no per-request objects are built.
+    The view is only valid until the next recv_exact() on the same buffer."""
+
+    __slots__ = ("buf", "view")
+
+    def __init__(self, size: int):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+
+    def recv_exact(self, conn: socket.socket, n: int) -> memoryview:
+        """Receive exactly n bytes (or an empty view if the peer closes)."""
+        if n > len(self.buf):
+            self.buf = bytearray(n)
+            self.view = memoryview(self.buf)
+        view = self.view
+        got = 0
+        while got < n:
+            k = conn.recv_into(view[got:n])
+            if not k:          # peer closed connection
+                return view[:0]
+            got += k
+        return view[:n]
+
+
+def recv_exact_tcp(conn: socket.socket, n: int, rbuf: RecvBuffer = None) -> memoryview:
+    """Receive exactly n bytes from a TCP stream (or an empty view if the peer closes).
+
+    Pass the connection's RecvBuffer to reuse it; without one a buffer is
+    allocated for this call only."""
+    if rbuf is None:
+        rbuf = RecvBuffer(n)
+    return rbuf.recv_exact(conn, n)
+
+
+IOV_MAX = 1024  # Linux UIO_MAXIOV: max buffers per sendmsg call
+
+
+def sendmsg_all(conn: socket.socket, bufs: list) -> None:
+    """Write every buffer in bufs with vectored sendmsg calls (one syscall per IOV_MAX)."""
+    for i in range(0, len(bufs), IOV_MAX):
+        chunk = bufs[i:i + IOV_MAX]
+        sent = conn.sendmsg(chunk)
+        total = sum(len(b) for b in chunk)
+        if sent < total:
+            # short write: finish the remainder the slow way
+            conn.sendall(b"".join(chunk)[sent:])
+
+
+#### kernel receive timestamps #####
+# Linux option numbers (asm-generic); Python's socket module does not export them.
+# The SCM_* control message types use the same numbers.
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+SO_TIMESTAMPING = getattr(socket, "SO_TIMESTAMPING", 37)
+SOF_TIMESTAMPING_RX_SOFTWARE = 1 << 3
+SOF_TIMESTAMPING_SOFTWARE = 1 << 4
+TIMESPEC = struct.Struct("@ll")        # struct timespec as the kernel writes it for these options
+RX_TS_ANCBUF = socket.CMSG_SPACE(3 * TIMESPEC.size) if hasattr(socket, "CMSG_SPACE") else 0
+RX_TS_MODES = ("off", "ns", "sw")      # client.py --kernel-ts
+
+
+def realtime_offset_ns(rounds: int = 16) -> int:
+    """CLOCK_REALTIME - CLOCK_MONOTONIC in ns, from the tightest of `rounds` bracketed reads."""
+    best = None
+    for _ in range(rounds):
+        m0 = time.monotonic_ns()
+        r = time.time_ns()
+        m1 = time.monotonic_ns()
+        if best is None or m1 - m0 < best[0]:
+            best = (m1 - m0, r - (m0 + m1) // 2)
+    return best[1]
+
+
+class RxTimestamps:
+    """Kernel arrival times of received datagrams, from recvmsg ancillary data.
+
+    mode "ns" sets SO_TIMESTAMPNS; "sw" sets SO_TIMESTAMPING with software
+    receive stamps (the first timespec of scm_timestamping). Either way the
+    stamp is taken when the packet reaches the socket layer, before any
+    Python thread wakes up. The kernel stamps CLOCK_REALTIME, so mono_ns()
+    moves them onto CLOCK_MONOTONIC with an offset measured up front, to
+    compare with the monotonic send times in the datagram header. A clock
+    step during the run (not NTP slewing) would shift them."""
+
+    def __init__(self, mode: str):
+        if mode not in RX_TS_MODES[1:]:
+            raise ValueError(f"kernel timestamp mode must be one of {RX_TS_MODES[1:]}")
+        self.mode = mode
+        self.cmsg_type = SO_TIMESTAMPNS if mode == "ns" else SO_TIMESTAMPING
+        self.offset_ns = realtime_offset_ns()
+
+    def enable(self, sock: socket.socket) -> None:
+        """Turn the stamps on for sock; raises OSError where the kernel lacks them."""
+        if not RX_TS_ANCBUF:
+            raise OSError("recvmsg ancillary data is not available on this platform")
+        if self.mode == "ns":
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPING,
+                            SOF_TIMESTAMPING_RX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE)
+
+    def mono_ns(self, ancdata: list) -> int:
+        """Monotonic ns arrival time from one recvmsg's ancillary data, 0 if it has none."""
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == self.cmsg_type and len(data) >= TIMESPEC.size:
+                sec, nsec = TIMESPEC.unpack_from(data, 0)
+                if sec or nsec:
+                    return sec * 1_000_000_000 + nsec - self.offset_ns
+        return 0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Run phases shared by client.py and server.py: warmup, measurement window, cooldown.
+"""
+import time
+
+FOREVER_NS = (1 << 63) - 1   # "no deadline" on the integer nanosecond clock
+
+
+class Phases:
+    """Warmup / measurement / cooldown boundaries on the monotonic clock.
+
+    begin() fixes the run start t0. The measurement window is then
+    [t0 + warmup, t0 + warmup + duration) and the run ends cooldown seconds
+    after the window closes. With duration == 0 the run is sized by
+    --requests instead: the window opens after warmup and stays open until
+    the run finishes (cooldown does not apply).
+
+    A request counts only if it both starts and ends inside the window, so
+    connection setup, slow start and the tail where clients drop out never
+    reach the histograms or the throughput numbers."""
+
+    __slots__ = ("warmup", "duration", "cooldown", "t0", "wall_offset",
+                 "w_start", "w_end", "end")
+
+    def __init__(self, duration: float = 0.0, warmup: float = 0.0, cooldown: float = 0.0):
+        if min(duration, warmup, cooldown) < 0:
+            raise ValueError("--duration, --warmup and --cooldown must not be negative")
+        if cooldown > 0 and duration <= 0:
+            raise ValueError("--cooldown needs --duration")
+        self.warmup = warmup
+        self.duration = duration
+        self.cooldown = cooldown
+        self.t0 = None
+        self.wall_offset = 0.0
+        self.w_start = self.w_end = self.end = float("inf")
+
+    @property
+    def timed(self) -> bool:
+        return self.duration > 0
+
+    def begin(self, t0: float = None) -> None:
+        """Start the clock at t0 (default: now). Only the first call counts, so
+        every thread behind a barrier can call it and share one start."""
+        if self.t0 is not None:
+            return
+        self.t0 = time.monotonic() if t0 is None else t0
+        self.wall_offset = time.time() - time.monotonic()
+        self.w_start = self.t0 + self.warmup
+        if self.timed:
+            self.w_end = self.w_start + self.duration
+            self.end = self.w_end + self.cooldown
+
+    def ns(self):
+        """(window start, window end, run end) in monotonic ns, FOREVER_NS when open-ended."""
+        to_ns = lambda t: FOREVER_NS if t == float("inf") else int(t * 1e9)
+        return to_ns(self.w_start), to_ns(self.w_end), to_ns(self.end)
+
+    def to_dict(self, run_end: float) -> dict:
+        """Window boundaries for the JSON logs; run_end is when the run actually stopped."""
+        w_start = min(self.w_start, run_end)
+        w_end = min(self.w_end, run_end)
+        return {
+            "warmup_s": self.warmup,
+            "duration_s": self.duration,
+            "cooldown_s": self.cooldown,
+            "start_mono": self.t0,
+            "window_start_mono": w_start,
+            "window_end_mono": w_end,
+            "window_start_ts": w_start + self.wall_offset,
+            "window_end_ts": w_end + self.wall_offset,
+            "measured_s": max(0.0, w_end - w_start),
+        }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Signal-timer stack sampler for client.py / server.py --profile.
+
+A StackSampler arms ITIMER_PROF, which raises SIGPROF every 1/hz seconds
+of CPU time used by the process (any thread). A Python signal handler would
+only run once the main thread executes bytecode, and the main thread spends
+most of a run blocked in join() or select(), so instead SIGPROF is blocked
+and a dedicated sampler thread takes it with sigwait(). On each tick it
+reads every other thread's current stack from sys._current_frames() and
+counts it, keyed by the thread's role (see rusage.thread_group). Threads
+blocked in recv/select are sampled too, so the output shows where every
+thread is, weighted by how busy the process is; an idle process takes no
+samples at all.
+
+close() writes the counts as collapsed stacks, one "frame;frame;... count"
+line per distinct stack, root first, ready for flamegraph.pl or speedscope.
+It also returns the sampler's own cost: handler_s is the time spent inside
+the handler, and overhead is that as a share of the run's wall time.
+
+Start the sampler from the main thread before any other thread: the
+signal mask is inherited at thread creation, and a thread started earlier
+would still take SIGPROF itself (harmlessly, through the fallback handler,
+but late). Timers are not inherited across fork, so every --procs /
+--workers process runs its own sampler; merge_collapsed() sums their files.
+
+Usage: python3 profiler.py results/*_profile_*.collapsed   (top frames by self samples)
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from resultio import part_stem
+from rusage import thread_group
+
+PROFILE_HZ = 199.0      # default --profile rate; off the round numbers so it does not beat with 100 Hz ticks
+MAX_DEPTH = 128         # deeper stacks are cut at the root end
+
+
+class StackSampler:
+    """Counts every thread's stack on each SIGPROF until close()."""
+
+    def __init__(self, path: str, hz: float = PROFILE_HZ):
+        if not hasattr(signal, "setitimer") or not hasattr(signal, "sigwait"):
+            raise SystemExit("--profile needs signal.setitimer and signal.sigwait (POSIX)")
+        self.path = path
+        self.hz = hz
+        self.counts: Dict[tuple, int] = {}
+        self.labels: Dict[object, str] = {}     # code object -> frame label
+        self.names: Dict[int, str] = {}         # thread ident -> role
+        self.samples = 0
+        self.handler_s = 0.0
+        self.running = True
+        self.start = time.monotonic()
+        # a stray SIGPROF (a thread started before us) must not hit the default action
+        self.prev = signal.signal(signal.SIGPROF, self._fallback)
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGPROF})
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+        signal.setitimer(signal.ITIMER_PROF, 1.0 / hz, 1.0 / hz)
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            label = self.labels[code] = \
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _role(self, ident: int) -> str:
+        name = self.names.get(ident)
+        if name is None:
+            self.names = {t.ident: thread_group(t.name) for t in threading.enumerate()}
+            name = self.names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _run(self) -> None:
+        while True:
+            signal.sigwait({signal.SIGPROF})
+            if not self.running:
+                return
+            self._sample(threading.get_ident())
+
+    def _fallback(self, signum, frame) -> None:
+        if self.running:
+            self._sample(None)
+
+    def _sample(self, skip) -> None:
+        c0 = time.perf_counter()
+        for ident, f in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            while f is not None and len(stack) < MAX_DEPTH:
+                stack.append(self._label(f.f_code))
+                f = f.f_back
+            stack.append(self._role(ident))
+            key = tuple(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.samples += 1
+        self.handler_s += time.perf_counter() - c0
+
+    def close(self) -> dict:
+        signal.setitimer(signal.ITIMER_PROF, 0.0)
+        self.running = False
+        signal.pthread_kill(self.thread.ident, signal.SIGPROF)
+        self.thread.join()
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGPROF})
+        signal.signal(signal.SIGPROF, self.prev or signal.SIG_DFL)
+        wall = time.monotonic() - self.start
+        write_collapsed(self.path, self.counts)
+        return {
+            "path": os.path.basename(self.path),
+            "hz": self.hz,
+            "samples": self.samples,
+            "stacks": len(self.counts),
+            "handler_s": self.handler_s,
+            "overhead": self.handler_s / wall if wall > 0 else 0.0,
+        }
+
+
+def write_collapsed(path: str, counts: Dict[tuple, int]) -> None:
+    with open(path, "w") as fp:
+        for key, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            fp.write(f"{';'.join(key)} {n}\n")
+
+
+def read_collapsed(path: str) -> Dict[tuple, int]:
+    counts: Dict[tuple, int] = {}
+    with open(path, "r", encoding="utf-8") as fp:
+        for line in fp:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            if stack:
+                key = tuple(stack.split(";"))
+                counts[key] = counts.get(key, 0) + int(n)
+    return counts
+
+
+def merge_collapsed(paths: List[str], out_path: str, remove: bool = True) -> int:
+    """Sum per-process collapsed-stack files into out_path; returns the stack count."""
+    counts: Dict[tuple, int] = {}
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        for key, n in read_collapsed(p).items():
+            counts[key] = counts.get(key, 0) + n
+        if remove:
+            os.remove(p)
+    write_collapsed(out_path, counts)
+    return len(counts)
+
+
+def merge_profiles(stats: List[dict], stem: str, parts: int) -> dict:
+    """Merge the part files of `parts` samplers into <stem>.collapsed; sums their stats."""
+    stats = [s for s in stats if s]
+    out = {
+        "path": os.path.basename(f"{stem}.collapsed"),
+        "hz": stats[0]["hz"] if stats else None,
+        "samples": sum(s["samples"] for s in stats),
+        "handler_s": sum(s["handler_s"] for s in stats),
+        # each process pays for its own handler, so the worst one is what a run sees
+        "overhead": max((s["overhead"] for s in stats), default=0.0),
+    }
+    out["stacks"] = merge_collapsed([f"{part_stem(stem, i)}.collapsed" for i in range(parts)],
+                                    f"{stem}.collapsed")
+    return out
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    for arg in sys.argv[1:]:
+        counts = read_collapsed(arg)
+        total = sum(counts.values()) or 1
+        leaf: Dict[str, int] = {}
+        for key, n in counts.items():
+            leaf[key[-1]] = leaf.get(key[-1], 0) + n
+        print(f"== {arg} ({total} samples)")
+        for label, n in sorted(leaf.items(), key=lambda kv: -kv[1])[:20]:
+            print(f"{100.0 * n / total:6.1f}%  {label}")
+
+
+if __name__ == "__main__":
+    main()
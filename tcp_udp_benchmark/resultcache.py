@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of sweep results (sweep.py).
+
+Every sweep point gets a key: the SHA-256 of its full config (proto,
+payload, clients, requests, server options, extra client flags, topology)
+together with the tool version (a hash of the sources client.py and
+server.py run, TOOL_SOURCES) and a fingerprint of the server and client
+hosts. A point that finished is stored under cache/objects/<key>/: its
+client files from results/ and its server files from results/server/
+(in ssh mode sweep.py copies those over from the server host first).
+cache/index.json maps each key to its config and to the name, size and
+SHA-256 of every stored file.
+
+A rerun looks each point up before running it. A point whose entry is
+valid (every file present at its recorded size) is restored into
+results/ and not run again, so a sweep that died halfway resumes where it
+stopped. Changing the code, the host or any option changes the key, so
+results of different versions never replace each other in the cache;
+results/ only holds the latest view the analysis scripts read. Before a
+point runs, its old files are removed from results/ so that nothing stale
+is stored with it.
+
+Commands (run on the host that has results/, which sweep.py does over SSH):
+  fingerprint                  -> this host's fingerprint
+  lookup KEY                   -> entry, or null if missing or invalid
+  restore KEY                  copy a valid entry's files into results/
+  prepare PROTO TAG            remove a point's files from results/
+  store KEY PROTO TAG          store a point's files (config JSON on stdin)
+  invalidate [KEY|k=v ...]     drop entries by key prefix or config field (all if none)
+  list                         key, created and config of every entry
+  verify                       re-hash every stored file, drop broken entries
+
+Usage: python3 resultcache.py [--root DIR] CMD [ARGS ...]
+"""
+import glob
+import hashlib
+import json
+import os
+import platform
+import shutil
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = "cache"
+RESULTS_DIR = "results"
+INDEX_NAME = "index.json"
+
+# the modules client.py and server.py run; a change to any of them is a new tool version
+TOOL_SOURCES = [
+    "client.py", "server.py", "clocksync.py", "control.py", "hist.py", "kstats.py",
+    "netio.py", "phases.py", "profiler.py", "resultio.py", "rusage.py", "seqtrack.py",
+    "series.py",
+]
+
+
+def tool_version(base: str = BASE_DIR) -> str:
+    h = hashlib.sha256()
+    for name in TOOL_SOURCES:
+        h.update(name.encode() + b"\0")
+        with open(os.path.join(base, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def host_fingerprint() -> dict:
+    """What about this host can change the numbers: machine, kernel, CPU, Python."""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {
+        "hostname": socket.gethostname(),
+        "system": platform.system(),
+        "kernel": platform.release(),
+        "machine": platform.machine(),
+        "cpu": cpu,
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def point_key(config: dict) -> str:
+    """Cache key of a point; config holds everything that shapes its results,
+    including "tool" and "hosts"."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def server_glob(proto: str, tag: str) -> str:
+    """Glob of a point's files under results/server/. Server files carry no
+    pipeline depth, so they are matched on the tag without it."""
+    return f"{proto}_server*_{tag.split('_d')[0]}.*"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """The cache under root/cache for the results under root/results."""
+
+    def __init__(self, root: str = BASE_DIR):
+        self.results = os.path.join(root, RESULTS_DIR)
+        self.dir = os.path.join(root, CACHE_DIR)
+        self.index_path = os.path.join(self.dir, INDEX_NAME)
+        self.index: Dict[str, dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+
+    def _save(self) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)     # a killed sweep never leaves half an index
+
+    def _objects(self, key: str) -> str:
+        return os.path.join(self.dir, "objects", key)
+
+    def point_files(self, proto: str, tag: str) -> List[str]:
+        """A point's files under results/ and results/server/, relative to results/."""
+        paths = glob.glob(os.path.join(self.results, f"{proto}_*_{tag}.*"))
+        paths += glob.glob(os.path.join(self.results, "server", server_glob(proto, tag)))
+        return sorted(os.path.relpath(p, self.results) for p in paths)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """The entry for key if all of its files are intact in size."""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        for name, meta in entry["files"].items():
+            path = os.path.join(self._objects(key), name)
+            if not os.path.exists(path) or os.path.getsize(path) != meta["size"]:
+                return None
+        return entry
+
+    def restore(self, key: str) -> int:
+        entry = self.lookup(key)
+        if entry is None:
+            raise KeyError(f"no valid cache entry {key}")
+        for name in entry["files"]:
+            dst = os.path.join(self.results, name)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(os.path.join(self._objects(key), name), dst)
+        return len(entry["files"])
+
+    def prepare(self, proto: str, tag: str) -> int:
+        names = self.point_files(proto, tag)
+        for name in names:
+            os.remove(os.path.join(self.results, name))
+        return len(names)
+
+    def store(self, key: str, proto: str, tag: str, config: dict) -> dict:
+        names = self.point_files(proto, tag)
+        if not names:
+            raise FileNotFoundError(f"no {proto} results for {tag} under {self.results}")
+        objects = self._objects(key)
+        shutil.rmtree(objects, ignore_errors=True)
+        files = {}
+        for name in names:
+            src = os.path.join(self.results, name)
+            dst = os.path.join(objects, name)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+            files[name] = {"size": os.path.getsize(dst), "sha256": file_sha256(dst)}
+        entry = {"created": time.time(), "config": config, "files": files}
+        self.index[key] = entry
+        self._save()
+        return entry
+
+    def invalidate(self, match: List[str] = ()) -> int:
+        """Drop entries whose key starts with, or whose config has, every
+        item of match (KEY or field=value; all entries if empty)."""
+        def hit(key: str, entry: dict) -> bool:
+            for m in match:
+                field, eq, value = m.partition("=")
+                if not eq:
+                    if not key.startswith(m):
+                        return False
+                elif str(entry["config"].get(field)) != value:
+                    return False
+            return True
+
+        drop = [key for key, entry in self.index.items() if hit(key, entry)]
+        for key in drop:
+            shutil.rmtree(self._objects(key), ignore_errors=True)
+            del self.index[key]
+        if drop:
+            self._save()
+        return len(drop)
+
+    def verify(self) -> List[str]:
+        """Keys of entries with a missing or changed file; they are dropped."""
+        broken = []
+        for key, entry in self.index.items():
+            for name, meta in entry["files"].items():
+                path = os.path.join(self._objects(key), name)
+                if not os.path.exists(path) or file_sha256(path) != meta["sha256"]:
+                    broken.append(key)
+                    break
+        for key in broken:
+            self.invalidate([key])
+        return broken
+
+
+def command(argv: List[str], root: str = BASE_DIR, stdin: str = "") -> object:
+    """Run one command (see the module docstring) and return its JSON result."""
+    cmd, args = argv[0], argv[1:]
+    if cmd == "fingerprint":
+        return host_fingerprint()
+    cache = ResultCache(root)
+    if cmd == "lookup":
+        return cache.lookup(args[0])
+    if cmd == "restore":
+        return {"restored": cache.restore(args[0])}
+    if cmd == "prepare":
+        return {"removed": cache.prepare(args[0], args[1])}
+    if cmd == "store":
+        return {"stored": len(cache.store(args[0], args[1], args[2], json.loads(stdin))["files"])}
+    if cmd == "invalidate":
+        return {"invalidated": cache.invalidate(args)}
+    if cmd == "list":
+        return [{"key": key, "created": entry["created"], "config": entry["config"]}
+                for key, entry in sorted(cache.index.items(), key=lambda kv: kv[1]["created"])]
+    if cmd == "verify":
+        return {"broken": cache.verify()}
+    raise ValueError(f"unknown command {cmd!r}")
+
+
+def main():
+    argv = sys.argv[1:]
+    root = BASE_DIR
+    if argv[:1] == ["--root"]:
+        root, argv = argv[1], argv[2:]
+    if not argv:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    stdin = sys.stdin.read() if argv[0] == "store" else ""
+    try:
+        result = command(argv, root, stdin)
+    except (KeyError, FileNotFoundError, ValueError, IndexError) as e:
+        raise SystemExit(f"error: {e}")
+    print(json.dumps(result, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
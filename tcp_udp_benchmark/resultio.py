@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Columnar binary result files, plus the one reader the analysis scripts share.
+
+A .bin file is:
+  8 bytes   magic b"TUBCOL01"
+  4 bytes   header length H (little-endian u32)
+  H bytes   JSON header: {"layout": "rows", "record_size": R,
+                          "columns": [{"name", "dtype", "offset"}, ...]}
+  data      starts at the first 8-byte boundary after the header: fixed-width
+            little-endian records of R bytes, each column at its offset
+            inside the record. The row count is (file size - data start) // R,
+            so the file is valid after every append (StreamWriter writes it).
+
+A reader can np.memmap the records and take every column as a view without
+parsing anything per row.
+
+Usage: python3 resultio.py results/tcp_rtt_c1_r50_p64.bin ...   (writes .csv next to each)
+"""
+import csv
+import io
+import json
+import os
+import queue
+import shutil
+import struct
+import sys
+import threading
+import time
+from itertools import starmap
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the client only writes, so it does not need numpy
+    np = None
+
+MAGIC = b"TUBCOL01"
+PREFIX = struct.Struct("<8sI")
+ALIGN = 8
+
+# struct typecode -> numpy little-endian dtype
+DTYPES = {"I": "<u4", "Q": "<u8", "q": "<i8", "d": "<f8"}
+
+# column layouts written by client.py
+TCP_RTT_COLS = [("client_id", "I"), ("request_index", "I"), ("rtt_s", "d")]
+TCP_CONN_COLS = [("client_id", "I"), ("conn_setup_s", "d")]
+UDP_RECV_COLS = [("cid", "I"), ("seq", "I"), ("recv_time_mono", "d"), ("rtt_s", "d")]
+LATENCY_COL = ("latency_s", "d")
+KERNEL_RTT_COL = ("kernel_rtt_s", "d")    # UDP, client.py --kernel-ts
+SPLIT_COLS = [("up_s", "d"), ("server_s", "d"), ("down_s", "d")]   # client.py --stamp
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+#### writing #####
+def _write_header(fp, header: dict) -> None:
+    raw = json.dumps(header, sort_keys=True).encode()
+    fp.write(PREFIX.pack(MAGIC, len(raw)))
+    fp.write(raw)
+    fp.write(b"\0" * (_aligned(PREFIX.size + len(raw)) - PREFIX.size - len(raw)))
+
+
+#### streaming #####
+STREAM_QUEUE_CHUNKS = 64   # chunks buffered between producers and the writer thread
+
+
+class StreamWriter:
+    """Appends result rows to <path_stem>.bin (record layout) or .csv from a
+    background thread while the run is still going.
+
+    Producers hand over whole chunks (lists of row tuples) with put(); the
+    queue holds at most STREAM_QUEUE_CHUNKS of them, so memory stays bounded
+    and a producer that outruns the disk blocks in put(). Blocked puts and
+    the time spent in them are counted as back-pressure. Each chunk goes to
+    the kernel in one unbuffered write, so a crashed run keeps everything
+    written so far; close() drains the queue and fsyncs."""
+
+    def __init__(self, path_stem: str, columns: Sequence[Tuple[str, str]], fmt: str = "bin",
+                 max_chunks: int = STREAM_QUEUE_CHUNKS):
+        self.path = f"{path_stem}.{fmt}"
+        self.fmt = fmt
+        self.q: "queue.Queue[Optional[list]]" = queue.Queue(max_chunks)
+        self.stats = {"rows": 0, "chunks": 0, "bytes": 0, "stalls": 0, "stall_s": 0.0,
+                      "max_queued": 0, "fsync_s": 0.0}
+        self.fp = open(self.path, "wb", buffering=0)
+        if fmt == "bin":
+            self.record = struct.Struct("<" + "".join(tc for _, tc in columns))
+            cols, offset = [], 0
+            for name, tc in columns:
+                cols.append({"name": name, "dtype": DTYPES[tc], "offset": offset})
+                offset += struct.calcsize("<" + tc)
+            _write_header(self.fp, {"layout": "rows", "record_size": self.record.size,
+                                    "columns": cols})
+        else:
+            self.fp.write((",".join(name for name, _ in columns) + "\r\n").encode())
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name=f"writer:{os.path.basename(self.path)}",
+                                       daemon=True)
+        self.thread.start()
+
+    def put(self, rows: list) -> None:
+        if not rows:
+            return
+        try:
+            self.q.put_nowait(rows)
+        except queue.Full:
+            t0 = time.monotonic()
+            self.q.put(rows)
+            self.stats["stalls"] += 1
+            self.stats["stall_s"] += time.monotonic() - t0
+        queued = self.q.qsize()
+        if queued > self.stats["max_queued"]:
+            self.stats["max_queued"] = queued
+
+    def _encode(self, rows: list) -> bytes:
+        if self.fmt == "bin":
+            return b"".join(starmap(self.record.pack, rows))
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue().encode()
+
+    def _run(self) -> None:
+        while True:
+            rows = self.q.get()
+            if rows is None:
+                return
+            if self.error is not None:
+                continue  # keep draining so producers never block on a dead writer
+            try:
+                data = self._encode(rows)
+                self.fp.write(data)
+            except BaseException as e:
+                self.error = e
+                continue
+            self.stats["rows"] += len(rows)
+            self.stats["chunks"] += 1
+            self.stats["bytes"] += len(data)
+
+    def close(self) -> dict:
+        """Drain, fsync and close; returns the writer's counters."""
+        self.q.put(None)
+        self.thread.join()
+        t0 = time.monotonic()
+        os.fsync(self.fp.fileno())
+        self.stats["fsync_s"] = time.monotonic() - t0
+        self.fp.close()
+        if self.error is not None:
+            raise RuntimeError(f"writing {self.path} failed: {self.error!r}")
+        return dict(self.stats)
+
+
+def part_stem(path_stem: str, idx: int) -> str:
+    return f"{path_stem}.part{idx}"
+
+
+def merge_parts(path_stem: str, fmt: str, parts: int) -> str:
+    """Concatenate the per-process files StreamWriter wrote for part_stem(path_stem, i)
+    into <path_stem>.<fmt> (headers/CSV header line kept once) and remove them."""
+    path = f"{path_stem}.{fmt}"
+    with open(path, "wb") as out:
+        for i in range(parts):
+            part = f"{part_stem(path_stem, i)}.{fmt}"
+            if not os.path.exists(part):
+                continue
+            with open(part, "rb") as fp:
+                if fmt == "bin":
+                    head = fp.read(PREFIX.size)
+                    _, hlen = PREFIX.unpack(head)
+                    head += fp.read(_aligned(PREFIX.size + hlen) - PREFIX.size)
+                else:
+                    head = fp.readline()
+                if out.tell() == 0:
+                    out.write(head)
+                shutil.copyfileobj(fp, out, 1 << 20)
+            os.remove(part)
+        out.flush()
+        os.fsync(out.fileno())
+    return path
+
+
+#### reading #####
+def read_header(path: Path) -> Tuple[dict, int]:
+    """(JSON header, absolute offset of the data section)."""
+    with open(path, "rb") as fp:
+        magic, hlen = PREFIX.unpack(fp.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a columnar result file")
+        header = json.loads(fp.read(hlen))
+    return header, _aligned(PREFIX.size + hlen)
+
+
+def read_columns(path) -> Dict[str, "np.ndarray"]:
+    """Columns of a .bin (memory-mapped) or legacy .csv result file, by name."""
+    if np is None:
+        raise RuntimeError("reading result files needs numpy")
+    path = Path(path)
+    if path.suffix == ".csv":
+        return _read_csv(path)
+    header, start = read_header(path)
+    if header.get("layout") != "rows":
+        raise ValueError(f"{path}: unsupported layout {header.get('layout')!r}")
+    return _read_records(path, header, start)
+
+
+def _read_records(path: Path, header: dict, start: int) -> Dict[str, "np.ndarray"]:
+    size = header["record_size"]
+    n = (path.stat().st_size - start) // size
+    dtype = np.dtype({"names": [c["name"] for c in header["columns"]],
+                      "formats": [c["dtype"] for c in header["columns"]],
+                      "offsets": [c["offset"] for c in header["columns"]],
+                      "itemsize": size})
+    if n == 0:
+        recs = np.empty(0, dtype=dtype)
+    else:
+        recs = np.memmap(path, dtype=dtype, mode="r", offset=start, shape=(n,))
+    return {name: recs[name] for name in dtype.names}
+
+
+def _read_csv(path: Path) -> Dict[str, "np.ndarray"]:
+    with path.open("r", newline="", encoding="utf-8") as f:
+        names = next(csv.reader(f), None) or []
+        data = np.loadtxt(f, delimiter=",", ndmin=2) if names else np.empty((0, 0))
+    if data.size == 0:
+        return {name: np.empty(0) for name in names}
+    return {name: data[:, i] for i, name in enumerate(names[:data.shape[1]])}
+
+
+def find(results_dir: Path, stem: str) -> Optional[Path]:
+    """results_dir/stem.bin, else stem.csv, else None."""
+    for ext in (".bin", ".csv"):
+        path = Path(results_dir) / f"{stem}{ext}"
+        if path.exists():
+            return path
+    return None
+
+
+def load(results_dir: Path, stem: str) -> Optional[Dict[str, "np.ndarray"]]:
+    path = find(results_dir, stem)
+    return read_columns(path) if path else None
+
+
+def load_udp_recv(results_dir: Path, tag: str) -> Optional[Dict[str, "np.ndarray"]]:
+    """udp_recv_<tag> columns, always with rtt_s.
+
+    Runs from before the in-band timestamp header only have recv_time_mono;
+    rtt_s (and latency_s, from intended_time_mono) is then rebuilt by joining
+    against udp_sent_<tag>.csv on (cid, seq), keeping matched rows only."""
+    cols = load(results_dir, f"udp_recv_{tag}")
+    if cols is None or "rtt_s" in cols:
+        return cols
+    sent = load(results_dir, f"udp_sent_{tag}")
+    if sent is None:
+        return None
+
+    key = lambda c: c["cid"].astype(np.int64) << 32 | c["seq"].astype(np.int64)
+    skeys = key(sent)
+    rkeys = key(cols)
+    if len(skeys) == 0 or len(rkeys) == 0:
+        out = {name: np.asarray(col)[:0] for name, col in cols.items()}
+        out["rtt_s"] = np.empty(0)
+        return out
+    order = np.argsort(skeys)
+    idx = order[np.clip(np.searchsorted(skeys, rkeys, sorter=order), 0, len(skeys) - 1)]
+    rtt = cols["recv_time_mono"] - sent["send_time_mono"][idx]
+    keep = (skeys[idx] == rkeys) & (rtt >= 0)
+    out = {name: np.asarray(col)[keep] for name, col in cols.items()}
+    out["rtt_s"] = rtt[keep]
+    if "intended_time_mono" in sent:
+        out["latency_s"] = (cols["recv_time_mono"] - sent["intended_time_mono"][idx])[keep]
+    return out
+
+
+def latencies(cols: Dict[str, "np.ndarray"]) -> "np.ndarray":
+    """latency_s for open-loop runs (coordinated-omission corrected), else rtt_s."""
+    return cols["latency_s"] if "latency_s" in cols else cols["rtt_s"]
+
+
+#### CSV export #####
+def export_csv(path, out_path=None) -> Path:
+    """Write a .bin result file back out as CSV (same column names)."""
+    path = Path(path)
+    out_path = Path(out_path) if out_path else path.with_suffix(".csv")
+    header, _ = read_header(path)
+    cols = read_columns(path)
+    names = [c["name"] for c in header["columns"]]
+    with out_path.open("w", newline="") as fp:
+        w = csv.writer(fp)
+        w.writerow(names)
+        w.writerows(zip(*(cols[n].tolist() for n in names)))
+    return out_path
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    for arg in sys.argv[1:]:
+        print(f"Wrote {export_csv(arg)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
-import csv
-import statistics
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+import resultio
+
 PAYLOADS = [64, 512, 1024, 4096, 8192]
 CLIENTS = 1
 REQUESTS = 50
@@ -13,71 +13,24 @@ RESULTS_DIR = BASE_DIR / "results"
 PLOTS_DIR = BASE_DIR / "plots"
 PLOTS_DIR.mkdir(exist_ok=True)
 
-def read_tcp_avg_rtt(path: Path) -> float:
-    # header: client_id,request_index,rtt_s
-    vals = []
-    with path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    vals.append(float(row[2]))
-                except ValueError:
-                    pass
-    if not vals:
-        raise ValueError(f"No RTT rows in {path.name}")
-    return statistics.mean(vals)
-
-def read_avg_tcp_conn_setup(path: Path) -> float:
-    # header: client_id,conn_setup_s
-    vals = []
-    with path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 2:
-                try:
-                    vals.append(float(row[1]))
-                except ValueError:
-                    pass
-    return statistics.mean(vals) if vals else 0.0
-
-def read_udp_avg_rtt(sent_path: Path, recv_path: Path) -> float:
-    # sent header: cid,seq,send_time_mono
-    sent = {}
-    with sent_path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    cid = int(row[0]); seq = int(row[1]); ts = float(row[2])
-                    sent[(cid, seq)] = ts
-                except ValueError:
-                    pass
-
-    # recv header: cid,seq,recv_time_mono
-    rtts = []
-    with recv_path.open("r", newline="", encoding="utf-8") as f:
-        rd = csv.reader(f)
-        next(rd, None)
-        for row in rd:
-            if len(row) >= 3:
-                try:
-                    cid = int(row[0]); seq = int(row[1]); rt = float(row[2])
-                except ValueError:
-                    continue
-                st = sent.get((cid, seq))
-                if st is None:
-                    continue
-                rtt = rt - st
-                if rtt >= 0:
-                    rtts.append(rtt)
-
-    if not rtts:
-        raise ValueError(f"No matched RTT pairs between {sent_path.name} and {recv_path.name}")
-    return statistics.mean(rtts)
+def read_tcp_avg_rtt(tag: str) -> float:
+    cols = resultio.load(RESULTS_DIR, f"tcp_rtt_{tag}")
+    if not len(cols["rtt_s"]):
+        raise ValueError(f"No RTT rows in tcp_rtt_{tag}")
+    return float(cols["rtt_s"].mean())
+
+def read_avg_tcp_conn_setup(tag: str) -> float:
+    cols = resultio.load(RESULTS_DIR, f"tcp_conn_{tag}")
+    if cols is None or not len(cols["conn_setup_s"]):
+        return 0.0
+    return float(cols["conn_setup_s"].mean())
+
+def read_udp_avg_rtt(tag: str) -> float:
+    # RTT computed in-band by the client (legacy runs: joined against udp_sent)
+    cols = resultio.load_udp_recv(RESULTS_DIR, tag)
+    if cols is None or not len(cols["rtt_s"]):
+        raise ValueError(f"No RTT rows for udp_recv_{tag}")
+    return float(cols["rtt_s"].mean())
 
 def main():
     print("BASE_DIR   =", BASE_DIR)
@@ -93,32 +46,24 @@ def main():
 
     print("\n--- Reading points (Phase D c1 r50) ---")
     for p in PAYLOADS:
+        tag = f"c{CLIENTS}_r{REQUESTS}_p{p}"
         # TCP
-        tcp_rtt_path  = RESULTS_DIR / f"tcp_rtt_c{CLIENTS}_r{REQUESTS}_p{p}.csv"
-        tcp_conn_path = RESULTS_DIR / f"tcp_conn_c{CLIENTS}_r{REQUESTS}_p{p}.csv"
-
-        if tcp_rtt_path.exists():
-            rtt_avg = read_tcp_avg_rtt(tcp_rtt_path)
-            conn_avg = read_avg_tcp_conn_setup(tcp_conn_path) if tcp_conn_path.exists() else 0.0
+        if resultio.find(RESULTS_DIR, f"tcp_rtt_{tag}"):
+            rtt_avg = read_tcp_avg_rtt(tag)
+            conn_avg = read_avg_tcp_conn_setup(tag)
             plotted = rtt_avg + conn_avg
             tcp_x.append(p); tcp_y.append(plotted)
             print(f"TCP p={p}: avg_rtt={rtt_avg:.9f} conn_avg={conn_avg:.9f} plotted={plotted:.9f}")
         else:
-            print(f"TCP p={p}: MISSING {tcp_rtt_path.name}")
+            print(f"TCP p={p}: MISSING tcp_rtt_{tag}")
 
         # UDP (raw avg RTT)
-        udp_sent_path = RESULTS_DIR / f"udp_sent_c{CLIENTS}_r{REQUESTS}_p{p}.csv"
-        udp_recv_path = RESULTS_DIR / f"udp_recv_c{CLIENTS}_r{REQUESTS}_p{p}.csv"
-
-        if udp_sent_path.exists() and udp_recv_path.exists():
-            rtt_avg = read_udp_avg_rtt(udp_sent_path, udp_recv_path)
+        if resultio.find(RESULTS_DIR, f"udp_recv_{tag}"):
+            rtt_avg = read_udp_avg_rtt(tag)
             udp_x.append(p); udp_y.append(rtt_avg)
             print(f"UDP p={p}: avg_rtt={rtt_avg:.9f} plotted={rtt_avg:.9f} (raw)")
         else:
-            miss = []
-            if not udp_sent_path.exists(): miss.append(udp_sent_path.name)
-            if not udp_recv_path.exists(): miss.append(udp_recv_path.name)
-            print(f"UDP p={p}: MISSING {', '.join(miss)}")
+            print(f"UDP p={p}: MISSING udp_recv_{tag}")
 
     # Plot
     plt.figure()
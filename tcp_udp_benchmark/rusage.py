@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Per-run resource accounting for client.py and server.py.
+
+A ResourceMeter brackets a run in one process. It reads getrusage(RUSAGE_SELF)
+when it opens and when it closes (CPU user/sys, voluntary and involuntary
+context switches, peak RSS). A background thread also polls
+/proc/self/task/*/stat and .../status every `interval` seconds. Worker threads
+exit before the run ends, so polling is the only way to see their totals: the
+last values read for each thread are kept, less whatever a thread had
+already used when the meter opened. A thread that lives for less than one
+interval can be missed; the process totals are exact. Threads are grouped
+by role (the target function in the Python thread name, e.g. "udp_worker"),
+so a run with thousands of client threads still logs a few lines.
+
+efficiency() turns a usage dict into CPU-microseconds per request and
+echoed bytes per CPU-second. merge_usage() adds up per-process dicts
+(--procs / --workers). On non-Linux hosts "threads" is None.
+"""
+import os
+import resource
+import threading
+import time
+from typing import Dict, List, Optional
+
+TASK_POLL_S = 0.25          # how often the per-thread counters are read
+TASK_DIR = "/proc/self/task"
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+THREAD_FIELDS = ("count", "user_s", "sys_s", "vol_cs", "invol_cs")
+
+
+def thread_group(name: str) -> str:
+    """Role of a thread from its Python name: "Thread-3 (udp_worker)" -> "udp_worker",
+    "ThreadPoolExecutor-0_7" -> "ThreadPoolExecutor", "series:..." -> "series"."""
+    if name.endswith(")") and "(" in name:
+        return name[name.rindex("(") + 1:-1]
+    name = name.split(":", 1)[0]
+    return name.rstrip("0123456789").rstrip("-_") or name
+
+
+def read_task(tid: str) -> Optional[tuple]:
+    """(comm, user_s, sys_s, voluntary, involuntary) of one thread, or None if it is gone."""
+    try:
+        with open(f"{TASK_DIR}/{tid}/stat", "r") as fp:
+            stat = fp.read()
+        vol = invol = 0
+        with open(f"{TASK_DIR}/{tid}/status", "r") as fp:
+            for line in fp:
+                if line.startswith("voluntary_ctxt_switches"):
+                    vol = int(line.split()[1])
+                elif line.startswith("nonvoluntary_ctxt_switches"):
+                    invol = int(line.split()[1])
+    except OSError:
+        return None
+    comm = stat[stat.index("(") + 1:stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2:].split()
+    # fields[0] is field 3 (state) of proc(5); utime and stime are fields 14 and 15
+    return comm, int(fields[11]) / CLK_TCK, int(fields[12]) / CLK_TCK, vol, invol
+
+
+class ResourceMeter:
+    """Resource usage of this process between construction and close()."""
+
+    def __init__(self, interval: float = TASK_POLL_S):
+        self.interval = interval
+        self.tasks: Dict[str, tuple] = {}     # tid -> (group, user_s, sys_s, vol, invol)
+        self.samples = 0
+        self.sample_s = 0.0
+        self.start_wall = time.monotonic()
+        self.start = resource.getrusage(resource.RUSAGE_SELF)
+        self.per_thread = os.path.isdir(TASK_DIR)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.base: Dict[str, tuple] = {}
+        if self.per_thread:
+            self._sample()
+            self.base, self.tasks = self.tasks, {}
+            self.samples, self.sample_s = 0, 0.0
+            self.thread = threading.Thread(target=self._run, name="rusage", daemon=True)
+            self.thread.start()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        c0 = time.perf_counter()
+        names = {t.native_id: t.name for t in threading.enumerate()}
+        try:
+            tids = os.listdir(TASK_DIR)
+        except OSError:
+            tids = []
+        for tid in tids:
+            task = read_task(tid)
+            if task is None:
+                continue
+            comm, user, sys_, vol, invol = task
+            prev = self.tasks.get(tid)
+            group = prev[0] if prev else thread_group(names.get(int(tid), comm))
+            self.tasks[tid] = (group, user, sys_, vol, invol)
+        self.samples += 1
+        self.sample_s += time.perf_counter() - c0
+
+    def close(self) -> dict:
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self._sample()
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        wall = time.monotonic() - self.start_wall
+        user = end.ru_utime - self.start.ru_utime
+        sys_ = end.ru_stime - self.start.ru_stime
+        return {
+            "pid": os.getpid(),
+            "wall_s": wall,
+            "user_s": user,
+            "sys_s": sys_,
+            "cpu_s": user + sys_,
+            "cpu_util": (user + sys_) / wall if wall > 0 else 0.0,
+            "vol_cs": end.ru_nvcsw - self.start.ru_nvcsw,
+            "invol_cs": end.ru_nivcsw - self.start.ru_nivcsw,
+            "max_rss_kb": end.ru_maxrss,
+            "threads": self._threads() if self.per_thread else None,
+            "samples": self.samples,
+            "sample_s": self.sample_s,
+        }
+
+    def _threads(self) -> Dict[str, dict]:
+        """Per-group totals over the run. Thread counters are lifetime values,
+        so threads that predate the meter (e.g. MainThread) have their usage
+        at open subtracted."""
+        groups: Dict[str, dict] = {}
+        for tid, (group, *usage) in self.tasks.items():
+            base = self.base.get(tid, (group, 0, 0, 0, 0))[1:]
+            g = groups.setdefault(group, dict.fromkeys(THREAD_FIELDS, 0))
+            g["count"] += 1
+            for k, now, then in zip(THREAD_FIELDS[1:], usage, base):
+                g[k] += now - then
+        return groups
+
+
+def merge_usage(usages: List[dict]) -> Optional[dict]:
+    """Sum per-process usage dicts; peak RSS is the largest single process."""
+    usages = [u for u in usages if u]
+    if not usages:
+        return None
+    out = {k: sum(u[k] for u in usages)
+           for k in ("user_s", "sys_s", "cpu_s", "cpu_util", "vol_cs", "invol_cs",
+                     "samples", "sample_s")}
+    out["wall_s"] = max(u["wall_s"] for u in usages)
+    out["max_rss_kb"] = max(u["max_rss_kb"] for u in usages)
+    out["procs"] = len(usages)
+    threads: Dict[str, dict] = {}
+    for u in usages:
+        for group, g in (u.get("threads") or {}).items():
+            t = threads.setdefault(group, dict.fromkeys(THREAD_FIELDS, 0))
+            for k in THREAD_FIELDS:
+                t[k] += g[k]
+    out["threads"] = threads if any(u.get("threads") is not None for u in usages) else None
+    return out
+
+
+def efficiency(usage: Optional[dict], requests: int, payload_bytes: int) -> Optional[dict]:
+    """usage plus cpu_us_per_request and bytes_per_cpu_s for `requests` echoes of
+    payload_bytes each (echoed payload bytes, one direction)."""
+    if usage is None:
+        return None
+    out = dict(usage)
+    cpu = usage["cpu_s"]
+    out["requests"] = requests
+    out["cpu_us_per_request"] = cpu * 1e6 / requests if requests else None
+    out["bytes_per_cpu_s"] = requests * payload_bytes / cpu if cpu > 0 else None
+    return out
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Adaptive saturation search over client count or offered load (sweep.py --search).
+
+A fixed list of client counts puts the knee of the throughput curve
+somewhere between two points. SaturationSearch looks for two load levels
+with as few runs as it can:
+
+- the knee: the lowest load at which throughput reaches KNEE_FRACTION of
+  the highest throughput seen, so more load buys almost nothing;
+- the crossing: the lowest load at which the chosen metric (p99 latency
+  or UDP loss rate) goes past a threshold.
+
+The search doubles the load from its lower bound until throughput has
+levelled off (a doubling gained less than 1 / KNEE_FRACTION) and the
+metric has crossed the threshold, or the upper bound is reached. It then
+bisects each bracket (last load below the target, first load at or past
+it) until the bracket is within `resolution` of its upper end, or one
+client apart. Every probed load is measured `repeats` times and decided
+on the mean.
+
+Each estimate gets a confidence interval. The measured repeats are
+bootstrapped (resampled with replacement per load, BOOTSTRAP times), and
+the estimate is recomputed from each resample. The interval runs from the
+lower CONFIDENCE percentile of those estimates to the upper one, widened
+to cover the final bracket, since the true level can lie anywhere inside
+it.
+"""
+import math
+import random
+from typing import Callable, Dict, List, Optional
+
+KNEE_FRACTION = 0.95
+REPEATS = 3
+RESOLUTION = 0.05
+CONFIDENCE = 0.95
+BOOTSTRAP = 1000
+MAX_PROBES = 40             # loads probed per search, whatever the noise does to the brackets
+METRICS = ("p99", "loss")
+
+
+def metrics(meta: dict) -> dict:
+    """Throughput (echoes/s), p99 latency (s) and loss rate of one client meta JSON."""
+    window = meta.get("window") or {}
+    if meta["proto"] == "tcp":
+        elapsed = window.get("measured_s") or meta.get("elapsed", 0.0)
+        done = int(meta.get("total_requests", 0))
+        loss = 0.0
+    else:
+        elapsed = window.get("measured_s") or meta.get("elapsed_s", 0.0)
+        expected = int(meta.get("expected_replies", 0))
+        lost = int(meta.get("lost_replies", 0))
+        done = int(meta.get("completed", expected - lost))
+        loss = lost / expected if expected else 0.0
+    latency = meta.get("latency") or {}
+    return {
+        "rps": done / elapsed if elapsed > 0 else 0.0,
+        "p99": latency.get("p99") or 0.0,
+        "loss": loss,
+    }
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def knee_of(rps: Dict[float, float], fraction: float = KNEE_FRACTION) -> Optional[float]:
+    """Lowest load whose throughput is within fraction of the highest, or
+    None while the highest is still at the last load probed (no plateau yet)."""
+    if len(rps) < 2:
+        return None
+    loads = sorted(rps)
+    top = max(rps.values())
+    knee = next(x for x in loads if rps[x] >= fraction * top)
+    return knee if knee < loads[-1] else None
+
+
+def crossing_of(values: Dict[float, float], threshold: float) -> Optional[float]:
+    """Lowest load whose metric is past threshold, or None."""
+    return next((x for x in sorted(values) if values[x] > threshold), None)
+
+
+class SaturationSearch:
+    """Search over loads lo .. hi; measure(load) runs one probe and returns metrics()."""
+
+    def __init__(self, measure: Callable[[float], dict], lo: float, hi: float,
+                 metric: str = "p99", threshold: float = 0.01, integer: bool = True,
+                 fraction: float = KNEE_FRACTION, repeats: int = REPEATS,
+                 resolution: float = RESOLUTION):
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}")
+        if not 0 < lo < hi:
+            raise ValueError("search range needs 0 < lo < hi")
+        if repeats < 1:
+            raise ValueError("repeats must be >= 1")
+        self.measure = measure
+        self.lo = lo
+        self.hi = hi
+        self.metric = metric
+        self.threshold = threshold
+        self.integer = integer
+        self.fraction = fraction
+        self.repeats = repeats
+        self.resolution = resolution
+        self.samples: Dict[float, List[dict]] = {}
+        self.runs = 0
+
+    def probe(self, x: float) -> None:
+        if x in self.samples:
+            return
+        self.samples[x] = []
+        for _ in range(self.repeats):
+            self.samples[x].append(self.measure(x))
+            self.runs += 1
+
+    def means(self, key: str, samples: Dict[float, List[dict]] = None) -> Dict[float, float]:
+        samples = samples or self.samples
+        return {x: _mean([s[key] for s in runs]) for x, runs in samples.items()}
+
+    def _midpoint(self, below: float, above: float) -> Optional[float]:
+        """Next load to try inside (below, above), or None once the bracket is narrow enough."""
+        if above - below <= max(1 if self.integer else 0, self.resolution * above):
+            return None
+        mid = (below + above) / 2
+        if self.integer:
+            mid = int(mid)
+            return mid if below < mid < above else None
+        return mid
+
+    def _below(self, x: float) -> Optional[float]:
+        return max((p for p in self.samples if p < x), default=None)
+
+    def _ramp(self) -> None:
+        x = self.lo
+        prev = None
+        while True:
+            self.probe(x)
+            rps = self.means("rps")
+            flat = prev is not None and rps[x] < rps[prev] / self.fraction
+            crossed = crossing_of(self.means(self.metric), self.threshold) is not None
+            if (flat and crossed) or x >= self.hi:
+                return
+            prev = x
+            x = min(self.hi, x * 2)
+
+    def _refine(self, find: Callable[[], Optional[float]]) -> None:
+        while len(self.samples) < MAX_PROBES:
+            target = find()
+            below = self._below(target) if target is not None else None
+            if below is None:
+                return
+            mid = self._midpoint(below, target)
+            if mid is None:
+                return
+            self.probe(mid)
+
+    def _estimate(self, find: Callable[[Dict[float, List[dict]]], Optional[float]], rng) -> dict:
+        value = find(self.samples)
+        if value is None:
+            return {"value": None, "bracket": None, "ci": None}
+        below = self._below(value)
+        boot = []
+        for _ in range(BOOTSTRAP):
+            resample = {x: [rng.choice(runs) for _ in runs] for x, runs in self.samples.items()}
+            est = find(resample)
+            if est is not None:
+                boot.append(est)
+        tail = (1 - CONFIDENCE) / 2
+        lo = _percentile(boot, tail) if boot else value
+        hi = _percentile(boot, 1 - tail) if boot else value
+        return {
+            "value": value,
+            "bracket": [below, value],
+            "ci": [min(lo, below if below is not None else value), max(hi, value)],
+            "confidence": CONFIDENCE,
+            "resolved": len(boot) / BOOTSTRAP,   # share of resamples that found it at all
+        }
+
+    def run(self, seed: int = 0) -> dict:
+        def knee(samples=None):
+            return knee_of(self.means("rps", samples), self.fraction)
+
+        def crossing(samples=None):
+            return crossing_of(self.means(self.metric, samples), self.threshold)
+
+        self._ramp()
+        self._refine(knee)
+        self._refine(crossing)
+        rng = random.Random(seed)
+        rps = self.means("rps")
+        return {
+            "metric": self.metric,
+            "threshold": self.threshold,
+            "knee_fraction": self.fraction,
+            "repeats": self.repeats,
+            "runs": self.runs,
+            "range": [self.lo, self.hi],
+            "max_rps": max(rps.values()),
+            "knee": self._estimate(knee, rng),
+            "crossing": self._estimate(crossing, rng),
+            "probes": [
+                {"load": x, **{k: _mean([s[k] for s in runs]) for k in ("rps", "p99", "loss")},
+                 "rps_sd": math.sqrt(_mean([(s["rps"] - rps[x]) ** 2 for s in runs])),
+                 "samples": runs}
+                for x, runs in sorted(self.samples.items())
+            ],
+        }
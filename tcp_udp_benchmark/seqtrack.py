@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Per-client sequence tracking for UDP echoes: loss bursts, reordering and
+duplicates (client.py, meta "loss_pattern").
+
+A SeqTracker keeps one bitmap per logical client (a bytearray, one bit per
+sequence number, grown as timed runs go on), the highest sequence number
+seen per client (an array), a reorder-distance histogram and a duplicate
+counter. add() is called once per echo and allocates nothing.
+
+- An echo whose bit is already set is a duplicate. It is not counted as a
+  reply at all.
+- An echo below its client's highest sequence so far arrived out of order.
+  Its reorder distance is how far below the highest it was (RFC 4737's
+  "reordering extent", roughly). Distances are counted in power-of-two
+  buckets: 1, 2-3, 4-7, ...
+
+stats() walks the bitmaps once at the end of the run. Each client's lost
+sequence numbers form runs of consecutive misses, and the run lengths are
+the loss-burst distribution: isolated drops show up as bursts of 1, while a
+full receive queue or a stalled reader drops long runs. Only the range each
+client sent inside the measurement window is walked, so the lost count
+matches lost_replies. Reordering and duplicates cover every echo.
+"""
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+SEQ_PRESIZE = 1 << 16       # bits per client allocated up front for unbounded (timed) runs
+REORDER_BUCKETS = 33        # distance bit lengths 1..32; longer distances share the last bucket
+
+
+def bucket_label(k: int) -> str:
+    """Distances counted in reorder bucket k (bit length k)."""
+    low, high = 1 << (k - 1), (1 << k) - 1
+    return str(low) if low == high else f"{low}-{high}"
+
+
+class SeqTracker:
+    """Received-sequence bitmaps of clients cid_base .. cid_base + clients - 1."""
+
+    def __init__(self, cid_base: int, clients: int, requests: int = SEQ_PRESIZE):
+        self.base = cid_base
+        self.n = clients
+        nbytes = (min(requests, SEQ_PRESIZE) + 7) >> 3
+        self.maps = [bytearray(nbytes) for _ in range(clients)]
+        self.highest = array("q", [-1]) * clients
+        self.distance = array("Q", bytes(8 * REORDER_BUCKETS))
+        self.unique = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.foreign = 0        # client id outside this tracker's range
+
+    def add(self, cid: int, seq: int) -> bool:
+        """Mark one echo; False for a duplicate (or foreign) echo, which the
+        caller should not count as a reply."""
+        c = cid - self.base
+        if not 0 <= c < self.n:
+            self.foreign += 1
+            return False
+        bits = self.maps[c]
+        i = seq >> 3
+        if i >= len(bits):
+            bits.extend(bytes(max(i + 1 - len(bits), len(bits))))
+        m = 1 << (seq & 7)
+        if bits[i] & m:
+            self.duplicates += 1
+            return False
+        bits[i] |= m
+        self.unique += 1
+        top = self.highest[c]
+        if seq < top:
+            self.reordered += 1
+            self.distance[min((top - seq).bit_length(), REORDER_BUCKETS - 1)] += 1
+        else:
+            self.highest[c] = seq
+        return True
+
+    def bursts(self, c: int, first: int, count: int, out: Dict[int, int]) -> int:
+        """Add client index c's runs of missing sequence numbers in
+        [first, first + count) to out (length -> runs); returns the number missing."""
+        bits = self.maps[c]
+        run = lost = 0
+        seq, end = first, first + count
+        while seq < end:
+            i = seq >> 3
+            byte = bits[i] if i < len(bits) else 0
+            if seq & 7 == 0 and seq + 8 <= end and byte in (0x00, 0xFF):
+                # whole byte at once
+                if byte:
+                    if run:
+                        out[run] = out.get(run, 0) + 1
+                        lost += run
+                        run = 0
+                else:
+                    run += 8
+                seq += 8
+                continue
+            if byte >> (seq & 7) & 1:
+                if run:
+                    out[run] = out.get(run, 0) + 1
+                    lost += run
+                    run = 0
+            else:
+                run += 1
+            seq += 1
+        if run:
+            out[run] = out.get(run, 0) + 1
+            lost += run
+        return lost
+
+    def stats(self, ranges: List[Tuple[int, int]]) -> dict:
+        """Counters plus loss bursts; ranges[c] is (first seq, count) that client
+        index c sent inside the measurement window."""
+        lengths: Dict[int, int] = {}
+        lost = sum(self.bursts(c, first, count, lengths)
+                   for c, (first, count) in enumerate(ranges) if count)
+        return {
+            "unique": self.unique,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "foreign": self.foreign,
+            "lost": lost,
+            "burst_lengths": lengths,
+            "reorder_distance": list(self.distance),
+        }
+
+
+def merge_seq_stats(stats: List[Optional[dict]]) -> Optional[dict]:
+    """Sum SeqTracker.stats() of several processes (disjoint client ids)."""
+    stats = [s for s in stats if s]
+    if not stats:
+        return None
+    out = {k: sum(s[k] for s in stats)
+           for k in ("unique", "reordered", "duplicates", "foreign", "lost")}
+    out["burst_lengths"] = {}
+    for s in stats:
+        for length, n in s["burst_lengths"].items():
+            out["burst_lengths"][length] = out["burst_lengths"].get(length, 0) + n
+    out["reorder_distance"] = [sum(col) for col in zip(*(s["reorder_distance"] for s in stats))]
+    return out
+
+
+def loss_pattern(stats: Optional[dict]) -> Optional[dict]:
+    """The meta's "loss_pattern" block from (merged) stats."""
+    if stats is None:
+        return None
+    lengths = stats["burst_lengths"]
+    bursts = sum(lengths.values())
+    unique = stats["unique"]
+    return {
+        "lost": stats["lost"],
+        "bursts": bursts,
+        "mean_burst": stats["lost"] / bursts if bursts else 0.0,
+        "max_burst": max(lengths, default=0),
+        "burst_lengths": {str(k): lengths[k] for k in sorted(lengths)},
+        "reordered": stats["reordered"],
+        "reorder_rate": stats["reordered"] / unique if unique else 0.0,
+        "reorder_distance": {bucket_label(k): n for k, n in enumerate(stats["reorder_distance"])
+                             if k and n},
+        "duplicates": stats["duplicates"],
+        "duplicate_rate": stats["duplicates"] / unique if unique else 0.0,
+        "foreign": stats["foreign"],
+    }
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Per-interval time series of run counters (client.py/server.py --series-interval).
+
+Workers keep their own cumulative counters (SeriesCell on the client, EchoTally
+cells on the server) and never take a lock. A SeriesSampler thread wakes on a
+schedule anchored at the run start (phases.t0), reads the counters through a
+snapshot() callable and appends one JSON line per sample:
+
+  {"t": seconds since t0, <cumulative counters>...,
+   "lat": [[bucket, count], ...], "p50_s": ..., "p99_s": ...}
+
+"lat" is the latencies recorded during that interval only, in half-octave
+buckets (coarse_index), so each line is a few hundred bytes at most. Because
+the schedule is anchored at a shared t0, the files written by --procs /
+--workers processes line up sample for sample and merge_series() sums them.
+
+Usage: python3 series.py results/tcp_series_c10_r100_p512.jsonl ...   (plots to plots/)
+"""
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+MAX_OCTAVE = 40                     # 2**40 ns (~18 min); larger values land in the top bucket
+COARSE_BUCKETS = 2 * MAX_OCTAVE     # two buckets per power of two: <= 1/3 relative error
+T0_POLL_S = 0.005                   # how often the sampler checks whether the run has started
+
+
+def coarse_index(ns: int) -> int:
+    """Half-octave bucket of ns: values in [2**(b-1), 2**b) split on their second bit."""
+    if ns <= 1:
+        return ns if ns > 0 else 0
+    b = ns.bit_length()
+    idx = 2 * b - 2 + ((ns >> (b - 2)) & 1)
+    return idx if idx < COARSE_BUCKETS else COARSE_BUCKETS - 1
+
+
+def coarse_value(idx: int) -> int:
+    """Midpoint (in ns) of the values that map to bucket idx."""
+    if idx < 2:
+        return idx
+    shift = idx // 2 - 1
+    return ((2 | (idx & 1)) << shift) + ((1 << shift) >> 1)
+
+
+def coarse_percentile(counts: List[int], q: float) -> Optional[float]:
+    """Value (seconds) at percentile q of a coarse bucket list, or None when empty."""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = max(1, int(round(q / 100.0 * total)))
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= rank:
+            return coarse_value(i) / 1e9
+    return coarse_value(len(counts) - 1) / 1e9
+
+
+class SeriesCell:
+    """Cumulative counters owned by one worker thread (or coroutine).
+
+    Only the owner writes them; the sampler reads them without a lock, which
+    is safe under the GIL and at worst one request behind."""
+
+    __slots__ = ("sent", "done", "bytes", "lat")
+
+    def __init__(self):
+        self.sent = 0       # requests / datagrams sent
+        self.done = 0       # replies received
+        self.bytes = 0      # echoed payload bytes received
+        self.lat = array("Q", bytes(8 * COARSE_BUCKETS))
+
+    def record_ns(self, ns: int, nbytes: int) -> None:
+        self.done += 1
+        self.bytes += nbytes
+        self.lat[coarse_index(ns)] += 1
+
+
+class SeriesCells:
+    """Every SeriesCell of one client process; snapshot() sums them."""
+
+    def __init__(self):
+        self.cells: List[SeriesCell] = []
+
+    def cell(self) -> SeriesCell:
+        c = SeriesCell()
+        self.cells.append(c)
+        return c
+
+    def snapshot(self) -> dict:
+        cells = list(self.cells)
+        sent = sum(c.sent for c in cells)
+        done = sum(c.done for c in cells)
+        return {
+            "sent": sent,
+            "done": done,
+            "bytes": sum(c.bytes for c in cells),
+            # sent but not (yet) answered: in flight, or lost for UDP
+            "unanswered": sent - done,
+            "lat": [sum(col) for col in zip(*(c.lat for c in cells))] if cells else None,
+        }
+
+
+class SeriesSampler:
+    """Appends snapshot() to `path` as JSON lines every `interval` seconds.
+
+    Sampling starts once phases.t0 is set and samples are due at
+    t0 + k * interval, so late wakeups never drift the schedule. close()
+    takes one last sample and returns the sampler's own counters, including
+    sample_s, the time spent taking samples."""
+
+    def __init__(self, path: str, interval: float, phases, snapshot: Callable[[], dict]):
+        self.path = path
+        self.interval = interval
+        self.phases = phases
+        self.snapshot = snapshot
+        self.prev_lat: Optional[List[int]] = None
+        self.stats = {"path": os.path.basename(path), "interval_s": interval,
+                      "samples": 0, "sample_s": 0.0}
+        self.fp = open(path, "w")
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"series:{self.stats['path']}",
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while self.phases.t0 is None:
+            if self.stop_event.wait(T0_POLL_S):
+                return
+        t0 = self.phases.t0
+        k = 1
+        while not self.stop_event.wait(max(0.0, t0 + k * self.interval - time.monotonic())):
+            self._sample(t0)
+            k += 1
+
+    def _sample(self, t0: float) -> None:
+        c0 = time.perf_counter()
+        snap = self.snapshot()
+        line = {"t": round(time.monotonic() - t0, 6)}
+        lat = snap.pop("lat", None)
+        line.update(snap)
+        if lat is not None:
+            delta = lat if self.prev_lat is None else [a - b for a, b in zip(lat, self.prev_lat)]
+            self.prev_lat = lat
+            line.update(interval_latency(delta))
+        self.fp.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.stats["samples"] += 1
+        self.stats["sample_s"] += time.perf_counter() - c0
+
+    def close(self) -> dict:
+        self.stop_event.set()
+        self.thread.join()
+        if self.phases.t0 is not None:
+            self._sample(self.phases.t0)
+        self.fp.close()
+        return dict(self.stats)
+
+
+def interval_latency(delta: List[int]) -> dict:
+    return {
+        "lat": [[i, c] for i, c in enumerate(delta) if c],
+        "p50_s": coarse_percentile(delta, 50.0),
+        "p99_s": coarse_percentile(delta, 99.0),
+    }
+
+
+#### merging #####
+def read_series(path) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def merge_series(paths: List[str], out_path: str, remove: bool = True) -> int:
+    """Sum per-process series files sample by sample into out_path.
+
+    Cumulative counters of a file that ran out of samples are carried
+    forward; interval latencies are added bucket by bucket. Returns the
+    number of merged samples."""
+    series = [read_series(p) for p in paths if os.path.exists(p)]
+    n = max((len(s) for s in series), default=0)
+    with open(out_path, "w") as fp:
+        for i in range(n):
+            line: Dict[str, object] = {}
+            counts = [0] * COARSE_BUCKETS
+            has_lat = False
+            for s in series:
+                if not s:
+                    continue
+                row = s[min(i, len(s) - 1)]
+                line["t"] = max(line.get("t", 0.0), row["t"])
+                for k, v in row.items():
+                    if k in ("t", "lat", "p50_s", "p99_s") or not isinstance(v, int):
+                        continue
+                    line[k] = line.get(k, 0) + v
+                if "lat" in row:
+                    has_lat = True
+                    if i < len(s):
+                        for idx, c in row["lat"]:
+                            counts[idx] += c
+            if has_lat:
+                line.update(interval_latency(counts))
+            fp.write(json.dumps(line, separators=(",", ":")) + "\n")
+    if remove:
+        for p in paths:
+            if os.path.exists(p):
+                os.remove(p)
+    return n
+
+
+#### plotting #####
+def plot(path: Path, plots_dir: Path) -> Path:
+    """Throughput (replies or echoes per second) and interval p50/p99 over time."""
+    import matplotlib.pyplot as plt
+
+    rows = read_series(path)
+    key = "done" if rows and "done" in rows[0] else "echoed"
+    ts, rates, p50, p99 = [], [], [], []
+    prev_t, prev_n = 0.0, 0
+    for row in rows:
+        dt = row["t"] - prev_t
+        if dt > 0:
+            ts.append(row["t"])
+            rates.append((row.get(key, 0) - prev_n) / dt)
+            p50.append(row.get("p50_s"))
+            p99.append(row.get("p99_s"))
+        prev_t, prev_n = row["t"], row.get(key, 0)
+
+    fig, ax = plt.subplots()
+    ax.plot(ts, rates, label=f"{key}/s")
+    ax.set_xlabel("time since start (s)")
+    ax.set_ylabel(f"{key} per second")
+    if any(v is not None for v in p99):
+        ax2 = ax.twinx()
+        ax2.plot(ts, [v * 1e3 if v is not None else float("nan") for v in p50], "g--", label="p50")
+        ax2.plot(ts, [v * 1e3 if v is not None else float("nan") for v in p99], "r--", label="p99")
+        ax2.set_ylabel("interval latency (ms)")
+        ax2.legend(loc="upper right")
+    ax.set_title(path.stem)
+    fig.tight_layout()
+    plots_dir.mkdir(exist_ok=True)
+    out_path = plots_dir / f"{path.stem}.png"
+    fig.savefig(out_path, dpi=200)
+    plt.close(fig)
+    return out_path
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    plots_dir = Path(__file__).resolve().parent / "plots"
+    for arg in sys.argv[1:]:
+        print(f"Wrote {plot(Path(arg), plots_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,32 @@ TCP/UDP echo server boilerplate.
 """
 
 import argparse
+import asyncio
+import multiprocessing as mp
 import os
+import queue
+import select
+import selectors
+import signal
 import socket
 import threading
 import json
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import kstats
+from control import (CONTROL_PORT, END_RUN_TIMEOUT_S, PROTO_VERSION, LineReader, check_spec, is_unix,
+                     send_line)
+from clocksync import (PROBE_BYTES, STAMP, TCP_STAMP_AT, UDP_STAMP_AT, ClockResponder, is_probe,
+                       stamp_into)
+from netio import RecvBuffer, recv_exact_tcp
+from phases import Phases
+from profiler import PROFILE_HZ, StackSampler, merge_profiles
+from resultio import part_stem
+from rusage import ResourceMeter, efficiency, merge_usage
+from series import SeriesSampler, merge_series
 
 
 #### helper functions #####
@@ -25,134 +46,1114 @@ def log_event(fp, event: dict):
     fp.flush()
 
 
-def recv_exact_tcp(conn: socket.socket, n: int) -> bytes:
-    """Receive exactly n bytes from a TCP stream (or b'' if the client closes)."""
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = conn.recv(n - len(buf))
-        if not chunk:          # client closed connection
-            return b""
-        buf.extend(chunk)
-    return bytes(buf)
-
-def handle_client_tcp(conn: socket.socket, addr, payload_bytes: int, requests: int):
-    """Handle one TCP connection: receive+echo payload_bytes, repeated 'requests' times."""
-    with conn:
-        for i in range(requests):
-            data = recv_exact_tcp(conn, payload_bytes)
-            if not data:
-                # client closed early
-                break
+def handle_client_tcp(conn: socket.socket, addr, payload_bytes: int, requests: int,
+                      cell: List[int] = None, stamp: bool = False) -> int:
+    """Handle one TCP connection: receive+echo payload_bytes, repeated 'requests' times.
+    Returns the number of requests echoed (also kept in cell[0], see EchoTally).
+    With stamp, each echo carries the server's receive/send times (see clocksync.py)."""
+    echoed = 0
+    rbuf = RecvBuffer(payload_bytes)
+    cell = cell or [0, 1]
+    try:
+        with conn:
+            for i in range(requests):
+                data = recv_exact_tcp(conn, payload_bytes, rbuf)
+                if not data:
+                    # client closed early
+                    break
+                if stamp:
+                    stamp_into(data, TCP_STAMP_AT, time.monotonic_ns())
+
+                conn.sendall(data)  # echo back to client, straight from the receive buffer
+                echoed += 1
+                cell[0] = echoed
+    finally:
+        cell[1] = 0
+    return echoed
+
+
+#### run phases #####
+# per-connection request count for timed runs: connections echo until the client closes
+UNBOUNDED = sys.maxsize
+WINDOW_POLL_S = 0.005  # how often WindowCounter looks for the first echo
+
+
+class EchoTally:
+    """Echo counters the serving threads bump without taking a lock.
+
+    Every connection (or UDP loop) gets its own [echoed, open] list from
+    cell() and is its only writer; a connection clears `open` when it closes.
+    Readers sum the cells, so a reading can trail the true count by an echo
+    or two, but the echo path never contends on anything."""
+
+    def __init__(self):
+        self.cells: List[List[int]] = []
+
+    def cell(self, conn: bool = True) -> List[int]:
+        c = [0, 1 if conn else 0]
+        self.cells.append(c)
+        return c
+
+    def total(self) -> int:
+        return sum(c[0] for c in list(self.cells))
+
+    def active(self) -> int:
+        """Connections accepted and not yet closed."""
+        return sum(c[1] for c in list(self.cells))
+
+    def snapshot(self) -> dict:
+        """Cumulative counters for a series.SeriesSampler."""
+        cells = list(self.cells)
+        return {"echoed": sum(c[0] for c in cells), "active": sum(c[1] for c in cells)}
+
+
+class WindowCounter:
+    """Counts the echoes that land inside the measurement window of `phases`.
+
+    The server cannot see the clients' start barrier, so its clock starts at
+    the first echo it sees (with --workers, the first echo on any worker, via
+    shared_t0). A background thread snapshots tally.total() when the window
+    opens and closes, so the echo loops themselves are untouched."""
+
+    def __init__(self, tally: EchoTally, phases: Phases, shared_t0=None):
+        self.tally = tally
+        self.phases = phases
+        self.shared_t0 = shared_t0
+        self.at_open = None
+        self.at_close = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="window", daemon=True)
+        self.thread.start()
+
+    def _first_echo(self):
+        """Monotonic time of the first echo, or None if the run ends without one."""
+        shared = self.shared_t0
+        while not self.stop_event.is_set():
+            if shared is not None and shared.value:
+                return shared.value
+            if self.tally.total():
+                t0 = now_mono()
+                if shared is None:
+                    return t0
+                with shared.get_lock():
+                    if not shared.value:
+                        shared.value = t0
+                    return shared.value
+            self.stop_event.wait(WINDOW_POLL_S)
+        return None
+
+    def _run(self) -> None:
+        t0 = self._first_echo()
+        if t0 is None:
+            return
+        self.phases.begin(t0)
+        if self.phases.warmup <= 0:
+            self.at_open = 0    # the window opens with the very first echo
+        elif self.stop_event.wait(max(0.0, self.phases.w_start - now_mono())):
+            return
+        else:
+            self.at_open = self.tally.total()
+        if self.phases.timed and not self.stop_event.wait(max(0.0, self.phases.w_end - now_mono())):
+            self.at_close = self.tally.total()
+
+    def close(self) -> dict:
+        """Stop the counter; returns the window boundaries plus echoed_in_window."""
+        self.stop_event.set()
+        self.thread.join()
+        window = self.phases.to_dict(now_mono())
+        if self.at_open is None:
+            window["echoed_in_window"] = 0
+        else:
+            at_close = self.tally.total() if self.at_close is None else self.at_close
+            window["echoed_in_window"] = at_close - self.at_open
+        return window
+
+
+#### accept accounting #####
+ACCEPT_POLL_S = 0.2  # how often accept loops re-check a quota shared with other workers
+
+
+class AcceptQuota:
+    """Counts accepted TCP connections until `clients` have been accepted.
+
+    With --workers the count lives in a multiprocessing.Value shared by every
+    worker, so each process stops accepting once the whole server is done."""
+
+    def __init__(self, clients: int, shared=None):
+        self.clients = clients
+        self.shared = shared
+        self.local = 0      # connections accepted by this process
+
+    def accepted(self) -> None:
+        self.local += 1
+        if self.shared is not None:
+            with self.shared.get_lock():
+                self.shared.value += 1
+
+    def exhausted(self) -> bool:
+        total = self.shared.value if self.shared is not None else self.local
+        return total >= self.clients
+
+
+def accept_all(server_socket: socket.socket, quota: AcceptQuota):
+    """Yield (conn, addr) for each accepted connection until the quota is used up."""
+    if quota.shared is not None:
+        server_socket.settimeout(ACCEPT_POLL_S)
+    while not quota.exhausted():
+        try:
+            conn, addr = server_socket.accept()
+        except socket.timeout:
+            continue
+        quota.accepted()
+        yield conn, addr
+
+
+#### TCP server engines #####
+# Each engine serves connections on an already-listening socket until its
+# AcceptQuota is exhausted and every accepted connection has closed, and
+# returns the number of requests echoed back. Echoes are also counted live
+# in one EchoTally cell per connection. With stamp, every echo carries the
+# server's receive and send times (see clocksync.py).
+
+def tcp_engine_threads(server_socket: socket.socket, payload_bytes: int,
+                       requests: int, quota: AcceptQuota, pool_size: int,
+                       tally: EchoTally, stamp: bool = False) -> int:
+    """One OS thread per accepted connection."""
+    echoed: List[int] = []
+
+    def worker(conn: socket.socket, addr):
+        echoed.append(handle_client_tcp(conn, addr, payload_bytes, requests, tally.cell(), stamp))
+
+    threads = []
+    for conn, addr in accept_all(server_socket, quota):
+        t = threading.Thread(
+            target=worker,
+            args=(conn, addr),
+            daemon=True
+        )
+        t.start()
+        threads.append(t)
+
+    # Wait for all clients to finish
+    for t in threads:
+        t.join()
+    return sum(echoed)
+
+
+def tcp_engine_pool(server_socket: socket.socket, payload_bytes: int,
+                    requests: int, quota: AcceptQuota, pool_size: int,
+                    tally: EchoTally, stamp: bool = False) -> int:
+    """Bounded thread pool; connections beyond pool_size queue until a worker frees up."""
+    with ThreadPoolExecutor(max_workers=max(1, pool_size)) as pool:
+        futures = []
+        for conn, addr in accept_all(server_socket, quota):
+            futures.append(pool.submit(handle_client_tcp, conn, addr, payload_bytes, requests,
+                                       tally.cell(), stamp))
+        return sum(f.result() for f in futures)
+
+
+class _EchoConn:
+    """Per-connection state for the selectors engine."""
+    __slots__ = ("sock", "buf", "view", "got", "sent", "done", "cell", "recv_ns")
+
+    def __init__(self, sock: socket.socket, payload_bytes: int, cell: List[int]):
+        self.sock = sock
+        self.cell = cell
+        self.buf = bytearray(payload_bytes)
+        self.view = memoryview(self.buf)
+        self.got = 0      # bytes of the current request received
+        self.sent = 0     # bytes of the current request echoed
+        self.done = 0     # requests fully echoed
+        self.recv_ns = 0  # when the current request was complete (--stamp)
+
+
+def tcp_engine_selectors(server_socket: socket.socket, payload_bytes: int,
+                         requests: int, quota: AcceptQuota, pool_size: int,
+                         tally: EchoTally, stamp: bool = False) -> int:
+    """Single-threaded readiness loop (epoll on Linux, kqueue on macOS)."""
+    sel = selectors.DefaultSelector()
+    server_socket.setblocking(False)
+    sel.register(server_socket, selectors.EVENT_READ, None)
+
+    listening = True
+    open_conns = 0
+    echoed = 0
+
+    def close(st: _EchoConn):
+        nonlocal open_conns
+        sel.unregister(st.sock)
+        st.sock.close()
+        st.cell[1] = 0
+        open_conns -= 1
+
+    try:
+        while listening or open_conns > 0:
+            if listening and quota.exhausted():
+                sel.unregister(server_socket)
+                listening = False
+                continue
+            for key, mask in sel.select(ACCEPT_POLL_S if listening else None):
+                if key.data is None:
+                    # drain the accept queue
+                    while not quota.exhausted():
+                        try:
+                            conn, _ = server_socket.accept()
+                        except BlockingIOError:
+                            break
+                        conn.setblocking(False)
+                        sel.register(conn, selectors.EVENT_READ,
+                                     _EchoConn(conn, payload_bytes, tally.cell()))
+                        quota.accepted()
+                        open_conns += 1
+                    continue
+
+                st: _EchoConn = key.data
+                try:
+                    if mask & selectors.EVENT_READ and st.got < payload_bytes:
+                        n = st.sock.recv_into(st.view[st.got:])
+                        if n == 0:      # client closed connection
+                            close(st)
+                            continue
+                        st.got += n
+                        if stamp and st.got == payload_bytes:
+                            st.recv_ns = time.monotonic_ns()
+                    if st.got == payload_bytes:
+                        if stamp and st.sent == 0:
+                            stamp_into(st.buf, TCP_STAMP_AT, st.recv_ns)
+                        st.sent += st.sock.send(st.view[st.sent:])
+                        if st.sent < payload_bytes:
+                            # socket buffer full: wait for writability
+                            sel.modify(st.sock, selectors.EVENT_WRITE, st)
+                            continue
+                        st.got = st.sent = 0
+                        st.done += 1
+                        echoed += 1
+                        st.cell[0] = st.done
+                        if st.done >= requests:
+                            close(st)
+                            continue
+                        if mask & selectors.EVENT_WRITE:
+                            sel.modify(st.sock, selectors.EVENT_READ, st)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    close(st)
+    finally:
+        sel.close()
+    return echoed
+
+
+class _EchoProtocol(asyncio.Protocol):
+    """Echoes bytes as they arrive; closes after requests * payload_bytes bytes."""
+
+    def __init__(self, total_bytes: int, payload_bytes: int, on_close, cell: List[int]):
+        self.total_bytes = total_bytes
+        self.payload_bytes = payload_bytes
+        self.on_close = on_close
+        self.cell = cell
+        self.seen = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        self.seen += len(data)
+        self.transport.write(data)
+        self.cell[0] = self.seen // self.payload_bytes
+        if self.seen >= self.total_bytes:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        self.cell[1] = 0
+        self.on_close(self.seen // max(1, self.payload_bytes))
+
+
+def tcp_engine_asyncio(server_socket: socket.socket, payload_bytes: int,
+                       requests: int, quota: AcceptQuota, pool_size: int,
+                       tally: EchoTally, stamp: bool = False) -> int:
+    """asyncio Protocol server on a single event loop."""
+    if stamp:
+        # echoes bytes as they arrive, so there is no request boundary to stamp at
+        raise ValueError("--stamp is not supported by the asyncio engine")
+
+    async def serve() -> int:
+        changed = asyncio.Event()
+        state = {"open": 0, "echoed": 0}
+
+        def on_close(n: int):
+            state["open"] -= 1
+            state["echoed"] += n
+            changed.set()
+
+        def factory():
+            quota.accepted()
+            state["open"] += 1
+            changed.set()
+            return _EchoProtocol(requests * payload_bytes, payload_bytes, on_close, tally.cell())
+
+        server_socket.setblocking(False)
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(factory, sock=server_socket)
+        listening = True
+        while listening or state["open"] > 0:
+            if listening and quota.exhausted():
+                # stop accepting once every expected client is in
+                server.close()
+                listening = False
+            try:
+                await asyncio.wait_for(changed.wait(), ACCEPT_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+            changed.clear()
+        server.close()
+        return state["echoed"]
+
+    return asyncio.run(serve())
+
+
+TCP_ENGINES = {
+    "threads": tcp_engine_threads,
+    "pool": tcp_engine_pool,
+    "selectors": tcp_engine_selectors,
+    "asyncio": tcp_engine_asyncio,
+}
+
+
+#### sockets #####
+SOCK_BUF = 16 * 1024 * 1024
+
+
+def open_tcp_listener(bind: str, port: int, reuseport: bool = False) -> socket.socket:
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.bind((bind, port))
+    server_socket.listen(socket.SOMAXCONN)
+    return server_socket
+
+
+def open_udp_socket(bind: str, port: int, reuseport: bool = False) -> socket.socket:
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF)
+    server_socket.bind((bind, port))
+    return server_socket
+
+
+#### UDP echo loops #####
+# Each loop echoes datagrams until interrupted and returns udp_stats(): the
+# echo count plus the monotonic times of the first and last echo, so the
+# packet rate covers only the window in which traffic actually flowed. The
+# running echo count is also kept in one EchoTally cell. With stamp, echoes
+# carry the server's receive and send times and clock probes are answered
+# without being counted (see clocksync.py).
+UDP_BATCH = 64       # datagrams drained per wakeup by udp_loop_batch
+UDP_SLOT = 65535     # ring slot size: max UDP datagram, so nothing is truncated
+
+
+def udp_stats(echoed: int, first_mono: float, last_mono: float, **extra) -> dict:
+    active = last_mono - first_mono
+    stats = {
+        "echoed_back": echoed,
+        "first_echo_mono": first_mono,
+        "last_echo_mono": last_mono,
+        "active_s": active,
+        "pps": echoed / active if active > 0 else 0.0,
+    }
+    stats.update(extra)
+    return stats
+
+
+def udp_loop_simple(server_socket: socket.socket, tally: EchoTally, stamp: bool = False) -> dict:
+    """One blocking recvfrom + sendto per datagram (the original loop)."""
+    echoed_count = 0
+    cell = tally.cell(conn=False)
+    first = last = 0.0
+    # buffer size greater than max UDP to avoid truncation
+    BUF_SIZE = 65535
+    try:
+        while True:
+            data, addr = server_socket.recvfrom(BUF_SIZE)
+            if stamp and len(data) >= PROBE_BYTES:
+                recv_ns = time.monotonic_ns()
+                data = bytearray(data)
+                stamp_into(data, UDP_STAMP_AT, recv_ns)
+                if is_probe(data):
+                    server_socket.sendto(data, addr)
+                    continue
+            #echo back to client
+            server_socket.sendto(data, addr)
+            echoed_count += 1
+            cell[0] = echoed_count
+            last = now_mono()
+            if echoed_count == 1:
+                first = last
 
-            conn.sendall(data)  # echo back to client
+    # Handle server shutdown on Ctrl+C
+    except KeyboardInterrupt:
+        pass
+    return udp_stats(echoed_count, first, last)
+
+
+def udp_loop_batch(server_socket: socket.socket, tally: EchoTally, stamp: bool = False) -> dict:
+    """Drain up to UDP_BATCH datagrams per wakeup into a preallocated ring.
+
+    recvfrom_into writes straight into ring slots and sendto echoes from a
+    memoryview slice of the slot, so no per-datagram bytes objects are built.
+    The loop only blocks (in select) once the socket has been fully drained."""
+    ring = memoryview(bytearray(UDP_BATCH * UDP_SLOT))
+    slots = [ring[i * UDP_SLOT:(i + 1) * UDP_SLOT] for i in range(UDP_BATCH)]
+    lens = [0] * UDP_BATCH
+    addrs = [None] * UDP_BATCH
+    recv_ns = [0] * UDP_BATCH
+    recv_into = server_socket.recvfrom_into
+    sendto = server_socket.sendto
+
+    server_socket.setblocking(False)
+    sel = selectors.DefaultSelector()
+    sel.register(server_socket, selectors.EVENT_READ)
+
+    echoed_count = batches = max_batch = 0
+    first = last = 0.0
+    cell = tally.cell(conn=False)
+    try:
+        while True:
+            n = 0
+            while n < UDP_BATCH:
+                try:
+                    lens[n], addrs[n] = recv_into(slots[n])
+                except BlockingIOError:
+                    break
+                if stamp:
+                    recv_ns[n] = time.monotonic_ns()
+                n += 1
+            if n == 0:
+                sel.select()
+                continue
+
+            probes = 0
+            for i in range(n):
+                view = slots[i][:lens[i]]
+                if stamp and lens[i] >= PROBE_BYTES:
+                    stamp_into(view, UDP_STAMP_AT, recv_ns[i])
+                    probes += is_probe(view)
+                while True:
+                    try:
+                        sendto(view, addrs[i])
+                        break
+                    except BlockingIOError:
+                        # send buffer full: wait until the kernel drains it
+                        select.select([], [server_socket], [])
+
+            n -= probes
+            if n == 0:
+                continue
+            echoed_count += n
+            cell[0] = echoed_count
+            batches += 1
+            max_batch = max(max_batch, n)
+            last = now_mono()
+            if batches == 1:
+                first = last
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sel.close()
+    return udp_stats(echoed_count, first, last,
+                     batches=batches,
+                     avg_batch=echoed_count / batches if batches else 0.0,
+                     max_batch=max_batch)
+
+
+UDP_LOOPS = {
+    "simple": udp_loop_simple,
+    "batch": udp_loop_batch,
+}
+
+
+def write_server_log(log_path: str, event: dict) -> None:
+    os.makedirs(log_path, exist_ok=True)
+    filename = os.path.join(
+        log_path,
+        f"{event['proto']}_server_c{event['clients']}_r{event['requests']}_p{event['payload_bytes']}.json")
+    with open(filename, "w") as fp:
+        log_event(fp, event)
+
+
+def series_stem(log_path: str, proto: str, payload_bytes: int, requests: int, clients: int) -> str:
+    return os.path.join(log_path, f"{proto}_server_series_c{clients}_r{requests}_p{payload_bytes}")
+
+
+def profile_stem(log_path: str, proto: str, payload_bytes: int, requests: int, clients: int) -> str:
+    return os.path.join(log_path, f"{proto}_server_profile_c{clients}_r{requests}_p{payload_bytes}")
+
+
+def start_profile(stem: str, hz: float):
+    """StackSampler of every server thread into <stem>.collapsed, or None when hz is 0."""
+    if hz <= 0:
+        return None
+    os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+    return StackSampler(f"{stem}.collapsed", hz)
+
+
+def start_series(stem: str, interval: float, phases: Phases, tally: EchoTally):
+    """SeriesSampler of the tally's echo/active-connection counters into
+    <stem>.jsonl, or None when interval is 0. Samples are anchored at the
+    first echo, like the measurement window."""
+    if interval <= 0:
+        return None
+    os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+    return SeriesSampler(f"{stem}.jsonl", interval, phases, tally.snapshot)
 
 
 ##### Required functions to implement. Do not change signatures. #####
 def run_tcp_server(bind: str, port: int, log_path: str,
-                   payload_bytes: int, requests: int, clients: int) -> None:
+                   payload_bytes: int, requests: int, clients: int,
+                   engine: str = "threads", pool_size: int = 32,
+                   workers: int = 1, phases: Phases = None,
+                   series_interval: float = 0.0, profile_hz: float = 0.0,
+                   stamp: bool = False, on_ready: Callable[[], None] = None) -> dict:
+
+    """Run the TCP server benchmark using one of TCP_ENGINES.
+
+    With a timed phases (duration > 0) connections are echoed until the
+    client closes them instead of for `requests` requests. With
+    series_interval > 0 echoes and open connections are sampled that often
+    into tcp_server_series_<tag>.jsonl (see series.py). With profile_hz > 0
+    every thread's stack is sampled into tcp_server_profile_<tag>.collapsed
+    (see profiler.py). With stamp every echo carries the server's receive
+    and send times, and a ClockResponder answers the client's clock probes
+    on the same port number over UDP (see clocksync.py).
+    on_ready, if given, is called once the server is listening. Returns the
+    server JSON event, which is also written to log_path."""
+    phases = phases or Phases()
+    if stamp and payload_bytes < STAMP.size:
+        raise SystemExit(f"--stamp needs --payload-bytes >= {STAMP.size} for TCP")
+    if stamp and engine == "asyncio":
+        raise SystemExit("--stamp is not supported by --engine asyncio")
+    if workers > 1:
+        return run_sharded_server("tcp", bind, port, log_path, payload_bytes, requests, clients,
+                                  workers, engine=engine, pool_size=pool_size, phases=phases,
+                                  series_interval=series_interval, profile_hz=profile_hz,
+                                  stamp=stamp, on_ready=on_ready)
+    serve = TCP_ENGINES[engine]
 
-    """Run the TCP server benchmark."""
     # server start timestamp
     start_ts = now_wall()
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind((bind, port))
-        server_socket.listen(socket.SOMAXCONN)
-        print(f"[TCP] Server listening on {bind}:{port}")
-
-        threads = []
-        for _ in range(clients ):  
-            conn, addr = server_socket.accept()
-            t = threading.Thread(
-                target=handle_client_tcp,
-                args=(conn, addr, payload_bytes, requests),
-                daemon=True
-            )
-            t.start()
-            threads.append(t)
-
-        # Wait for all clients to finish
-        for t in threads:
-            t.join()
+    profiler = start_profile(profile_stem(log_path, "tcp", payload_bytes, requests, clients),
+                             profile_hz)
+    tally = EchoTally()
+    window = WindowCounter(tally, phases)
+    sampler = start_series(series_stem(log_path, "tcp", payload_bytes, requests, clients),
+                           series_interval, phases, tally)
+    kernel_before = kstats.snapshot()
+    meter = ResourceMeter()
+    clock = ClockResponder(bind, port) if stamp else None
+    with open_tcp_listener(bind, port) as server_socket:
+        print(f"[TCP] Server listening on {bind}:{port} (engine={engine})")
+        if on_ready is not None:
+            on_ready()
+        echoed_count = serve(server_socket, payload_bytes, UNBOUNDED if phases.timed else requests,
+                             AcceptQuota(clients), pool_size, tally, stamp)
+    clock_probes = clock.close() if clock else None
+    profile = profiler.close() if profiler else None
+    resources = meter.close()
+    kernel = kstats.delta(kernel_before, kstats.snapshot())
     
     # server end timestamp
     finish_ts = now_wall()
 
-    os.makedirs(log_path, exist_ok=True)
-    filename = os.path.join(log_path, f"tcp_server_c{clients}_r{requests}_p{payload_bytes}.json")
-    with open(filename, "w") as fp:
-        log_event(fp, {
-            "event": "server_run",
-            "proto": "tcp",
-            "bind": bind,
-            "port": port,
-            "payload_bytes": payload_bytes,
-            "requests": requests,
-            "clients": clients,
-            "server_start": start_ts,
-            "server_end": finish_ts,
-            "elapsed": finish_ts - start_ts
-        })
+    event = {
+        "event": "server_run",
+        "proto": "tcp",
+        "engine": engine,
+        "pool_size": pool_size if engine == "pool" else None,
+        "workers": 1,
+        "bind": bind,
+        "port": port,
+        "payload_bytes": payload_bytes,
+        "requests": requests,
+        "clients": clients,
+        "server_start": start_ts,
+        "server_end": finish_ts,
+        "elapsed": finish_ts - start_ts,
+        "echoed_back": echoed_count,
+        "window": window.close(),
+        "series": sampler.close() if sampler else None,
+        "kernel": kernel,
+        "resources": efficiency(resources, echoed_count, payload_bytes),
+        "profile": profile,
+        "stamp": stamp,
+        "clock_probes": clock_probes,
+    }
+    write_server_log(log_path, event)
+    return event
 
 
 def run_udp_server(bind: str, port: int, log_path: str,
-                   payload_bytes: int, requests: int, clients: int) -> None:
+                   payload_bytes: int, requests: int, clients: int,
+                   workers: int = 1, udp_loop: str = "simple",
+                   phases: Phases = None, series_interval: float = 0.0,
+                   profile_hz: float = 0.0, stamp: bool = False,
+                   on_ready: Callable[[], None] = None) -> dict:
     
-    """Run the UDP server benchmark."""
+    """Run the UDP server benchmark using one of UDP_LOOPS.
+
+    The JSON records sock_drops, the datagrams the kernel dropped on the
+    server socket's receive queue, and the run's kernel counter deltas
+    under "kernel" (see kstats.py); the TCP server records the latter too.
+    Both record the server's CPU cost per echo under "resources" (see rusage.py),
+    and with profile_hz > 0 sample stacks into udp_server_profile_<tag>.collapsed.
+    With stamp the echo loop stamps every echo and answers clock probes
+    (see clocksync.py). on_ready and the return value are as in run_tcp_server."""
+    phases = phases or Phases()
+    if stamp and payload_bytes < PROBE_BYTES:
+        raise SystemExit(f"--stamp needs --payload-bytes >= {PROBE_BYTES} for UDP")
+    if workers > 1:
+        return run_sharded_server("udp", bind, port, log_path, payload_bytes, requests, clients,
+                                  workers, udp_loop=udp_loop, phases=phases,
+                                  series_interval=series_interval, profile_hz=profile_hz,
+                                  stamp=stamp, on_ready=on_ready)
+    serve = UDP_LOOPS[udp_loop]
+
     #server start timestamp
     start_ts = now_wall()
-    echoed_count = 0
 
     # open UDP socket and bind
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server_socket:
+    profiler = start_profile(profile_stem(log_path, "udp", payload_bytes, requests, clients),
+                             profile_hz)
+    tally = EchoTally()
+    window = WindowCounter(tally, phases)
+    sampler = start_series(series_stem(log_path, "udp", payload_bytes, requests, clients),
+                           series_interval, phases, tally)
+    kernel_before = kstats.snapshot()
+    meter = ResourceMeter()
+    with open_udp_socket(bind, port) as server_socket:
+        print(f"[UDP] Server listening on {bind}:{port} (loop={udp_loop})")
+        if on_ready is not None:
+            on_ready()
+        stats = serve(server_socket, tally, stamp)
+        print("\n[UDP] Server shutting down...")
+        sock_drops = kstats.socket_drops(server_socket)
+    profile = profiler.close() if profiler else None
+    resources = meter.close()
+    kernel = kstats.delta(kernel_before, kstats.snapshot())
 
-        BUF = 16 * 1024 * 1024
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUF)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUF)
-        server_socket.bind((bind, port))
+    #server end timestamp
+    finish_ts = now_wall()
+    
+    event = {
+        **stats,
+        "event": "server_run",
+        "proto": "udp",
+        "udp_loop": udp_loop,
+        "workers": 1,
+        "bind": bind,
+        "port": port,
+        "payload_bytes": payload_bytes,
+        "requests": requests,
+        "clients": clients,
+        "server_start": start_ts,
+        "server_end": finish_ts,
+        "elapsed": finish_ts - start_ts,
+        "window": window.close(),
+        "series": sampler.close() if sampler else None,
+        "sock_drops": sock_drops,
+        "kernel": kernel,
+        "resources": efficiency(resources, stats["echoed_back"], payload_bytes),
+        "profile": profile,
+        "stamp": stamp,
+    }
+    write_server_log(log_path, event)
+    return event
 
-        print(f"[UDP] Server listening on {bind}:{port}")
 
-        # buffer size greater than max UDP to avoid truncation
-        BUF_SIZE = 65535
-        try:
-            while True:
-                data, addr = server_socket.recvfrom(BUF_SIZE)
-                #echo back to client
-                server_socket.sendto(data, addr)
-                echoed_count += 1
+#### multi-process (SO_REUSEPORT) mode #####
+def _interrupt(signum, frame):
+    """Turn SIGTERM into KeyboardInterrupt once, so `kill <pid>` still writes logs."""
+    signal.signal(signum, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def _shard_worker(idx: int, proto: str, bind: str, port: int, payload_bytes: int,
+                  requests: int, engine: str, pool_size: int, udp_loop: str,
+                  quota: AcceptQuota, phases: Phases, shared_t0, series: tuple,
+                  profile: tuple, stamp: bool, ready, results) -> None:
+    """Body of one forked worker: bind the shared port, serve, report stats."""
+    # the parent owns Ctrl+C and forwards it as SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    if proto == "tcp":
+        sock = open_tcp_listener(bind, port, reuseport=True)
+    else:
+        sock = open_udp_socket(bind, port, reuseport=True)
 
-        # Handle server shutdown on Ctrl+C
+    stats = {"worker": idx, "pid": os.getpid(), "echoed_back": 0}
+    tally = EchoTally()
+    with sock:
+        ready.wait()
+        start_ts = now_wall()
+        profiler = start_profile(part_stem(profile[0], idx), profile[1])
+        meter = ResourceMeter()
+        window = WindowCounter(tally, phases, shared_t0)
+        stem, interval = series
+        sampler = start_series(part_stem(stem, idx), interval, phases, tally)
+        try:
+            if proto == "tcp":
+                stats["echoed_back"] = TCP_ENGINES[engine](sock, payload_bytes, requests, quota,
+                                                           pool_size, tally, stamp)
+                stats["connections"] = quota.local
+            else:
+                stats.update(UDP_LOOPS[udp_loop](sock, tally, stamp))
         except KeyboardInterrupt:
-            print("\n[UDP] Server shutting down...")
+            stats["interrupted"] = True
+        if profiler is not None:
+            stats["profile"] = profiler.close()
+        if proto == "udp":
+            stats["sock_drops"] = kstats.socket_drops(sock)
+        stats["resources"] = meter.close()
+        finish_ts = now_wall()
+        stats["window"] = window.close()
+        if sampler is not None:
+            stats["series"] = sampler.close()
+
+    stats.update(worker_start=start_ts, worker_end=finish_ts, elapsed=finish_ts - start_ts)
+    results.put(stats)
+
+
+def _collect(results, procs, n: int) -> List[dict]:
+    """Gather n worker reports, giving up on workers that died without one."""
+    out: List[dict] = []
+    while len(out) < n:
+        try:
+            out.append(results.get(timeout=ACCEPT_POLL_S))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs) and results.empty():
+                break
+    return out
+
+
+def _merge_windows(windows: List[dict]) -> dict:
+    """Workers share one window start; keep the latest end and sum the echoes."""
+    started = [w for w in windows if w["start_mono"] is not None] or windows
+    if not started:
+        return {}
+    out = dict(max(started, key=lambda w: w["window_end_mono"]))
+    out["echoed_in_window"] = sum(w["echoed_in_window"] for w in windows)
+    return out
+
+
+def run_sharded_server(proto: str, bind: str, port: int, log_path: str,
+                       payload_bytes: int, requests: int, clients: int, workers: int,
+                       engine: str = "threads", pool_size: int = 32,
+                       udp_loop: str = "simple", phases: Phases = None,
+                       series_interval: float = 0.0, profile_hz: float = 0.0,
+                       stamp: bool = False, on_ready: Callable[[], None] = None) -> dict:
+    """Fork `workers` processes that each bind the same port with SO_REUSEPORT.
+
+    The kernel hashes incoming flows across the workers. The parent aggregates
+    their echo counts and timings into the usual server JSON, plus a per-worker
+    breakdown under "per_worker". Every worker's measurement window (and
+    time series) starts from the first echo on any worker, so the per-worker
+    series files line up and are summed into one. A stamped TCP server answers
+    clock probes from the parent; stamped UDP workers answer them themselves."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise SystemExit("--workers needs SO_REUSEPORT, which this platform lacks")
+    phases = phases or Phases()
+    per_conn = UNBOUNDED if phases.timed else requests
+
+    kernel_before = kstats.snapshot()
+    ctx = mp.get_context("fork")
+    quota = AcceptQuota(clients, shared=ctx.Value("i", 0))
+    shared_t0 = ctx.Value("d", 0.0)
+    series = (series_stem(log_path, proto, payload_bytes, requests, clients), series_interval)
+    profile = (profile_stem(log_path, proto, payload_bytes, requests, clients), profile_hz)
+    ready = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+
+    procs = [
+        ctx.Process(target=_shard_worker,
+                    args=(i, proto, bind, port, payload_bytes, per_conn,
+                          engine, pool_size, udp_loop, quota, phases, shared_t0, series,
+                          profile, stamp, ready, results),
+                    daemon=True)
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    clock = ClockResponder(bind, port) if stamp and proto == "tcp" else None
+    ready.wait()
+    start_ts = now_wall()
+    print(f"[{proto.upper()}] {workers} workers listening on {bind}:{port}"
+          + (f" (engine={engine})" if proto == "tcp" else ""))
+    if on_ready is not None:
+        on_ready()
+
+    try:
+        per_worker = _collect(results, procs, workers)
+    except KeyboardInterrupt:
+        print(f"\n[{proto.upper()}] Server shutting down...")
+        for p in procs:
+            if p.is_alive():
+                os.kill(p.pid, signal.SIGTERM)
+        per_worker = _collect(results, procs, workers)
+    for p in procs:
+        p.join()
+    clock_probes = clock.close() if clock else None
+    kernel = kstats.delta(kernel_before, kstats.snapshot())
 
-    #server end timestamp
     finish_ts = now_wall()
-    
-    os.makedirs(log_path, exist_ok=True)
-    filename = os.path.join(log_path, f"udp_server_c{clients}_r{requests}_p{payload_bytes}.json")
-    with open(filename, "w") as fp:
-        log_event(fp, {
-            "event": "server_run",
-            "proto": "udp",
-            "bind": bind,
-            "port": port,
-            "payload_bytes": payload_bytes,
-            "requests": requests,
-            "clients": clients,
-            "server_start": start_ts,
-            "server_end": finish_ts,
-            "elapsed": finish_ts - start_ts,
-            "echoed_back": echoed_count
-        })
+
+    per_worker.sort(key=lambda w: w["worker"])
+    echoed_count = sum(w["echoed_back"] for w in per_worker)
+    for w in per_worker:
+        w["load_share"] = w["echoed_back"] / echoed_count if echoed_count else 0.0
+
+    event = {
+        "event": "server_run",
+        "proto": proto,
+        "workers": workers,
+        "bind": bind,
+        "port": port,
+        "payload_bytes": payload_bytes,
+        "requests": requests,
+        "clients": clients,
+        "server_start": start_ts,
+        "server_end": finish_ts,
+        "elapsed": finish_ts - start_ts,
+        "echoed_back": echoed_count,
+        "max_worker_elapsed": max((w["elapsed"] for w in per_worker), default=0.0),
+        "window": _merge_windows([w["window"] for w in per_worker if "window" in w]),
+        "series": None,
+        "profile": None,
+        "kernel": kernel,
+        "resources": efficiency(merge_usage([w.get("resources") for w in per_worker]),
+                                echoed_count, payload_bytes),
+        "stamp": stamp,
+        "per_worker": per_worker,
+    }
+    if series_interval > 0:
+        stem = series[0]
+        event["series"] = {
+            "path": os.path.basename(f"{stem}.jsonl"),
+            "interval_s": series_interval,
+            "samples": merge_series([f"{part_stem(stem, i)}.jsonl" for i in range(workers)],
+                                    f"{stem}.jsonl"),
+            "sample_s": sum(w.get("series", {}).get("sample_s", 0.0) for w in per_worker),
+        }
+    if profile_hz > 0:
+        event["profile"] = merge_profiles([w.pop("profile", None) for w in per_worker],
+                                          profile[0], workers)
+    if proto == "tcp":
+        event["engine"] = engine
+        event["pool_size"] = pool_size if engine == "pool" else None
+        event["clock_probes"] = clock_probes
+    else:
+        active = [w for w in per_worker if w["echoed_back"]]
+        first = min((w["first_echo_mono"] for w in active), default=0.0)
+        last = max((w["last_echo_mono"] for w in active), default=0.0)
+        event.update(udp_stats(echoed_count, first, last))
+        event["udp_loop"] = udp_loop
+        drops = [w["sock_drops"] for w in per_worker if w.get("sock_drops") is not None]
+        event["sock_drops"] = sum(drops) if drops else None
+    write_server_log(log_path, event)
+    return event
+
+
+#### daemon mode #####
+# server.py --daemon stays up for a whole sweep and takes its runs over the
+# control channel (see control.py) instead of being restarted for every
+# point. Each run is served by a forked child that calls run_tcp_server /
+# run_udp_server just as the CLI does, so counters, signal handlers and
+# timers start clean every run, without paying for interpreter startup.
+DAEMON_START_TIMEOUT_S = 10.0   # start-run gives up if the run is not listening by then
+DAEMON_STOP_TIMEOUT_S = 30.0    # wait for an interrupted run to write its log
+
+
+def _daemon_run(spec: dict, bind: str, port: int, log_path: str, ready, conn,
+                inherited: List[socket.socket]) -> None:
+    """Body of one forked run: serve it and send back its server JSON."""
+    for sock in inherited:
+        sock.close()
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    phases = Phases(spec.get("duration", 0.0), spec.get("warmup", 0.0), spec.get("cooldown", 0.0))
+    args = (bind, port, log_path, spec["payload_bytes"], spec["requests"], spec["clients"])
+    opts = dict(workers=spec.get("workers", 1), phases=phases,
+                series_interval=spec.get("series_interval", 0.0),
+                profile_hz=spec.get("profile", 0.0), stamp=spec.get("stamp", False),
+                on_ready=ready.set)
+    try:
+        if spec["proto"] == "tcp":
+            event = run_tcp_server(*args, engine=spec.get("engine", "threads"),
+                                   pool_size=spec.get("pool_size", 32), **opts)
+        else:
+            event = run_udp_server(*args, udp_loop=spec.get("udp_loop", "simple"), **opts)
+        conn.send({"ok": True, "server": event})
+    except KeyboardInterrupt:
+        conn.send({"ok": False, "error": "run interrupted before its clients finished"})
+    except BaseException as e:  # SystemExit from option checks, OSError from bind
+        conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+class ServerDaemon:
+    """Serves runs one at a time as the controller asks for them."""
+
+    def __init__(self, bind: str, port: int, log_path: str,
+                 control_bind: str, control_port: int):
+        self.bind = bind
+        self.port = port
+        self.log_path = log_path
+        self.control = (control_bind, control_port)
+        self.ctx = mp.get_context("fork")
+        self.run = 0
+        self.child = None
+        self.result = None      # receiving end of the child's pipe
+        self.spec = None
+        self.inherited: List[socket.socket] = []
+        self.stopping = False
+
+    def _listen(self) -> socket.socket:
+        bind, port = self.control
+        if not is_unix(bind):
+            return open_tcp_listener(bind, port)
+        if os.path.exists(bind):
+            os.unlink(bind)     # left over from a daemon that was killed
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(bind)
+        listener.listen(1)
+        return listener
+
+    def serve_forever(self) -> None:
+        listener = self._listen()
+        where = self.control[0] if is_unix(self.control[0]) else "{}:{}".format(*self.control)
+        print(f"[daemon] control on {where}, runs on {self.bind}:{self.port}, logs in {self.log_path}")
+        try:
+            with listener:
+                while not self.stopping:
+                    conn, addr = listener.accept()
+                    print(f"[daemon] controller {'{}:{}'.format(*addr) if addr else 'local'} connected")
+                    self.inherited = [listener, conn]
+                    with conn:
+                        self._serve(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.child is not None:
+                self._finish(interrupt=True)
+            if is_unix(self.control[0]) and os.path.exists(self.control[0]):
+                os.unlink(self.control[0])
+
+    def _serve(self, conn: socket.socket) -> None:
+        reader = LineReader(conn)
+        while not self.stopping:
+            try:
+                req = reader.read()
+            except ValueError as e:
+                send_line(conn, {"ok": False, "error": f"bad request: {e}"})
+                continue
+            except OSError:
+                return
+            if req is None:
+                return
+            try:
+                reply = self._handle(req)
+            except (ValueError, TypeError) as e:
+                reply = {"ok": False, "error": str(e)}
+            try:
+                send_line(conn, reply)
+            except OSError:
+                return
+
+    def _handle(self, req: dict) -> dict:
+        cmd = req.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid(), "proto_version": PROTO_VERSION,
+                    "busy": self.child is not None}
+        if cmd == "status":
+            return {"ok": True, "busy": self.child is not None, "run": self.run, "spec": self.spec}
+        if cmd == "start-run":
+            return self._start(check_spec(req))
+        if cmd == "end-run":
+            if self.child is None:
+                return {"ok": False, "error": "no run in progress"}
+            return self._finish(timeout=float(req.get("timeout", END_RUN_TIMEOUT_S)))
+        if cmd == "shutdown":
+            reply = self._finish(interrupt=True) if self.child is not None else {"ok": True}
+            self.stopping = True
+            return reply
+        return {"ok": False, "error": f"unknown command {cmd!r}"}
+
+    def _start(self, spec: dict) -> dict:
+        if self.child is not None:
+            return {"ok": False, "error": f"run {self.run} still in progress; end-run first"}
+        if spec["proto"] == "tcp" and spec.get("engine", "threads") not in TCP_ENGINES:
+            return {"ok": False, "error": f"engine must be one of {sorted(TCP_ENGINES)}"}
+        if spec["proto"] == "udp" and spec.get("udp_loop", "simple") not in UDP_LOOPS:
+            return {"ok": False, "error": f"udp_loop must be one of {sorted(UDP_LOOPS)}"}
+        ready = self.ctx.Event()
+        self.result, child_end = self.ctx.Pipe(duplex=False)
+        # not a daemonic process: --workers runs fork workers of their own
+        self.child = self.ctx.Process(target=_daemon_run,
+                                      args=(spec, self.bind, self.port, self.log_path, ready,
+                                            child_end, self.inherited))
+        self.child.start()
+        child_end.close()
+        self.spec = spec
+        self.run += 1
+        deadline = now_mono() + DAEMON_START_TIMEOUT_S
+        while not ready.wait(ACCEPT_POLL_S):
+            if self.result.poll() or not self.child.is_alive() or now_mono() > deadline:
+                reply = self._finish(interrupt=True, timeout=0.0)
+                if reply["ok"]:
+                    reply = {"ok": False, "error": "run ended before it was listening"}
+                return reply
+        print(f"[daemon] run {self.run}: {spec['proto']} p={spec['payload_bytes']} "
+              f"c={spec['clients']} r={spec['requests']}")
+        return {"ok": True, "run": self.run}
+
+    def _finish(self, interrupt: bool = None, timeout: float = 0.0) -> dict:
+        """End the current run and collect its result. UDP runs echo until
+        interrupted; TCP runs end once their clients are done, and are
+        interrupted only if that takes longer than timeout."""
+        if interrupt is None:
+            interrupt = self.spec["proto"] == "udp"
+        if not interrupt and not self.result.poll(timeout):
+            interrupt = True
+        if interrupt and self.child.is_alive():
+            os.kill(self.child.pid, signal.SIGINT)
+        reply = None
+        if self.result.poll(DAEMON_STOP_TIMEOUT_S):
+            try:
+                reply = self.result.recv()
+            except EOFError:
+                pass
+        self.child.join(DAEMON_STOP_TIMEOUT_S)
+        if self.child.is_alive():
+            self.child.kill()
+            self.child.join()
+        if reply is None:
+            reply = {"ok": False, "error": f"run exited with code {self.child.exitcode} and no result"}
+        reply["run"] = self.run
+        print(f"[daemon] run {self.run}: " + ("done" if reply["ok"] else reply["error"]))
+        self.result.close()
+        self.child = self.result = self.spec = None
+        return reply
 
 
 def parse_args() -> argparse.Namespace:
     """Parse CLI args.
 
-    Required flags:
+    Required flags (except with --daemon, where the controller gives
+    proto, payload, clients and requests per run):
     - --proto tcp|udp
     - --bind
     - --port
@@ -160,26 +1161,79 @@ def parse_args() -> argparse.Namespace:
     - --requests
     - --clients
     - --log
+    Optional:
+    - --engine threads|pool|selectors|asyncio
+    - --pool-size
+    - --workers
+    - --udp-loop simple|batch
+    - --duration / --warmup / --cooldown
+    - --series-interval
+    - --profile [HZ]
+    - --stamp
+    - --daemon / --control-bind / --control-port
     """
     p = argparse.ArgumentParser(description="TCP/UDP echo server for benchmarking")
-    p.add_argument("--proto", choices=["tcp", "udp"], required=True)
+    p.add_argument("--proto", choices=["tcp", "udp"])
     p.add_argument("--bind", default="0.0.0.0")
     p.add_argument("--port", type=int, default=5001)
     p.add_argument("--payload-bytes", type=int, default=1)
     p.add_argument("--requests", type=int, default=1)
     p.add_argument("--clients", type=int, default=1)
-    p.add_argument("--log", required=True)
-    return p.parse_args()
+    p.add_argument("--log", required=True,
+                   help="result directory (with --daemon, for every run)")
+    p.add_argument("--engine", choices=sorted(TCP_ENGINES), default="threads",
+                   help="TCP concurrency model (ignored for UDP)")
+    p.add_argument("--pool-size", type=int, default=32,
+                   help="worker threads for --engine pool")
+    p.add_argument("--workers", type=int, default=1,
+                   help="fork N processes sharing the port via SO_REUSEPORT")
+    p.add_argument("--udp-loop", choices=sorted(UDP_LOOPS), default="simple",
+                   help="UDP echo loop: per-datagram (simple) or batched ring buffer (batch)")
+    p.add_argument("--duration", type=float, default=0.0,
+                   help="timed run: echo until clients close, count echoes in this window (match the client)")
+    p.add_argument("--warmup", type=float, default=0.0,
+                   help="seconds after the first echo before the measurement window opens")
+    p.add_argument("--cooldown", type=float, default=0.0,
+                   help="seconds of unmeasured load after the --duration window")
+    p.add_argument("--series-interval", type=float, default=0.0,
+                   help="sample echo and open-connection counters every N seconds into *_server_series_*.jsonl (0 = off)")
+    p.add_argument("--profile", type=float, nargs="?", const=PROFILE_HZ, default=0.0, metavar="HZ",
+                   help=f"sample every thread's stack HZ times per CPU-second (default {PROFILE_HZ:g}) "
+                        "into *_server_profile_*.collapsed")
+    p.add_argument("--stamp", action="store_true",
+                   help="write the server's receive/send times into every echo and answer clock probes "
+                        "(match client.py --stamp)")
+    p.add_argument("--daemon", action="store_true",
+                   help="stay up and serve runs on --bind/--port as a controller requests them (see control.py)")
+    p.add_argument("--control-bind", default="127.0.0.1",
+                   help="--daemon: control channel address, or the path of a Unix socket")
+    p.add_argument("--control-port", type=int, default=CONTROL_PORT,
+                   help="--daemon: control channel TCP port")
+    args = p.parse_args()
+    if args.proto is None and not args.daemon:
+        p.error("--proto is required unless --daemon is given")
+    return args
 
 
 def main() -> None:
     """Entry point."""
 
     args = parse_args()
+    if args.daemon:
+        ServerDaemon(args.bind, args.port, args.log, args.control_bind,
+                     args.control_port).serve_forever()
+        return
+    phases = Phases(args.duration, args.warmup, args.cooldown)
     if args.proto == "tcp":
-        run_tcp_server(args.bind, args.port, args.log, args.payload_bytes, args.requests, args.clients)
+        run_tcp_server(args.bind, args.port, args.log, args.payload_bytes, args.requests, args.clients,
+                       engine=args.engine, pool_size=args.pool_size, workers=args.workers,
+                       phases=phases, series_interval=args.series_interval,
+                       profile_hz=args.profile, stamp=args.stamp)
     else:
-        run_udp_server(args.bind, args.port, args.log, args.payload_bytes, args.requests, args.clients)
+        run_udp_server(args.bind, args.port, args.log, args.payload_bytes, args.requests, args.clients,
+                       workers=args.workers, udp_loop=args.udp_loop, phases=phases,
+                       series_interval=args.series_interval, profile_hz=args.profile,
+                       stamp=args.stamp)
     pass
 
 
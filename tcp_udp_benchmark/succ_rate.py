@@ -38,6 +38,11 @@ def main():
             tcp_x.append(c)
             tcp_y.append(success)
             print(f"TCP c={c:4d} completed={completed:6d}/{expected_total:6d} success_rate={success:.6f}")
+            kernel = meta.get("kernel")
+            if kernel:
+                print(f"         retrans_segs={kernel.get('Tcp.RetransSegs', 0)} "
+                      f"listen_overflows={kernel.get('TcpExt.ListenOverflows', 0)} "
+                      f"listen_drops={kernel.get('TcpExt.ListenDrops', 0)}")
         else:
             print(f"TCP missing: {tcp_meta_path.name}")
 
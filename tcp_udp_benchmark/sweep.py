@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+"""
+Sweep orchestrator: runs the points of a declarative sweep (SWEEP, or a
+JSON file given with --spec) against one long-lived server.py --daemon,
+driven over a persistent control connection (see control.py).
+
+Two ways to place server and client:
+
+- --mode netns (default): one Linux box. The server and the client each
+  run in their own network namespace, joined by a veth pair
+  (10.77.0.1 <-> 10.77.0.2); --netem adds delay or loss on the client's
+  side of the pair. Needs root and iproute2. The control channel is a Unix
+  socket, which reaches across namespaces. Client results land in
+  results/ next to this script, so the analysis scripts read them as usual.
+- --mode ssh: two hosts, as run_sweep_ilab.sh did. One multiplexed SSH
+  master connection per host is opened up front (authenticate once);
+  every later command, the project rsync and a port forward to the
+  daemon's control port reuse it. Each point's server files are copied
+  to the client host once it finishes; results are pulled back at the end.
+
+A point is start-run, one client.py run, end-run. There are no fixed
+sleeps between points: start-run returns once the server is listening and
+end-run once it has written its JSON. A failed point is retried RETRIES
+times. Points repeated across phases run once. Finished points are kept
+in a result cache on the client host (see resultcache.py), keyed by their
+config, the tool version and both hosts' fingerprints; a rerun restores
+them instead of running them again and so resumes an interrupted sweep
+(--invalidate reruns the selected points, --no-cache bypasses the cache).
+Each point's outcome and wall time is printed, appended to
+sweep_<ts>.jsonl, and the total sweep time is reported at the end; client
+and server output go to full_sweep_<ts>.log.
+
+--search clients|rate replaces the fixed points with an adaptive search
+(see saturation.py) for the throughput knee and the load where p99 latency
+or UDP loss passes a threshold, over client count or offered rate. Its
+probes are timed runs, go through the same cache, and the result, with a
+confidence interval for each estimate, is written to
+results/saturation_<proto>_<axis>_p<payload>.json.
+
+Spec format (JSON): {"phases": [...], "analysis": [script, ...]}. A phase
+has a "name", optional "title" and "protos" (default tcp and udp), lists
+"payloads", "clients" and "requests", and optionally "server" (start-run
+options, control.RUN_OPTIONS) and "client_args" (extra client.py flags).
+Points are taken in proto, payload, clients, requests order.
+"""
+import argparse
+import json
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterator, List
+
+import resultcache
+import saturation
+from control import CONTROL_PORT, ControlClient, ControlError
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PAYLOADS = [64, 512, 1024, 4096, 8192]
+
+# the phases of run_sweep_ilab.sh's main()
+SWEEP = {
+    "phases": [
+        {"name": "A", "title": "connection overhead",
+         "payloads": PAYLOADS, "clients": [1], "requests": [1]},
+        {"name": "B", "title": "rtt vs payload",
+         "payloads": PAYLOADS, "clients": [1], "requests": [50]},
+        {"name": "C", "title": "udp loss vs clients",
+         "payloads": [512], "clients": [10, 20, 40, 80, 120], "requests": [10]},
+        {"name": "D", "title": "throughput",
+         "payloads": PAYLOADS, "clients": [10], "requests": [100]},
+        {"name": "latency", "title": "latency",
+         "payloads": PAYLOADS, "clients": [1, 10], "requests": [200]},
+    ],
+    "analysis": ["succ_rate.py", "thrput.py", "udp_lost_rate.py", "latency.py",
+                 "conn_overhead.py", "rtt_vs_pload.py", "conn_overhead_1.py"],
+}
+
+PORT = 9091
+RETRIES = 2
+RETRY_SLEEP_S = 1.0
+DAEMON_UP_TIMEOUT_S = 15.0
+
+# netns mode
+NETNS = ("tub-srv", "tub-cli")
+VETH = ("tub-srv0", "tub-cli0")
+NETNS_ADDR = ("10.77.0.1", "10.77.0.2")
+
+# ssh mode (run_sweep_ilab.sh's hosts)
+SERVER_SSH_HOST = "cd.cs.rutgers.edu"
+CLIENT_SSH_HOST = "cp.cs.rutgers.edu"
+REMOTE_DIR = "tcp_udp_benchmark"     # relative to the remote home directory
+
+
+def now_wall() -> float:
+    return time.time()
+
+
+def now_mono() -> float:
+    return time.monotonic()
+
+
+def points(spec: dict, phases: List[str] = None) -> Iterator[dict]:
+    """The sweep's points in run order, without repeats."""
+    seen = set()
+    for phase in spec["phases"]:
+        if phases and phase["name"] not in phases:
+            continue
+        server = phase.get("server", {})
+        client_args = [str(a) for a in phase.get("client_args", [])]
+        for proto in phase.get("protos", ["tcp", "udp"]):
+            for payload in phase["payloads"]:
+                for clients in phase["clients"]:
+                    for requests in phase["requests"]:
+                        key = (proto, payload, clients, requests,
+                               json.dumps(server, sort_keys=True), tuple(client_args))
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        yield {"phase": phase["name"], "proto": proto, "payload_bytes": payload,
+                               "clients": clients, "requests": requests,
+                               "server": server, "client_args": client_args}
+
+
+def point_tag(point: dict) -> str:
+    """client.run_tag of a point."""
+    tag = f"c{point['clients']}_r{point['requests']}_p{point['payload_bytes']}"
+    args = point["client_args"]
+    depth = int(args[args.index("--pipeline-depth") + 1]) if "--pipeline-depth" in args else 1
+    return tag + (f"_d{depth}" if depth > 1 else "")
+
+
+def client_argv(point: dict, host: str, port: int) -> List[str]:
+    return ["python3", "client.py",
+            "--proto", point["proto"],
+            "--host", host,
+            "--port", str(port),
+            "--payload-bytes", str(point["payload_bytes"]),
+            "--requests", str(point["requests"]),
+            "--clients", str(point["clients"]),
+            "--log", "results"] + point["client_args"]
+
+
+def run(argv: List[str], log, check: bool = True, **kwargs) -> int:
+    """Run a local command with its output appended to log."""
+    log.write(f"$ {shlex.join(argv)}\n")
+    log.flush()
+    rc = subprocess.run(argv, stdout=log, stderr=subprocess.STDOUT, **kwargs).returncode
+    if check and rc:
+        raise RuntimeError(f"{shlex.join(argv)} exited with {rc}")
+    return rc
+
+
+def connect_daemon(host: str, port: int = CONTROL_PORT) -> ControlClient:
+    """Connect to a daemon that is still starting up and ping it."""
+    deadline = now_mono() + DAEMON_UP_TIMEOUT_S
+    while True:
+        try:
+            ctl = ControlClient(host, port)
+        except OSError:
+            ctl = None
+        if ctl is not None:
+            try:
+                ctl.request("ping")
+                return ctl
+            except (OSError, ConnectionError):
+                ctl.close()
+        if now_mono() > deadline:
+            raise RuntimeError(f"server daemon not reachable at {host}:{port}")
+        time.sleep(0.1)
+
+
+#### netns mode #####
+class NetnsHosts:
+    """Server and client in two network namespaces on this box."""
+
+    def __init__(self, args, log):
+        self.log = log
+        self.port = args.port
+        self.netem = args.netem
+        self.server_ip = NETNS_ADDR[0]
+        self.tmp = tempfile.mkdtemp(prefix="sweep-")
+        self.control = os.path.join(self.tmp, "control.sock")
+        self.daemon = None
+
+    def _ip(self, *argv, check=True) -> int:
+        return run(["ip", *argv], self.log, check=check)
+
+    def setup(self) -> None:
+        for ns in NETNS:
+            self._ip("netns", "del", ns, check=False)     # left over from an aborted sweep
+        for ns in NETNS:
+            self._ip("netns", "add", ns)
+        self._ip("link", "add", VETH[0], "type", "veth", "peer", "name", VETH[1])
+        for ns, dev, addr in zip(NETNS, VETH, NETNS_ADDR):
+            self._ip("link", "set", dev, "netns", ns)
+            self._ip("-n", ns, "addr", "add", f"{addr}/24", "dev", dev)
+            self._ip("-n", ns, "link", "set", "dev", dev, "up")
+            self._ip("-n", ns, "link", "set", "dev", "lo", "up")
+        if self.netem:
+            run(["ip", "netns", "exec", NETNS[1], "tc", "qdisc", "add", "dev", VETH[1],
+                 "root", "netem", *shlex.split(self.netem)], self.log)
+
+    def start_daemon(self) -> ControlClient:
+        os.makedirs(os.path.join(LOCAL_DIR, "results", "server"), exist_ok=True)
+        out = open(os.path.join(LOCAL_DIR, "server.out"), "w")
+        self.daemon = subprocess.Popen(
+            ["ip", "netns", "exec", NETNS[0], sys.executable, "server.py", "--daemon",
+             "--bind", self.server_ip, "--port", str(self.port), "--log", "results/server",
+             "--control-bind", self.control],
+            cwd=LOCAL_DIR, stdout=out, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+        out.close()
+        return connect_daemon(self.control)
+
+    def client(self, argv: List[str]) -> int:
+        return run(["ip", "netns", "exec", NETNS[1], sys.executable, *argv[1:]], self.log,
+                   check=False, cwd=LOCAL_DIR)
+
+    def analyze(self, script: str) -> int:
+        os.makedirs(os.path.join(LOCAL_DIR, "plots"), exist_ok=True)
+        return run([sys.executable, script], self.log, check=False, cwd=LOCAL_DIR)
+
+    def cache(self, argv: List[str], stdin: str = ""):
+        return resultcache.command(argv, LOCAL_DIR, stdin)
+
+    def fingerprints(self) -> dict:
+        fp = resultcache.host_fingerprint()
+        return {"server": fp, "client": fp}
+
+    def read_result(self, name: str) -> dict:
+        with open(os.path.join(LOCAL_DIR, "results", name), "r") as f:
+            return json.loads(f.readline())
+
+    def clean(self) -> None:
+        for sub in ("results", "plots"):
+            run(["rm", "-rf", os.path.join(LOCAL_DIR, sub)], self.log)
+
+    def fetch_server(self, proto: str, tag: str) -> None:
+        pass    # one filesystem: results/server/ is already next to the client results
+
+    def collect(self) -> str:
+        return os.path.join(LOCAL_DIR, "results")
+
+    def teardown(self) -> None:
+        if self.daemon is not None:
+            try:
+                self.daemon.wait(10)
+            except subprocess.TimeoutExpired:
+                self.daemon.kill()
+                self.daemon.wait()
+        for ns in NETNS:
+            self._ip("netns", "del", ns, check=False)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+#### ssh mode #####
+class SshHosts:
+    """Server and client on two hosts behind multiplexed SSH connections."""
+
+    def __init__(self, args, log):
+        self.log = log
+        self.port = args.port
+        self.user = args.user
+        self.hosts = (args.server_host, args.client_host)
+        self.remote_dir = args.remote_dir
+        self.server_ip = args.server_ip
+        self.tmp = tempfile.mkdtemp(prefix="sweep-")
+        self.opts = ["-o", "ControlMaster=auto",
+                     "-o", f"ControlPath={self.tmp}/%C",
+                     "-o", "ControlPersist=10m",
+                     "-o", "ServerAliveInterval=30",
+                     "-o", "LogLevel=ERROR"]
+        self.forward = None
+
+    def _dest(self, host: str) -> str:
+        return f"{self.user}@{host}" if self.user else host
+
+    def _remote(self, host: str, command: str) -> List[str]:
+        return ["ssh", *self.opts, self._dest(host), f"cd {shlex.quote(self.remote_dir)} && {command}"]
+
+    def ssh(self, host: str, command: str, check: bool = True) -> int:
+        return run(self._remote(host, command), self.log, check=check)
+
+    def _tool(self, host: str, argv: List[str], stdin: str = ""):
+        out = subprocess.run(self._remote(host, "python3 resultcache.py " + shlex.join(argv)),
+                             input=stdin, capture_output=True, text=True)
+        if out.returncode:
+            raise RuntimeError(f"resultcache.py {argv[0]} on {host}: {out.stderr.strip()}")
+        return json.loads(out.stdout)
+
+    def rsync(self, src: str, dst: str, *extra: str) -> None:
+        run(["rsync", "-az", *extra, "-e", shlex.join(["ssh", *self.opts]), src, dst], self.log)
+
+    def setup(self) -> None:
+        for host in dict.fromkeys(self.hosts):
+            print(f"==> Opening SSH master connection to {host}")
+            # in the foreground: this is where a password prompt appears
+            subprocess.run(["ssh", *self.opts, "-fN", self._dest(host)],
+                           check=True)
+            run(["ssh", *self.opts, self._dest(host),
+                 f"mkdir -p {shlex.quote(self.remote_dir)}/results {shlex.quote(self.remote_dir)}/plots"],
+                self.log)
+            print(f"==> Syncing project to {host}:{self.remote_dir}")
+            self.rsync(f"{LOCAL_DIR}/", f"{self._dest(host)}:{self.remote_dir}/", "--delete",
+                       "--exclude", "results/", "--exclude", "plots/", "--exclude", "cache/",
+                       "--exclude", "__pycache__/")
+        if not self.server_ip:
+            out = subprocess.run(["ssh", *self.opts, self._dest(self.hosts[0]), "hostname -I"],
+                                 capture_output=True, text=True, check=True).stdout
+            ips = [ip for ip in out.split() if ip.count(".") == 3]
+            if not ips:
+                raise RuntimeError(f"could not determine an IPv4 address of {self.hosts[0]}")
+            self.server_ip = ips[0]
+        print(f"==> Using server IPv4 for client traffic: {self.server_ip}")
+
+    def start_daemon(self) -> ControlClient:
+        self.ssh(self.hosts[0],
+                 f"nohup python3 server.py --daemon --bind 0.0.0.0 --port {self.port} "
+                 f"--log results/server > server.out 2>&1 < /dev/null &")
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            local_port = s.getsockname()[1]
+        self.forward = f"127.0.0.1:{local_port}:127.0.0.1:{CONTROL_PORT}"
+        run(["ssh", *self.opts, "-O", "forward", "-L", self.forward, self._dest(self.hosts[0])],
+            self.log)
+        return connect_daemon("127.0.0.1", local_port)
+
+    def client(self, argv: List[str]) -> int:
+        return self.ssh(self.hosts[1], shlex.join(argv), check=False)
+
+    def analyze(self, script: str) -> int:
+        return self.ssh(self.hosts[1], f"mkdir -p results plots && python3 {shlex.quote(script)}",
+                        check=False)
+
+    def cache(self, argv: List[str], stdin: str = ""):
+        return self._tool(self.hosts[1], argv, stdin)
+
+    def fingerprints(self) -> dict:
+        return {"server": self._tool(self.hosts[0], ["fingerprint"]),
+                "client": self._tool(self.hosts[1], ["fingerprint"])}
+
+    def read_result(self, name: str) -> dict:
+        out = subprocess.run(self._remote(self.hosts[1], f"head -n 1 results/{shlex.quote(name)}"),
+                             capture_output=True, text=True, check=True).stdout
+        return json.loads(out)
+
+    def fetch_server(self, proto: str, tag: str) -> None:
+        """Copy a point's server files into results/server/ on the client host,
+        where the result cache and the analysis scripts read them."""
+        files = resultcache.server_glob(proto, tag)
+        pack = subprocess.Popen(self._remote(self.hosts[0], f"cd results/server && tar -cf - {files}"),
+                                stdout=subprocess.PIPE, stderr=self.log)
+        try:
+            run(self._remote(self.hosts[1], "mkdir -p results/server && tar -xf - -C results/server"),
+                self.log, stdin=pack.stdout)
+        finally:
+            pack.stdout.close()
+            pack.wait()
+        if pack.returncode:
+            raise RuntimeError(f"tar of {files} on {self.hosts[0]} exited with {pack.returncode}")
+
+    def clean(self) -> None:
+        self.ssh(self.hosts[1], "rm -rf results plots && mkdir -p results plots")
+
+    def collect(self) -> str:
+        pull = os.path.join(LOCAL_DIR, f"sweep_pull_{time.strftime('%Y%m%d_%H%M%S')}")
+        for sub in ("results", "plots"):
+            os.makedirs(os.path.join(pull, "client", sub), exist_ok=True)
+            self.rsync(f"{self._dest(self.hosts[1])}:{self.remote_dir}/{sub}/",
+                       os.path.join(pull, "client", sub) + "/")
+        return pull
+
+    def teardown(self) -> None:
+        if self.forward:
+            run(["ssh", *self.opts, "-O", "cancel", "-L", self.forward, self._dest(self.hosts[0])],
+                self.log, check=False)
+        for host in dict.fromkeys(self.hosts):
+            run(["ssh", *self.opts, "-O", "exit", self._dest(host)], self.log, check=False)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+MODES = {
+    "netns": NetnsHosts,
+    "ssh": SshHosts,
+}
+
+
+#### sweep #####
+# what of a point goes into its cache key, besides the sweep-wide "topology", "tool" and "hosts"
+KEY_FIELDS = ("proto", "payload_bytes", "clients", "requests", "server", "client_args")
+
+
+def point_record(point: dict) -> dict:
+    return {k: point[k] for k in ("phase", "proto", "payload_bytes", "clients", "requests")}
+
+
+def run_point(ctl: ControlClient, hosts, point: dict, port: int) -> dict:
+    """Run one point with retries; returns its record for sweep_<ts>.jsonl."""
+    started = now_mono()
+    record = {**point_record(point), "ok": False, "attempts": 0}
+    for attempt in range(1, RETRIES + 2):
+        record["attempts"] = attempt
+        try:
+            ctl.start_run(point["proto"], point["payload_bytes"], point["clients"],
+                          point["requests"], **point["server"])
+        except ControlError as e:
+            record["error"] = f"start-run: {e}"
+        else:
+            t0 = now_mono()
+            rc = hosts.client(client_argv(point, hosts.server_ip, port))
+            record["client_s"] = now_mono() - t0
+            try:
+                # a client that failed will not finish a TCP run: stop it now
+                server = ctl.end_run(**({} if rc == 0 else {"timeout": 0.0}))
+            except ControlError as e:
+                server = None
+                record["error"] = f"end-run: {e}"
+            if rc:
+                record["error"] = f"client exited with {rc}"
+            elif server is not None:
+                try:
+                    hosts.fetch_server(point["proto"], point_tag(point))
+                except RuntimeError as e:
+                    record["error"] = f"server files: {e}"
+                else:
+                    record.update(ok=True, echoed_back=server.get("echoed_back"),
+                                  server_elapsed=server.get("elapsed"))
+                    record.pop("error", None)
+                    break
+        if attempt <= RETRIES:
+            time.sleep(RETRY_SLEEP_S)
+    record["elapsed_s"] = now_mono() - started
+    return record
+
+
+def run_cached(ctl: ControlClient, hosts, point: dict, port: int, base: dict,
+               invalidate: bool = False) -> dict:
+    """run_point through the result cache; base is the sweep-wide part of the key."""
+    started = now_mono()
+    config = dict(base, **{k: point[k] for k in KEY_FIELDS})
+    if "repeat" in point:
+        config["repeat"] = point["repeat"]    # repeated probes of a search are separate results
+    key = resultcache.point_key(config)
+    tag = point_tag(point)
+    if invalidate:
+        hosts.cache(["invalidate", key])
+    elif hosts.cache(["lookup", key]) is not None:
+        hosts.cache(["restore", key])
+        return {**point_record(point), "ok": True, "cached": True, "key": key,
+                "elapsed_s": now_mono() - started}
+    hosts.cache(["prepare", point["proto"], tag])
+    record = run_point(ctl, hosts, point, port)
+    record["key"] = key
+    if record["ok"]:
+        hosts.cache(["store", key, point["proto"], tag], json.dumps(config))
+    return record
+
+
+#### saturation search #####
+SEARCH_RANGE = {"clients": (1, 256), "rate": (1000.0, 100000.0)}
+SEARCH_THRESHOLD = {"p99": 0.01, "loss": 0.001}
+
+
+def search_point(args, load: float, repeat: int) -> dict:
+    """One timed probe of the search at load (clients, or total requests/s)."""
+    timing = {"duration": args.probe_duration, "warmup": args.probe_warmup}
+    client_args = ["--duration", str(args.probe_duration), "--warmup", str(args.probe_warmup)]
+    if args.search == "rate":
+        client_args += ["--rate", f"{load:g}"]
+    return {"phase": f"search-{args.search}", "proto": args.search_proto,
+            "payload_bytes": args.search_payload,
+            "clients": int(load) if args.search == "clients" else args.search_clients,
+            "requests": 1, "server": timing, "client_args": client_args, "repeat": repeat}
+
+
+def run_search(args, hosts, run_one) -> dict:
+    """Run the saturation search; run_one(point, label) runs one probe point."""
+    metric = args.search_metric or ("loss" if args.search_proto == "udp" else "p99")
+    threshold = args.search_threshold
+    if threshold is None:
+        threshold = SEARCH_THRESHOLD[metric]
+    lo, hi = SEARCH_RANGE[args.search]
+    lo = args.search_min or lo
+    hi = args.search_max or hi
+    repeats: dict = {}
+
+    def measure(load: float) -> dict:
+        repeats[load] = repeats.get(load, 0) + 1
+        point = search_point(args, load, repeats[load])
+        record = run_one(point, f"{args.search}={load:g} #{repeats[load]}")
+        if not record["ok"]:
+            raise RuntimeError(f"probe at {args.search}={load:g} failed: {record.get('error')}")
+        return saturation.metrics(hosts.read_result(f"{point['proto']}_meta_{point_tag(point)}.json"))
+
+    search = saturation.SaturationSearch(measure, lo, hi, metric, threshold,
+                                         integer=args.search == "clients",
+                                         repeats=args.search_repeats,
+                                         resolution=args.search_resolution)
+    result = {
+        "event": "saturation_search",
+        "axis": args.search,
+        "proto": args.search_proto,
+        "payload_bytes": args.search_payload,
+        "clients": args.search_clients if args.search == "rate" else None,
+        "probe_duration": args.probe_duration,
+        "probe_warmup": args.probe_warmup,
+        **search.run(),
+    }
+    out_dir = os.path.join(LOCAL_DIR, "results")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, f"saturation_{args.search_proto}_{args.search}_p{args.search_payload}.json")
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+
+    print(f"==> {result['runs']} runs at {len(result['probes'])} loads; "
+          f"peak {result['max_rps']:.0f} echoes/s")
+    for name, what in (("knee", "throughput knee"),
+                       ("crossing", f"{metric} > {threshold:g}")):
+        est = result[name]
+        if est["value"] is None:
+            print(f"    {what}: not found in {args.search} {lo:g}..{hi:g}")
+        else:
+            print(f"    {what}: {args.search}={est['value']:g} "
+                  f"({est['confidence']:.0%} CI {est['ci'][0]:g}..{est['ci'][1]:g})")
+    print(f"==> Wrote {out_path}")
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Run a benchmark sweep against a server daemon.")
+    p.add_argument("--mode", choices=sorted(MODES), default="netns")
+    p.add_argument("--spec", help="JSON sweep spec (default: the built-in SWEEP)")
+    p.add_argument("--phase", action="append", help="run only this phase (repeatable)")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--no-analysis", action="store_true", help="skip the analysis scripts")
+    p.add_argument("--clean", action="store_true",
+                   help="clear the client's results/ and plots/ before the sweep")
+    p.add_argument("--dry-run", action="store_true", help="list the points and exit")
+    p.add_argument("--no-cache", action="store_true",
+                   help="run every point, without looking up or storing cached results")
+    p.add_argument("--invalidate", action="store_true",
+                   help="drop the cached results of the selected points and rerun them")
+    p.add_argument("--search", choices=sorted(SEARCH_RANGE),
+                   help="search client count or offered rate for the saturation knee instead of running the sweep")
+    p.add_argument("--search-proto", choices=["tcp", "udp"], default="udp")
+    p.add_argument("--search-payload", type=int, default=512)
+    p.add_argument("--search-clients", type=int, default=10, help="--search rate: clients sharing the rate")
+    p.add_argument("--search-min", type=float, help="lowest load (default 1 client / 1000 req/s)")
+    p.add_argument("--search-max", type=float, help="highest load (default 256 clients / 100000 req/s)")
+    p.add_argument("--search-metric", choices=saturation.METRICS,
+                   help="threshold metric (default loss for UDP, p99 for TCP)")
+    p.add_argument("--search-threshold", type=float,
+                   help="p99 in seconds (default 0.01) or loss rate (default 0.001)")
+    p.add_argument("--search-repeats", type=int, default=saturation.REPEATS,
+                   help="runs per probed load")
+    p.add_argument("--search-resolution", type=float, default=saturation.RESOLUTION,
+                   help="stop refining once a bracket is this fraction of its upper end")
+    p.add_argument("--probe-duration", type=float, default=2.0, help="--search: measured seconds per run")
+    p.add_argument("--probe-warmup", type=float, default=0.5, help="--search: warmup seconds per run")
+    p.add_argument("--netem", default="",
+                   help="netns: tc netem arguments for the client side, e.g. \"delay 1ms loss 0.1%%\"")
+    p.add_argument("--user", default=os.environ.get("ILAB_USER", ""), help="ssh: remote user name")
+    p.add_argument("--server-host", default=SERVER_SSH_HOST)
+    p.add_argument("--client-host", default=CLIENT_SSH_HOST)
+    p.add_argument("--server-ip", help="ssh: address the client uses (default: the server's first IPv4)")
+    p.add_argument("--remote-dir", default=REMOTE_DIR)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.spec:
+        with open(args.spec, "r") as f:
+            spec = json.load(f)
+    else:
+        spec = SWEEP
+    todo = [] if args.search else list(points(spec, args.phase))
+    if args.dry_run and args.search:
+        lo, hi = SEARCH_RANGE[args.search]
+        print(f"search {args.search} {args.search_min or lo:g}..{args.search_max or hi:g} "
+              f"({args.search_proto}, p={args.search_payload}, {args.search_repeats} runs per load)")
+        return
+    if args.dry_run:
+        for point in todo:
+            print(f"{point['phase']:>8} {point['proto']} p={point['payload_bytes']} "
+                  f"c={point['clients']} r={point['requests']}")
+        print(f"{len(todo)} points")
+        return
+
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    log = open(os.path.join(LOCAL_DIR, f"full_sweep_{ts}.log"), "a")
+    records = open(os.path.join(LOCAL_DIR, f"sweep_{ts}.jsonl"), "a")
+    hosts = MODES[args.mode](args, log)
+    what = f"{args.search} search" if args.search else f"sweep of {len(todo)} points"
+    print(f"Starting {args.mode} {what}; logging to {log.name}")
+    sweep_start = now_mono()
+    counts = {"ok": 0, "cached": 0, "failed": 0}
+    ctl = None
+    base = None
+
+    def run_one(point: dict, label: str) -> dict:
+        if base is None:
+            record = run_point(ctl, hosts, point, args.port)
+        else:
+            record = run_cached(ctl, hosts, point, args.port, base, args.invalidate)
+        record["ts"] = now_wall()
+        records.write(json.dumps(record) + "\n")
+        records.flush()
+        status = "cached" if record.get("cached") else "ok" if record["ok"] else "failed"
+        counts[status] += 1
+        rate = point["client_args"][point["client_args"].index("--rate") + 1] \
+            if "--rate" in point["client_args"] else None
+        print(f"[{time.strftime('%H:%M:%S')}] {status.upper():<6} {label} {point['phase']} "
+              f"{point['proto']} p={point['payload_bytes']} c={point['clients']} "
+              f"r={point['requests']}" + (f" rate={rate}" if rate else "")
+              + f" {record['elapsed_s']:.2f}s"
+              + (f" ({record['error']})" if not record["ok"] else ""))
+        return record
+    try:
+        hosts.setup()
+        if args.clean:
+            hosts.clean()
+        if not args.no_cache:
+            base = {"topology": {"mode": args.mode, "netem": args.netem},
+                    "tool": resultcache.tool_version(), "hosts": hosts.fingerprints()}
+            print(f"==> Tool version {base['tool']}")
+        ctl = hosts.start_daemon()
+        if args.search:
+            try:
+                run_search(args, hosts, run_one)
+            except RuntimeError as e:
+                print(f"==> Search stopped: {e}")
+        for i, point in enumerate(todo, 1):
+            run_one(point, f"{i}/{len(todo)}")
+        sweep_s = now_mono() - sweep_start
+        ctl.request("shutdown")
+        ctl.close()
+        ctl = None
+        if not args.no_analysis and not args.search:
+            for script in spec.get("analysis", []):
+                print(f"==> Running analysis: {script}")
+                if hosts.analyze(script):
+                    print(f"    {script} failed, see {log.name}")
+        print(f"==> Results in {hosts.collect()}")
+    finally:
+        if ctl is not None:
+            try:
+                ctl.request("shutdown")
+            except (OSError, ConnectionError, ControlError):
+                pass
+            ctl.close()
+        hosts.teardown()
+        log.close()
+        records.close()
+    print(f"Sweep complete: {counts['ok']} ok, {counts['cached']} cached, {counts['failed']} failed, "
+          f"{sweep_s:.1f}s of runs, {now_mono() - sweep_start:.1f}s total")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
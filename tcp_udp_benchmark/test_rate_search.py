@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests of client.run_udp_rate_search against a scripted udp_probe.
+
+Usage: python3 -m unittest test_rate_search
+"""
+import tempfile
+import unittest
+from unittest import mock
+
+import client
+
+
+def scripted(outcomes):
+    """A udp_probe stand-in that answers each probe with the next (offered_pps,
+    passed) of outcomes, offered_pps None meaning the target rate. An offered
+    rate under SENDER_LIMIT of the target is sender-limited, as in the real probe."""
+    outcomes = iter(outcomes)
+
+    def probe(host, port, payload_bytes, clients, rate, probe_s, **kwargs):
+        offered, passed = next(outcomes)
+        offered = rate if offered is None else offered
+        return {
+            "rate": rate,
+            "offered_pps": offered,
+            "received_pps": offered if passed else 0.0,
+            "sent": 1,
+            "replies": 1 if passed else 0,
+            "loss_rate": 0.0 if passed else 1.0,
+            "sock_drops": 0,
+            "sender_limited": rate > 0 and offered < client.SENDER_LIMIT * rate,
+            "latency": {},
+        }
+    return probe
+
+
+class RateSearchTest(unittest.TestCase):
+    def search(self, outcomes, **kwargs):
+        with tempfile.TemporaryDirectory() as log_path, \
+                mock.patch.object(client, "udp_probe", scripted(outcomes)), \
+                mock.patch("builtins.print"):
+            return client.run_udp_rate_search("127.0.0.1", 0, log_path, 64, 2, **kwargs)
+
+    def test_sender_limited_pass_keeps_a_faster_earlier_pass(self):
+        # unpaced ceiling 80000/s; the paced ceiling fails sender-limited at
+        # 60000/s; 30000/s and 45000/s pass; 52500/s passes sender-limited at
+        # 40000/s, below the 45000/s that already passed
+        res = self.search([(80000, False), (60000, False), (None, True),
+                           (None, True), (40000, True)])
+        self.assertEqual([p["rate"] for p in res["probes"]], [0.0, 80000, 30000, 45000, 52500])
+        self.assertEqual(res["sustainable_rate"], 45000)
+        self.assertFalse(res["sender_bound"])
+
+    def test_sender_limited_pass_above_best_is_sender_bound(self):
+        res = self.search([(70000, False), (40000, True)])
+        self.assertEqual(len(res["probes"]), 2)
+        self.assertEqual(res["sustainable_rate"], 40000)
+        self.assertTrue(res["sender_bound"])
+
+    def test_reports_offered_rate_of_a_pass(self):
+        res = self.search([(29000, True)], rate_max=30000)
+        self.assertEqual(res["sustainable_rate"], 29000)
+        self.assertFalse(res["sender_bound"])
+
+    def test_no_pass(self):
+        res = self.search([(1000, False)] * client.SEARCH_MAX_PROBES, rate_max=1000)
+        self.assertIsNone(res["sustainable_rate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,10 @@ PAYLOADS = [64, 512, 1024, 4096, 8192]
 CLIENTS = 10
 REQUESTS = 100
 
+# Pipelined TCP runs (client.py --pipeline-depth); depth 1 is the plain run
+PIPELINE_DEPTHS = [1, 2, 4, 8, 16, 32]
+PIPELINE_PAYLOADS = [64, 1024, 8192]
+
 BASE_DIR = Path(__file__).resolve().parent
 RESULTS_DIR = BASE_DIR / "results"
 PLOTS_DIR = BASE_DIR / "plots"
@@ -18,9 +22,132 @@ def read_json_one_line(path: Path) -> dict:
         line = f.readline().strip()
         return json.loads(line) if line else {}
 
+def server_log(name: str) -> Path:
+    """A server JSON: run_sweep_ilab.sh writes it to results/, sweep.py to results/server/."""
+    path = RESULTS_DIR / name
+    return path if path.exists() else RESULTS_DIR / "server" / name
+
 def mbps(bytes_per_s: float) -> float:
     return (bytes_per_s * 8.0) / 1_000_000.0
 
+def measured_s(meta: dict, elapsed_key: str) -> float:
+    """Measurement-window length (client.py --duration/--warmup), else the whole-run elapsed."""
+    return float(meta.get("window", {}).get("measured_s") or meta.get(elapsed_key, 0.0))
+
+def tcp_meta_path(p: int, depth: int) -> Path:
+    suffix = f"_d{depth}" if depth > 1 else ""
+    return RESULTS_DIR / f"tcp_meta_c{CLIENTS}_r{REQUESTS}_p{p}{suffix}.json"
+
+def plot_pipeline():
+    print(f"\n--- TCP Throughput vs Pipeline Depth (c={CLIENTS}, r={REQUESTS}) ---")
+    plt.figure()
+    plotted = False
+    for p in PIPELINE_PAYLOADS:
+        xs, ys = [], []
+        for d in PIPELINE_DEPTHS:
+            path = tcp_meta_path(p, d)
+            if not path.exists():
+                continue
+            meta = read_json_one_line(path)
+            elapsed = measured_s(meta, "elapsed")
+            total_requests = int(meta.get("total_requests", 0))
+            depth = int(meta.get("pipeline_depth", 1))
+            if elapsed > 0 and total_requests > 0:
+                thr = mbps(total_requests * p * 2 / elapsed)
+                xs.append(depth)
+                ys.append(thr)
+                print(f"TCP p={p:5d} depth={depth:3d} throughput={thr:.3f} Mbps")
+        if xs:
+            plt.plot(xs, ys, marker="o", label=f"TCP p={p}")
+            plotted = True
+
+    if not plotted:
+        print("No pipelined runs found.")
+        plt.close()
+        return
+
+    plt.xscale("log", base=2)
+    plt.xlabel("pipeline depth (requests in flight per connection)")
+    plt.ylabel("throughput (Mbps)")
+    plt.title(f"TCP Throughput vs Pipeline Depth (clients={CLIENTS}, requests={REQUESTS})")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / "throughput_vs_pipeline_depth.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"\nWrote {out_path}")
+
+def plot_cpu_cost():
+    """CPU-microseconds per request (client and server, from "resources") vs payload.
+    cpu_util near 1.0 per process means the GIL-bound side is CPU-bound."""
+    print(f"\n--- CPU cost per request vs Payload (c={CLIENTS}, r={REQUESTS}) ---")
+    series = {}
+    for proto in ("tcp", "udp"):
+        for side in ("meta", "server"):
+            for p in PAYLOADS:
+                name = f"{proto}_{side}_c{CLIENTS}_r{REQUESTS}_p{p}.json"
+                path = server_log(name) if side == "server" else RESULTS_DIR / name
+                if not path.exists():
+                    continue
+                res = read_json_one_line(path).get("resources") or {}
+                if res.get("cpu_us_per_request") is None or res.get("bytes_per_cpu_s") is None:
+                    continue
+                label = f"{proto.upper()} {'client' if side == 'meta' else 'server'}"
+                xs, ys = series.setdefault(label, ([], []))
+                xs.append(p)
+                ys.append(res["cpu_us_per_request"])
+                print(f"{label:10s} p={p:5d} cpu/request={res['cpu_us_per_request']:.1f} us "
+                      f"cpu_util={res['cpu_util']:.2f} "
+                      f"throughput/cpu={mbps(res['bytes_per_cpu_s']):.1f} Mbps per CPU-s")
+
+    if not series:
+        print("No resource data found.")
+        return
+
+    plt.figure()
+    for label, (xs, ys) in series.items():
+        plt.plot(xs, ys, marker="o", label=label)
+    plt.xlabel("payload_bytes")
+    plt.ylabel("CPU time per request (us)")
+    plt.title(f"CPU Cost per Request vs Payload (clients={CLIENTS}, requests={REQUESTS})")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / "cpu_per_request_vs_payload.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"\nWrote {out_path}")
+
+def plot_saturation():
+    """Throughput vs load of each sweep.py --search result, knee and crossing marked."""
+    for path in sorted(RESULTS_DIR.glob("saturation_*.json")):
+        with path.open("r", encoding="utf-8") as f:
+            res = json.load(f)
+        loads = [p["load"] for p in res["probes"]]
+        rps = [p["rps"] for p in res["probes"]]
+        sd = [p["rps_sd"] for p in res["probes"]]
+
+        plt.figure()
+        plt.errorbar(loads, rps, yerr=sd, marker="o", capsize=3, label="throughput")
+        for name, color, label in (("knee", "tab:green", "knee"),
+                                   ("crossing", "tab:red", f"{res['metric']} > {res['threshold']:g}")):
+            est = res[name]
+            if est["value"] is None:
+                continue
+            plt.axvline(est["value"], color=color, linestyle="--", label=f"{label} ({est['value']:g})")
+            plt.axvspan(est["ci"][0], est["ci"][1], color=color, alpha=0.15)
+            print(f"{path.name}: {label} at {res['axis']}={est['value']:g} "
+                  f"(CI {est['ci'][0]:g}..{est['ci'][1]:g})")
+        plt.xscale("log", base=2)
+        plt.xlabel("clients" if res["axis"] == "clients" else "offered rate (req/s)")
+        plt.ylabel("throughput (echoes/s)")
+        plt.title(f"{res['proto'].upper()} saturation search (payload={res['payload_bytes']})")
+        plt.legend()
+        plt.tight_layout()
+
+        out_path = PLOTS_DIR / f"{path.stem}.png"
+        plt.savefig(out_path, dpi=200)
+        print(f"Wrote {out_path}")
+
 def main():
     if not RESULTS_DIR.exists():
         print("ERROR: results/ not found next to this script.")
@@ -36,7 +163,7 @@ def main():
         tcp_meta_path = RESULTS_DIR / f"tcp_meta_c{CLIENTS}_r{REQUESTS}_p{p}.json"
         if tcp_meta_path.exists():
             meta = read_json_one_line(tcp_meta_path)
-            elapsed = float(meta.get("elapsed", 0.0))
+            elapsed = measured_s(meta, "elapsed")
             total_requests = int(meta.get("total_requests", 0))
 
             if elapsed > 0 and total_requests > 0:
@@ -56,10 +183,11 @@ def main():
         udp_meta_path = RESULTS_DIR / f"udp_meta_c{CLIENTS}_r{REQUESTS}_p{p}.json"
         if udp_meta_path.exists():
             meta = read_json_one_line(udp_meta_path)
-            elapsed = float(meta.get("elapsed_s", 0.0))
+            elapsed = measured_s(meta, "elapsed_s")
             expected = int(meta.get("expected_replies", 0))
             lost = int(meta.get("lost_replies", 0))
-            received = expected - lost
+            # replies sent and received inside the window, when the run had one
+            received = int(meta.get("completed", expected - lost))
 
             if elapsed > 0 and received > 0:
                 total_bytes = received * p * 2
@@ -96,5 +224,9 @@ def main():
 
     print(f"\nWrote {out_path}")
 
+    plot_pipeline()
+    plot_cpu_cost()
+    plot_saturation()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
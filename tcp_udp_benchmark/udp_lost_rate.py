@@ -17,12 +17,37 @@ def read_json_one_line(path: Path) -> dict:
         line = f.readline().strip()
         return json.loads(line) if line else {}
 
+def server_log(name: str) -> Path:
+    """A server JSON: run_sweep_ilab.sh writes it to results/, sweep.py to results/server/."""
+    path = RESULTS_DIR / name
+    return path if path.exists() else RESULTS_DIR / "server" / name
+
+def loss_causes(meta: dict, server: dict) -> dict:
+    """Split lost_replies into causes the kernel counted (see kstats.py).
+
+    Socket drops are exact per socket but cover the whole run, while loss
+    covers the measurement window only, so each cause is capped at what is
+    left of the loss. "unattributed" is the rest: replies still in flight at
+    the client's idle cutoff, or dropped on the wire / NIC."""
+    left = int(meta.get("lost_replies", 0))
+    kernel = meta.get("kernel") or {}
+    causes = {}
+    for name, n in (("client_rcvbuf", meta.get("sock_drops")),
+                    ("server_rcvbuf", server.get("sock_drops")),
+                    ("sndbuf", kernel.get("Udp.SndbufErrors"))):
+        causes[name] = min(left, int(n or 0))
+        left -= causes[name]
+    causes["unattributed"] = left
+    return causes
+
 def main():
     if not RESULTS_DIR.exists():
         print("ERROR: results/ not found next to script.")
         return
 
     xs, ys = [], []
+    causes = []
+    patterns = []
 
     print("--- UDP loss rate vs clients (payload=512, r=10) ---")
     for c in CLIENTS_LIST:
@@ -44,6 +69,18 @@ def main():
         ys.append(loss_rate)
         print(f"c={c:4d} expected={int(expected):6d} lost={int(lost):6d} loss_rate={loss_rate:.6f}")
 
+        server_path = server_log(f"udp_server_c{c}_r{REQUESTS}_p{PAYLOAD}.json")
+        server = read_json_one_line(server_path) if server_path.exists() else {}
+        causes.append(loss_causes(meta, server))
+        if lost:
+            print("       " + " ".join(f"{k}={v}" for k, v in causes[-1].items()))
+        pattern = meta.get("loss_pattern")
+        patterns.append(pattern)
+        if pattern:
+            print(f"       bursts={pattern['bursts']} mean_burst={pattern['mean_burst']:.1f} "
+                  f"max_burst={pattern['max_burst']} reorder_rate={pattern['reorder_rate']:.6f} "
+                  f"duplicate_rate={pattern['duplicate_rate']:.6f}")
+
     if not xs:
         print("No UDP points found.")
         return
@@ -59,5 +96,106 @@ def main():
     plt.savefig(out_path, dpi=200)
     print(f"\nWrote {out_path}")
 
+    plot_loss_causes(xs, causes)
+    plot_loss_pattern(xs, patterns)
+
+def plot_loss_causes(xs, causes):
+    """Stacked bars of lost replies per cause for each client count."""
+    if not any(sum(c.values()) for c in causes):
+        return
+    plt.figure()
+    bottom = [0] * len(xs)
+    for name in causes[0]:
+        heights = [c[name] for c in causes]
+        plt.bar([str(x) for x in xs], heights, bottom=bottom, label=name)
+        bottom = [b + h for b, h in zip(bottom, heights)]
+    plt.xlabel("clients")
+    plt.ylabel("lost replies")
+    plt.title(f"UDP Loss by Cause (p{PAYLOAD}, r{REQUESTS})")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / "udp_loss_causes_vs_clients.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"Wrote {out_path}")
+
+def plot_loss_pattern(xs, patterns):
+    """Left: share of lost replies that fell in bursts at least L long, per
+    client count (short bursts = scattered drops, long = queue overflow or a
+    stalled reader). Right: reorder and duplicate rates vs clients."""
+    points = [(x, p) for x, p in zip(xs, patterns) if p]
+    if not points:
+        return
+    fig, (ax_burst, ax_rate) = plt.subplots(1, 2, figsize=(11, 4.5))
+
+    for x, p in points:
+        lengths = sorted((int(k), n) for k, n in p["burst_lengths"].items())
+        lost = sum(k * n for k, n in lengths)
+        if not lost:
+            continue
+        at_least, left = [], lost
+        for k, n in lengths:
+            at_least.append(left / lost)
+            left -= k * n
+        ax_burst.step([k for k, _ in lengths], at_least, where="post", label=f"c={x}")
+    ax_burst.set_xscale("log")
+    ax_burst.set_xlabel("burst length L (consecutive lost replies)")
+    ax_burst.set_ylabel("share of lost replies in bursts >= L")
+    ax_burst.set_title("Loss Burst Lengths")
+    if ax_burst.get_lines():
+        ax_burst.legend()
+
+    ax_rate.plot([x for x, _ in points], [p["reorder_rate"] for _, p in points],
+                 marker="o", label="reorder rate")
+    ax_rate.plot([x for x, _ in points], [p["duplicate_rate"] for _, p in points],
+                 marker="o", label="duplicate rate")
+    ax_rate.set_yscale("symlog", linthresh=1e-5)
+    ax_rate.set_xlabel("clients")
+    ax_rate.set_ylabel("share of unique replies")
+    ax_rate.set_title("Reordering and Duplication")
+    ax_rate.legend()
+
+    fig.suptitle(f"UDP Loss Pattern (p{PAYLOAD}, r{REQUESTS})")
+    fig.tight_layout()
+    out_path = PLOTS_DIR / "udp_loss_pattern_vs_clients.png"
+    fig.savefig(out_path, dpi=200)
+    print(f"Wrote {out_path}")
+
+def plot_rate_search():
+    """Loss vs offered rate for every client.py --search-rate result, sustainable rate marked."""
+    paths = sorted(RESULTS_DIR.glob("udp_ratesearch_*.json"))
+    if not paths:
+        return
+
+    print("\n--- UDP loss rate vs offered rate (--search-rate) ---")
+    plt.figure()
+    for path in paths:
+        res = read_json_one_line(path)
+        probes = sorted((p for p in res.get("probes", []) if p["sent"]),
+                        key=lambda p: p["offered_pps"])
+        if not probes:
+            continue
+        label = f"c{res['clients']} p{res['payload_bytes']}"
+        line, = plt.plot([p["offered_pps"] for p in probes],
+                         [p["loss_rate"] for p in probes], marker="o", label=label)
+        best = res.get("sustainable_rate")
+        if best:
+            plt.axvline(best, color=line.get_color(), linestyle="--", linewidth=0.8)
+        print(f"{label}: {len(probes)} probes, sustainable={best or 0:.0f} pps "
+              f"(loss <= {res['loss_threshold']})")
+
+    plt.xlabel("offered rate (datagrams/s)")
+    plt.ylabel("udp_loss_rate")
+    plt.yscale("symlog", linthresh=1e-4)
+    plt.title("UDP Loss Rate vs Offered Rate")
+    plt.legend()
+    plt.tight_layout()
+
+    out_path = PLOTS_DIR / "udp_loss_vs_rate.png"
+    plt.savefig(out_path, dpi=200)
+    print(f"Wrote {out_path}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    if RESULTS_DIR.exists():
+        plot_rate_search()
\ No newline at end of file